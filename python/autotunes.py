@@ -1,14 +1,17 @@
 #!/usr/bin/env python
 """Script for Task 1."""
-from matplotlib import pyplot as plt
 import numpy as np
-import femm  # type: ignore
 
-from lib import setup_femm, cleanup_femm
+from lib import femm, setup_femm, cleanup_femm
+from metrics import machine_metrics
+from plotting import plt
+from setup import CW1_REDUCED
 
 
 if __name__ == "__main__":
-    out = setup_femm()
+    # Only the smallest repeating sector of the machine is solved
+    out = setup_femm("../dist/cw1_reduced.fem")
+    SCALE = CW1_REDUCED.scale
 
     # Setting current to 0
     femm.mi_modifycircprop("A", 1, 0)
@@ -38,21 +41,19 @@ if __name__ == "__main__":
         t = DT * k
         femm.mi_analyze(1)
         femm.mi_loadsolution()
-        femm.mo_groupselectblock(1)
-        tq = femm.mo_blockintegral(21)
+        tq = femm.mo_gapintegral("Sliding Boundary", 0)
         tt[k] = t
         coggingtorque[k] = tq
         circpropsA: list[float] = femm.mo_getcircuitproperties("A")
         circpropsB: list[float] = femm.mo_getcircuitproperties("B")
         circpropsC: list[float] = femm.mo_getcircuitproperties("C")
-        aflux[k] = circpropsA[2]
-        bflux[k] = circpropsB[2]
-        cflux[k] = circpropsC[2]
+        aflux[k] = SCALE * circpropsA[2]
+        bflux[k] = SCALE * circpropsB[2]
+        cflux[k] = SCALE * circpropsC[2]
 
         # Preparing for next step
         femm.mo_close()
-        femm.mi_selectgroup(1)
-        femm.mi_moverotate(0, 0, 1)
+        femm.mi_modifyboundprop("Sliding Boundary", 10, k + 1)
 
     cleanup_femm(out)
 
@@ -62,16 +63,15 @@ if __name__ == "__main__":
     plt.ylabel("Cogging Torque, N*m")
 
     plt.figure(2)
-    va = 8 * np.diff(aflux) / DT
-    vb = 8 * np.diff(bflux) / DT
-    vc = 8 * np.diff(cflux) / DT
-    td = tt[1:len(tt)] - DT / 2
+    metrics = machine_metrics(np.transpose([aflux, bflux, cflux]))
+    va, vb, vc = metrics.emf.T
+    td = metrics.emf_time
     plt.plot(td, va, td, vb, td, vc)
     plt.xlabel("Time, Seconds")
     plt.ylabel("Phase-to-Neutral Voltage")
 
     plt.figure(3)
-    vll = va - vc
+    vll = metrics.line_emf[:, 0]
     plt.plot(td, vll)
     plt.xlabel("Time, Seconds")
     plt.ylabel("Line-to-Line Voltage")
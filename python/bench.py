@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Benchmark suite of single solves and whole sweeps.
+
+The suite has three levels:
+
+- Micro benchmarks time opening the model, setting the excitation, analyzing,
+  post-processing and editing the geometry of a variant, one at a time.
+- Scenario benchmarks run reduced versions of the sweeps of Task 1/2, Task 5,
+  Task 9 and Task 10 end to end, including the startup of the pool and the
+  variants.
+- Scaling benchmarks run the Task 5 scenario with 1 to ``MAX_PROCESSES``
+  workers and find the parallel efficiency of each.
+
+The results are saved to ``../dist/bench.json``. The suite runs on the backend
+set by ``FEMM_BACKEND``, ``FEMM_BACKEND=stub`` measures the scheduling and I/O
+of the sweeps without FEMM. The solve cache is not used, so every point is
+solved. Every scenario records if its sweeps ran as one Lua script or one point
+at a time, as the stub cannot run Lua.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any, Iterator
+
+import numpy as np
+
+from fem import FemDocument
+from lib import FEMM_BACKEND, I_PEAK, START_METHOD, FEMMPool, OperatingPoint, femm
+from lua_sweep import runs_as_script
+from spec import Sweep, SweepSpec, run_spec
+from startup_benchmark import time_startup
+from task_5 import TASK_5
+from task_9 import remove_magnet, task_9
+from task_10 import change_slot_opening, task_10
+
+# Document of the micro benchmarks
+DOCUMENT = "../dist/cw1_sliding.fem"
+# Repeats of every micro benchmark
+MICRO_REPEAT = 10
+# Steps of every sweep of the scenarios
+SCENARIO_STEPS = 12
+# Variants of the scenarios that sweep the geometry
+SCENARIO_VARIANTS = 2
+# Steps of the scaling runs
+SCALING_STEPS = 48
+# Most workers of the scaling runs
+MAX_PROCESSES = min(os.cpu_count() or 1, 8)
+# Directory of the variants of the scenarios
+BENCH_DIR = "../dist/bench_models"
+
+
+@contextmanager
+def timed(times: dict[str, list[float]], name: str) -> Iterator[None]:
+    """Adds the time spent inside of the block to the times of a benchmark."""
+    start = time.perf_counter()
+    yield
+    times.setdefault(name, []).append(time.perf_counter() - start)
+
+
+def micro_job(document: str, repeat: int) -> dict[str, list[float]]:
+    """Times the steps of a solve in a pool worker.
+
+    :param document: The document to solve.
+    :param repeat: The amount of times every step is timed.
+    :returns: The times of every step in seconds.
+    """
+    times: dict[str, list[float]] = {}
+    point = OperatingPoint.three_phase(I_PEAK, 77, 23.1)
+    with tempfile.TemporaryDirectory() as dirname:
+        working = os.path.join(dirname, "micro.fem")
+        for _ in range(repeat):
+            with timed(times, "open"):
+                femm.mi_close()
+                femm.opendocument(document)
+                femm.mi_saveas(working)
+            with timed(times, "excitation"):
+                for circuit, current in zip("ABC", point.currents):
+                    femm.mi_modifycircprop(circuit, 1, current)
+                femm.mi_modifyboundprop("Sliding Boundary", 10, point.rotor_angle)
+            with timed(times, "analyze"):
+                femm.mi_analyze(1)
+                femm.mi_loadsolution()
+            with timed(times, "post_process"):
+                femm.mo_gapintegral("Sliding Boundary", 0)
+                for circuit in "ABC":
+                    femm.mo_getcircuitproperties(circuit)
+            femm.mo_close()
+    return times
+
+
+def micro(document: str = DOCUMENT, repeat: int = MICRO_REPEAT) -> dict[str, Any]:
+    """Runs the micro benchmarks.
+
+    :param document: The document to solve.
+    :param repeat: The amount of times every step is timed.
+    :returns: The median and fastest time of every step in seconds.
+    """
+    with FEMMPool(document, 1) as pool:
+        times = pool.submit(micro_job, document, repeat).result()
+    with tempfile.TemporaryDirectory() as dirname:
+        for index in range(repeat):
+            with timed(times, "edit_geometry"):
+                variant = FemDocument.read(document)
+                change_slot_opening(variant, 0.1 + 0.8 * index / repeat)
+                variant.write(os.path.join(dirname, "variant.fem"))
+    return {
+        name: {"median": statistics.median(values), "fastest": min(values)}
+        for name, values in times.items()
+    }
+
+
+def reduced(
+    spec: SweepSpec, steps: int = SCENARIO_STEPS, variants: int = SCENARIO_VARIANTS
+) -> SweepSpec:
+    """Reduces a specification to a few steps, currents and variants.
+
+    :param spec: The specification of a task.
+    :param steps: The amount of steps of every sweep.
+    :param variants: The amount of variants.
+    :returns: The specification without the solve cache.
+    """
+    sweeps = [
+        replace(
+            sweep,
+            steps=tuple(sweep.steps)[:steps],
+            currents=tuple(sweep.currents)[::5],
+        )
+        for sweep in spec.sweeps
+    ]
+    return replace(
+        spec,
+        sweeps=sweeps,
+        variants=tuple(spec.variants)[:variants],
+        variant_dir=BENCH_DIR,
+        cache=None,
+    )
+
+
+def scenarios() -> dict[str, SweepSpec]:
+    """Gets the reduced sweeps of the tasks."""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    without_magnet = os.path.join(BENCH_DIR, "task_9.fem")
+    remove_magnet(output_file=without_magnet)
+    cogging = Sweep(
+        "cogging",
+        currents=(0,),
+        load_angle=(0, 0),
+        rotor_angle=(0, 1),
+        quantities=("torque", "flux"),
+        warm_start=True,
+    )
+    return {
+        "task_1_2_sliding": reduced(SweepSpec(DOCUMENT, [cogging])),
+        "task_5": reduced(TASK_5),
+        "task_9": replace(
+            reduced(task_9(np.array([0.5, 0.8]))), document=without_magnet
+        ),
+        "task_10": reduced(task_10(np.array([0.2, 0.6]))),
+    }
+
+
+def run_scenario(spec: SweepSpec, processes: int | None = None) -> dict[str, Any]:
+    """Runs a sweep end to end.
+
+    :param spec: The specification to solve.
+    :param processes: The amount of workers.
+    :returns: The points, times in seconds and throughput of the sweep, and
+        if every sweep ran as one Lua script, see
+        :func:`lua_sweep.runs_as_script`.
+    """
+    processes = processes or MAX_PROCESSES
+    start = time.perf_counter()
+    result = run_spec(spec, processes=processes)
+    wall_time = time.perf_counter() - start
+    points = len(result.sweep.points)
+    return {
+        "processes": processes,
+        "points": points,
+        "wall_time": wall_time,
+        "solve_time": result.sweep.wall_time,
+        "startup": wall_time - result.sweep.wall_time,
+        "points_per_second": points / wall_time,
+        "solve_points_per_second": points / result.sweep.wall_time,
+        "lua_script": runs_as_script([task.quantities for task in spec.tasks()]),
+    }
+
+
+def scaling(spec: SweepSpec, max_processes: int = MAX_PROCESSES) -> list[dict]:
+    """Runs a sweep with more and more workers.
+
+    :param spec: The specification to solve.
+    :param max_processes: The most workers.
+    :returns: The results of :func:`run_scenario` for every amount of workers,
+        with the speedup and parallel efficiency of solving relative to one
+        worker, leaving out the startup.
+    """
+    runs = [run_scenario(spec, n) for n in range(1, max_processes + 1)]
+    single = runs[0]["solve_points_per_second"]
+    for run in runs:
+        run["speedup"] = run["solve_points_per_second"] / single
+        run["efficiency"] = run["speedup"] / run["processes"]
+    return runs
+
+
+def benchmark() -> dict[str, Any]:
+    """Runs every level of the suite.
+
+    :returns: The results of every benchmark.
+    """
+    logger = multiprocessing.get_logger()
+    results: dict[str, Any] = {
+        "backend": FEMM_BACKEND,
+        "start_method": START_METHOD,
+        "cpu_count": os.cpu_count(),
+        "pool_startup": time_startup(START_METHOD, MAX_PROCESSES, DOCUMENT),
+    }
+
+    logger.info("Micro benchmarks")
+    results["micro"] = micro()
+    for name, values in results["micro"].items():
+        logger.info("%s: %.4f s median", name, values["median"])
+
+    logger.info("Scenario benchmarks")
+    specs = scenarios()
+    results["scenarios"] = {}
+    for name, spec in specs.items():
+        results["scenarios"][name] = run_scenario(spec)
+        logger.info(
+            "%s: %.1f points/s, %.2f s startup (Lua script: %s)",
+            name,
+            results["scenarios"][name]["points_per_second"],
+            results["scenarios"][name]["startup"],
+            results["scenarios"][name]["lua_script"],
+        )
+
+    logger.info("Scaling benchmarks")
+    results["scaling"] = scaling(reduced(TASK_5, SCALING_STEPS))
+    for run in results["scaling"]:
+        logger.info(
+            "%s workers: %.1f points/s, %.0f%% efficiency",
+            run["processes"],
+            run["points_per_second"],
+            run["efficiency"] * 100,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    logger = multiprocessing.log_to_stderr(logging.INFO)
+
+    os.makedirs("../dist", exist_ok=True)
+    with open("../dist/bench.json", "w", encoding="utf-8") as file:
+        json.dump(benchmark(), file, indent=2)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache of solved operating points.
+
+Every quantity of a solve is stored on its own, keyed by the model and the
+operating point, so tasks extracting different quantities at the same points
+share the values they have in common.
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+DEFAULT_MAX_BYTES = 256 * 1024**2  # Default size limit of the cache
+
+
+@dataclass
+class CacheStats:
+    """Statistics of the solve cache."""
+
+    hits: int
+    misses: int
+    entries: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were found in the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _normalise(value: Any) -> Any:
+    """Converts a key into plain Python values with rounded floats.
+
+    This makes the same operating point give the same key no matter if it was
+    calculated using NumPy or Python floats.
+    """
+    if isinstance(value, (str, bytes, bool)) or value is None:
+        return value
+    if isinstance(value, (tuple, list)):
+        return tuple(_normalise(item) for item in value)
+    if hasattr(value, "__dataclass_fields__"):
+        return (type(value).__name__,) + tuple(
+            (name, _normalise(getattr(value, name)))
+            for name in value.__dataclass_fields__
+        )
+    if isinstance(value, (int, float)) or hasattr(value, "__float__"):
+        return round(float(value), 9) + 0.0
+    return value
+
+
+class SolveCache:
+    """Cache of extracted quantities keyed by the model and its excitation.
+
+    The entries are stored in a SQLite database so the cache can be shared by
+    all the worker processes. When the total size of the entries is larger than
+    the size limit the least recently used entries are evicted.
+
+    :param path: The location of the database.
+    :param max_bytes: The size limit of the stored values.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._pid = -1
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database connection of this process."""
+        # Connections cannot be shared with forked processes
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_used REAL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    @staticmethod
+    def key(model_hash: str, point: Any, quantity: Any) -> str:
+        """Creates the key of a quantity of a solve.
+
+        :param model_hash: The hash of the model, see :func:`lib.model_hash`.
+        :param point: The operating point that is solved.
+        :param quantity: The quantity extracted from the solution.
+        :returns: The key.
+        """
+        content = repr(_normalise((model_hash, point, quantity))).encode()
+        return hashlib.sha256(content).hexdigest()
+
+    def get_values(
+        self, model_hash: str, point: Any, quantities: Iterable[Any]
+    ) -> dict[Any, Any]:
+        """Gets the stored quantities of a solve.
+
+        The lookup counts as a hit if every quantity is stored.
+
+        :param model_hash: The hash of the model, see :func:`lib.model_hash`.
+        :param point: The operating point that is solved.
+        :param quantities: The quantities to get.
+        :returns: The value of every quantity that is stored.
+        """
+        keys = {
+            self.key(model_hash, point, quantity): quantity for quantity in quantities
+        }
+        if not keys:
+            return {}
+        connection = self.connection
+        rows = connection.execute(
+            f"SELECT key, value FROM entries WHERE key IN ({', '.join('?' * len(keys))})",
+            tuple(keys),
+        ).fetchall()
+        with connection:
+            self._count("hits" if len(rows) == len(keys) else "misses")
+            now = time.time()
+            connection.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(now, key) for key, _ in rows],
+            )
+        return {keys[key]: pickle.loads(value) for key, value in rows}
+
+    def put_values(self, model_hash: str, point: Any, values: Mapping[Any, Any]):
+        """Stores the quantities of a solve and evicts old entries.
+
+        :param model_hash: The hash of the model, see :func:`lib.model_hash`.
+        :param point: The operating point that is solved.
+        :param values: The value of every quantity.
+        """
+        now = time.time()
+        rows = []
+        for quantity, item in values.items():
+            value = pickle.dumps(item)
+            rows.append((self.key(model_hash, point, quantity), value, len(value), now))
+        connection = self.connection
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict()
+
+    def stats(self) -> CacheStats:
+        """Gets the statistics of the cache."""
+        connection = self.connection
+        counts = dict(connection.execute("SELECT name, value FROM stats").fetchall())
+        entries, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return CacheStats(counts.get("hits", 0), counts.get("misses", 0), entries, size)
+
+    def clear(self):
+        """Removes all the entries and statistics."""
+        connection = self.connection
+        with connection:
+            connection.execute("DELETE FROM entries")
+            connection.execute("DELETE FROM stats")
+
+    def _count(self, name: str):
+        """Increments a statistic."""
+        self.connection.execute(
+            "INSERT INTO stats VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def _evict(self):
+        """Removes the least recently used entries above the size limit."""
+        connection = self.connection
+        (size,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if size <= self.max_bytes:
+            return
+
+        rows = connection.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ).fetchall()
+        evicted = []
+        for key, entry_size in rows:
+            if size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            size -= entry_size
+        connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Prints the statistics of a solve cache."
+    )
+    parser.add_argument(
+        "path", nargs="?", default="../dist/solve_cache.sqlite", help="the database"
+    )
+    arguments = parser.parse_args()
+    if not os.path.exists(arguments.path):
+        parser.error(f"No solve cache at {arguments.path}")
+
+    cache = SolveCache(arguments.path)
+    cache_stats = cache.stats()
+    print(f"Entries: {cache_stats.entries}")
+    print(f"Size: {cache_stats.size} bytes")
+    print(f"Hits: {cache_stats.hits}")
+    print(f"Misses: {cache_stats.misses}")
+    print(f"Hit Rate: {cache_stats.hit_rate:.1%}")
@@ -0,0 +1,858 @@
+#!/usr/bin/env python3
+"""Reading, editing and writing FEMM ``.fem`` documents without FEMM.
+
+A document is kept as its header, its point, boundary, block and circuit
+properties and its geometry. The edits follow the ``mi_*`` functions of pyfemm,
+so geometry variants can be created in milliseconds instead of inside a running
+FEMM instance:
+
+- Lines are added between the nodes closest to the given coordinates.
+- Adding a node on a line splits the line, adding a line splits it at every node
+  on it. Lines crossing each other are not split.
+- Deleting a node deletes every line connected to it.
+- The properties of the lines and block labels are set by name.
+"""
+import cmath
+import math
+from dataclasses import dataclass, field, replace
+from typing import Iterable
+
+import numpy as np
+
+# Distance between two coordinates to treat them as the same point
+TOLERANCE = 1e-6
+
+# Sections of the properties in the order FEMM writes them
+PROPERTY_SECTIONS = {
+    "PointProps": "Point",
+    "BdryProps": "Bdry",
+    "BlockProps": "Block",
+    "CircuitProps": "Circuit",
+}
+
+
+@dataclass
+class Node:
+    """A node, the boundary is the index of the point property from 1."""
+
+    x: float
+    y: float
+    boundary: int = 0
+    group: int = 0
+    extra: str = ""
+
+
+@dataclass
+class Segment:
+    """A line segment between two nodes, the boundary is counted from 1."""
+
+    n0: int
+    n1: int
+    max_side: float = -1
+    boundary: int = 0
+    hidden: int = 0
+    group: int = 0
+    extra: str = ""
+
+
+@dataclass
+class ArcSegment:
+    """An arc turning counter-clockwise from ``n0`` to ``n1`` by ``angle``°."""
+
+    n0: int
+    n1: int
+    angle: float
+    max_segment: float = 1
+    boundary: int = 0
+    hidden: int = 0
+    group: int = 0
+    extra: str = ""
+
+
+@dataclass
+class Hole:
+    """A hole in the mesh."""
+
+    x: float
+    y: float
+    group: int = 0
+
+
+@dataclass
+class BlockLabel:
+    """A block label, the block and circuit are counted from 1.
+
+    The mesh size is written to the document as it is, FEMM converts it to the
+    maximum area of the elements when it reads the document. A mesh size of
+    ``-1`` lets FEMM choose it.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    x: float
+    y: float
+    block: int = 0
+    mesh_size: float = -1
+    circuit: int = 0
+    magdir: float = 0
+    group: int = 0
+    turns: int = 1
+    external: int = 0
+    extra: str = ""
+
+
+@dataclass
+class Property:
+    """A point, boundary, block or circuit property.
+
+    The lines are kept as they are written, as the properties of materials may
+    contain B-H curves and other values that are not keyed.
+    """
+
+    lines: list[str]
+
+    def get(self, key: str) -> str | None:
+        """Gets a value of the property.
+
+        :param key: The key without the angle brackets, case insensitive.
+        :returns: The value as written, ``None`` if it is missing.
+        """
+        for line in self.lines:
+            name, _, value = line.partition("=")
+            if name.strip().lower() == f"<{key.lower()}>":
+                return value.strip()
+        return None
+
+    @property
+    def name(self) -> str:
+        """The name of the property."""
+        for line in self.lines:
+            name, _, value = line.partition("=")
+            if name.strip().lower().endswith("name>"):
+                return value.strip().strip('"')
+        return ""
+
+
+def _number(value: float) -> str:
+    """Formats a number the way FEMM writes it."""
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.17g}"
+
+
+def _arc_circle(start: complex, end: complex, angle: float) -> tuple[complex, float]:
+    """Gets the center and radius of an arc.
+
+    :param start: The start of the arc.
+    :param end: The end of the arc.
+    :param angle: The counter-clockwise angle of the arc in degrees.
+    :returns: The center and the radius.
+    """
+    chord = end - start
+    half_angle = math.radians(angle) / 2
+    center = (start + end) / 2 + 1j * chord / 2 / math.tan(half_angle)
+    return center, abs(start - center)
+
+
+def _arc_position(start: complex, center: complex, point: complex) -> float:
+    """Gets the counter-clockwise angle of a point from the start of an arc."""
+    return math.degrees(cmath.phase((point - center) / (start - center))) % 360
+
+
+def _segment_distance(start: complex, end: complex, point: complex) -> float:
+    """Gets the distance of a point from a line segment."""
+    chord = end - start
+    if abs(chord) == 0:
+        return abs(point - start)
+    position = ((point - start) / chord).real
+    return abs(point - (start + chord * min(max(position, 0), 1)))
+
+
+@dataclass
+class FemDocument:
+    """A FEMM magnetics document.
+
+    >>> document = FemDocument.read("../dist/cw1_sliding.fem")
+    >>> document.delete_nodes([document.closest_node(20, 0)])
+    >>> document.write("../dist/edited.fem")
+
+    :param header: The values of the header, as they are written.
+    :param properties: The properties of each section, see
+        :data:`PROPERTY_SECTIONS`.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    header: dict[str, str] = field(default_factory=dict)
+    properties: dict[str, list[Property]] = field(
+        default_factory=lambda: {section: [] for section in PROPERTY_SECTIONS}
+    )
+    nodes: list[Node] = field(default_factory=list)
+    segments: list[Segment] = field(default_factory=list)
+    arcs: list[ArcSegment] = field(default_factory=list)
+    holes: list[Hole] = field(default_factory=list)
+    labels: list[BlockLabel] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, text: str) -> "FemDocument":
+        """Parses the content of a ``.fem`` file.
+
+        :param text: The content of the file.
+        :returns: The document.
+        """
+        # pylint: disable=too-many-locals
+        document = cls()
+        sections = {section.lower(): section for section in PROPERTY_SECTIONS}
+        lines = iter(text.splitlines())
+        for line in lines:
+            if not line.strip().startswith("["):
+                continue
+            key, _, value = line.partition("=")
+            key = key.strip()[1:-1]
+            value = value.strip()
+            match key.lower():
+                case section if section in sections:
+                    section = sections[section]
+                    begin = f"<begin{PROPERTY_SECTIONS[section].lower()}>"
+                    end = f"<end{PROPERTY_SECTIONS[section].lower()}>"
+                    for _ in range(int(value)):
+                        prop_lines: list[str] = []
+                        for prop_line in lines:
+                            if prop_line.strip().lower() == begin:
+                                continue
+                            if prop_line.strip().lower() == end:
+                                break
+                            prop_lines.append(prop_line.strip())
+                        document.properties[section].append(Property(prop_lines))
+                case "numpoints":
+                    for _ in range(int(value)):
+                        x, y, boundary, group, *extra = next(lines).split(None, 4)
+                        document.nodes.append(
+                            Node(
+                                float(x),
+                                float(y),
+                                int(boundary),
+                                int(group),
+                                "".join(extra),
+                            )
+                        )
+                case "numsegments":
+                    for _ in range(int(value)):
+                        n0, n1, side, boundary, hidden, group, *extra = next(
+                            lines
+                        ).split(None, 6)
+                        document.segments.append(
+                            Segment(
+                                int(n0),
+                                int(n1),
+                                float(side),
+                                int(boundary),
+                                int(hidden),
+                                int(group),
+                                "".join(extra),
+                            )
+                        )
+                case "numarcsegments":
+                    for _ in range(int(value)):
+                        n0, n1, angle, side, boundary, hidden, group, *extra = next(
+                            lines
+                        ).split(None, 7)
+                        document.arcs.append(
+                            ArcSegment(
+                                int(n0),
+                                int(n1),
+                                float(angle),
+                                float(side),
+                                int(boundary),
+                                int(hidden),
+                                int(group),
+                                "".join(extra),
+                            )
+                        )
+                case "numholes":
+                    for _ in range(int(value)):
+                        x, y, group = next(lines).split()[:3]
+                        document.holes.append(Hole(float(x), float(y), int(group)))
+                case "numblocklabels":
+                    for _ in range(int(value)):
+                        x, y, block, size, circuit, magdir, group, turns, *rest = next(
+                            lines
+                        ).split(None, 8)
+                        external, _, extra = "".join(rest).partition(" ")
+                        document.labels.append(
+                            BlockLabel(
+                                float(x),
+                                float(y),
+                                int(block),
+                                float(size),
+                                int(circuit),
+                                float(magdir),
+                                int(group),
+                                int(turns),
+                                int(external or 0),
+                                extra.strip(),
+                            )
+                        )
+                case _:
+                    document.header[key] = value
+        return document
+
+    @classmethod
+    def new(
+        cls, depth: float = 100, units: str = "millimeters", problem: str = "planar"
+    ) -> "FemDocument":
+        """Creates an empty document, like ``newdocument`` and ``mi_probdef``.
+
+        :param depth: The depth of a planar problem.
+        :param units: The length units.
+        :param problem: Either "planar" or "axi".
+        :returns: The document.
+        """
+        return cls(
+            {
+                "Format": "4.0",
+                "Frequency": "0",
+                "Precision": "1e-008",
+                "MinAngle": "30",
+                "Depth": _number(depth),
+                "LengthUnits": units,
+                "ProblemType": problem,
+                "Coordinates": "cartesian",
+                "ACSolver": "0",
+                "Comment": '"Add comments here."',
+            }
+        )
+
+    @classmethod
+    def read(cls, path: str) -> "FemDocument":
+        """Reads a ``.fem`` file.
+
+        :param path: The location of the file.
+        :returns: The document.
+        """
+        with open(path, encoding="utf-8", errors="replace") as file:
+            return cls.parse(file.read())
+
+    def format(self) -> str:
+        """Formats the document as the content of a ``.fem`` file."""
+        lines = [f"[{key}] = {value}" for key, value in self.header.items()]
+        for section, name in PROPERTY_SECTIONS.items():
+            lines.append(f"[{section}] = {len(self.properties[section])}")
+            for prop in self.properties[section]:
+                lines.append(f"  <Begin{name}>")
+                lines.extend(f"    {line}" for line in prop.lines)
+                lines.append(f"  <End{name}>")
+
+        def row(*values: float | str) -> str:
+            return "\t".join(
+                value if isinstance(value, str) else _number(value)
+                for value in values
+                if value != ""
+            )
+
+        lines.append(f"[NumPoints] = {len(self.nodes)}")
+        lines.extend(
+            row(node.x, node.y, node.boundary, node.group, node.extra)
+            for node in self.nodes
+        )
+        lines.append(f"[NumSegments] = {len(self.segments)}")
+        lines.extend(
+            row(
+                seg.n0,
+                seg.n1,
+                seg.max_side,
+                seg.boundary,
+                seg.hidden,
+                seg.group,
+                seg.extra,
+            )
+            for seg in self.segments
+        )
+        lines.append(f"[NumArcSegments] = {len(self.arcs)}")
+        lines.extend(
+            row(
+                arc.n0,
+                arc.n1,
+                arc.angle,
+                arc.max_segment,
+                arc.boundary,
+                arc.hidden,
+                arc.group,
+                arc.extra,
+            )
+            for arc in self.arcs
+        )
+        lines.append(f"[NumHoles] = {len(self.holes)}")
+        lines.extend(row(hole.x, hole.y, hole.group) for hole in self.holes)
+        lines.append(f"[NumBlockLabels] = {len(self.labels)}")
+        lines.extend(
+            row(
+                label.x,
+                label.y,
+                label.block,
+                label.mesh_size,
+                label.circuit,
+                label.magdir,
+                label.group,
+                label.turns,
+                label.external,
+                label.extra,
+            )
+            for label in self.labels
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Writes the document to a ``.fem`` file.
+
+        :param path: The location of the file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.format())
+
+    def point(self, node: int) -> complex:
+        """Gets the coordinates of a node as a complex number."""
+        return complex(self.nodes[node].x, self.nodes[node].y)
+
+    def arc_circle(self, arc: int) -> tuple[complex, float]:
+        """Gets the center and the radius of an arc segment."""
+        segment = self.arcs[arc]
+        return _arc_circle(
+            self.point(segment.n0), self.point(segment.n1), segment.angle
+        )
+
+    def property_index(self, section: str, name: str) -> int:
+        """Gets the index of a property from 1 as used by the geometry.
+
+        :param section: The section of the property, see
+            :data:`PROPERTY_SECTIONS`.
+        :param name: The name of the property, an empty name is no property.
+        :returns: The index of the property, ``0`` for no property.
+        """
+        if not name:
+            return 0
+        for index, prop in enumerate(self.properties[section]):
+            if prop.name == name:
+                return index + 1
+        raise KeyError(f"No {section} named {name}")
+
+    def closest_node(self, x: float, y: float) -> int:
+        """Gets the node closest to the coordinates, like ``mi_selectnode``."""
+        point = complex(x, y)
+        return min(range(len(self.nodes)), key=lambda i: abs(self.point(i) - point))
+
+    def closest_label(self, x: float, y: float) -> int:
+        """Gets the block label closest to the coordinates."""
+        point = complex(x, y)
+        return min(
+            range(len(self.labels)),
+            key=lambda i: abs(complex(self.labels[i].x, self.labels[i].y) - point),
+        )
+
+    def segment_distance(self, segment: int, x: float, y: float) -> float:
+        """Gets the distance of the coordinates from a line segment."""
+        seg = self.segments[segment]
+        return _segment_distance(self.point(seg.n0), self.point(seg.n1), complex(x, y))
+
+    def arc_distance(self, arc: int, x: float, y: float) -> float:
+        """Gets the distance of the coordinates from an arc segment."""
+        segment = self.arcs[arc]
+        start, end = self.point(segment.n0), self.point(segment.n1)
+        center, radius = self.arc_circle(arc)
+        point = complex(x, y)
+        if _arc_position(start, center, point) <= segment.angle:
+            return abs(abs(point - center) - radius)
+        return min(abs(point - start), abs(point - end))
+
+    def closest_segment(self, x: float, y: float) -> int:
+        """Gets the line segment closest to the coordinates."""
+        return min(
+            range(len(self.segments)), key=lambda i: self.segment_distance(i, x, y)
+        )
+
+    def closest_arc(self, x: float, y: float) -> int:
+        """Gets the arc segment closest to the coordinates."""
+        return min(range(len(self.arcs)), key=lambda i: self.arc_distance(i, x, y))
+
+    def _find_node(self, point: complex) -> int | None:
+        """Gets the node at the coordinates if there is one."""
+        for index in range(len(self.nodes)):
+            if abs(self.point(index) - point) < TOLERANCE:
+                return index
+        return None
+
+    def add_node(self, x: float, y: float, group: int = 0) -> int:
+        """Adds a node, splitting the lines it is on.
+
+        :param x: The x coordinate.
+        :param y: The y coordinate.
+        :param group: The group of the node.
+        :returns: The index of the node, or of the node already at the
+            coordinates.
+        """
+        point = complex(x, y)
+        existing = self._find_node(point)
+        if existing is not None:
+            return existing
+        self.nodes.append(Node(x, y, group=group))
+        node = len(self.nodes) - 1
+
+        for segment in list(self.segments):
+            if self._segment_contains(segment, point):
+                self.segments.remove(segment)
+                self.segments.append(replace(segment, n1=node))
+                self.segments.append(replace(segment, n0=node))
+        for arc in list(self.arcs):
+            if self._arc_contains(arc, point):
+                start = self.point(arc.n0)
+                center, _ = _arc_circle(start, self.point(arc.n1), arc.angle)
+                position = _arc_position(start, center, point)
+                self.arcs.remove(arc)
+                self.arcs.append(replace(arc, n1=node, angle=position))
+                self.arcs.append(replace(arc, n0=node, angle=arc.angle - position))
+        return node
+
+    def _segment_contains(self, segment: Segment, point: complex) -> bool:
+        """Checks if a point is on a line segment but not at its ends."""
+        start, end = self.point(segment.n0), self.point(segment.n1)
+        if min(abs(point - start), abs(point - end)) < TOLERANCE:
+            return False
+        return _segment_distance(start, end, point) < TOLERANCE
+
+    def _arc_contains(self, arc: ArcSegment, point: complex) -> bool:
+        """Checks if a point is on an arc segment but not at its ends."""
+        start, end = self.point(arc.n0), self.point(arc.n1)
+        if min(abs(point - start), abs(point - end)) < TOLERANCE:
+            return False
+        center, radius = _arc_circle(start, end, arc.angle)
+        on_circle = abs(abs(point - center) - radius) < TOLERANCE
+        return on_circle and _arc_position(start, center, point) < arc.angle
+
+    def add_segment(
+        self, x0: float, y0: float, x1: float, y1: float, boundary: str = ""
+    ) -> list[int]:
+        """Adds a line segment between the nodes closest to the coordinates.
+
+        The segment is split at every node on it and parts that already exist
+        are not added again.
+
+        :param x0: The x coordinate of the start.
+        :param y0: The y coordinate of the start.
+        :param x1: The x coordinate of the end.
+        :param y1: The y coordinate of the end.
+        :param boundary: The name of the boundary property of the segment.
+        :returns: The indices of the added segments.
+        """
+        # pylint: disable=too-many-arguments
+        n0, n1 = self.closest_node(x0, y0), self.closest_node(x1, y1)
+        start, end = self.point(n0), self.point(n1)
+        inner = [
+            node
+            for node in set(range(len(self.nodes))) - {n0, n1}
+            if _segment_distance(start, end, self.point(node)) < TOLERANCE
+        ]
+        inner.sort(key=lambda node: abs(self.point(node) - start))
+        path = [n0, *inner, n1]
+
+        marker = self.property_index("BdryProps", boundary)
+        added = []
+        for a, b in zip(path, path[1:]):
+            if any({seg.n0, seg.n1} == {a, b} for seg in self.segments):
+                continue
+            self.segments.append(Segment(a, b, boundary=marker))
+            added.append(len(self.segments) - 1)
+        return added
+
+    def add_arc(
+        self,
+        x0: float,
+        y0: float,
+        x1: float,
+        y1: float,
+        angle: float,
+        max_segment: float,
+        boundary: str = "",
+    ) -> list[int]:
+        """Adds an arc segment between the nodes closest to the coordinates.
+
+        The arc is split at every node on it and parts that already exist are
+        not added again.
+
+        :param x0: The x coordinate of the start.
+        :param y0: The y coordinate of the start.
+        :param x1: The x coordinate of the end.
+        :param y1: The y coordinate of the end.
+        :param angle: The counter-clockwise angle of the arc in degrees.
+        :param max_segment: The maximum angle of a mesh element on the arc.
+        :param boundary: The name of the boundary property of the arc.
+        :returns: The indices of the added arc segments.
+        """
+        # pylint: disable=too-many-arguments,too-many-locals
+        n0, n1 = self.closest_node(x0, y0), self.closest_node(x1, y1)
+        start = self.point(n0)
+        center, radius = _arc_circle(start, self.point(n1), angle)
+        inner = [
+            (_arc_position(start, center, self.point(node)), node)
+            for node in set(range(len(self.nodes))) - {n0, n1}
+            if abs(abs(self.point(node) - center) - radius) < TOLERANCE
+        ]
+        path = [(0.0, n0), *sorted(item for item in inner if item[0] < angle)]
+        path.append((angle, n1))
+
+        marker = self.property_index("BdryProps", boundary)
+        added = []
+        for (a_angle, a), (b_angle, b) in zip(path, path[1:]):
+            existing = [arc.angle for arc in self.arcs if (arc.n0, arc.n1) == (a, b)]
+            if any(math.isclose(span, b_angle - a_angle) for span in existing):
+                continue
+            self.arcs.append(
+                ArcSegment(a, b, b_angle - a_angle, max_segment, boundary=marker)
+            )
+            added.append(len(self.arcs) - 1)
+        return added
+
+    def add_label(self, x: float, y: float) -> int:
+        """Adds a block label without a material.
+
+        :param x: The x coordinate.
+        :param y: The y coordinate.
+        :returns: The index of the label.
+        """
+        self.labels.append(BlockLabel(x, y))
+        return len(self.labels) - 1
+
+    def delete_nodes(self, nodes: Iterable[int]):
+        """Deletes nodes and every line connected to them.
+
+        :param nodes: The indices of the nodes.
+        """
+        deleted = set(nodes)
+        index = {}
+        for old in range(len(self.nodes)):
+            if old not in deleted:
+                index[old] = len(index)
+        self.nodes = [node for i, node in enumerate(self.nodes) if i not in deleted]
+        self.segments = [
+            replace(seg, n0=index[seg.n0], n1=index[seg.n1])
+            for seg in self.segments
+            if seg.n0 in index and seg.n1 in index
+        ]
+        self.arcs = [
+            replace(arc, n0=index[arc.n0], n1=index[arc.n1])
+            for arc in self.arcs
+            if arc.n0 in index and arc.n1 in index
+        ]
+
+    def delete_labels(self, labels: Iterable[int]):
+        """Deletes block labels.
+
+        :param labels: The indices of the labels.
+        """
+        deleted = set(labels)
+        self.labels = [label for i, label in enumerate(self.labels) if i not in deleted]
+
+    def rotate_nodes(
+        self, nodes: Iterable[int], angle: float, x: float = 0, y: float = 0
+    ):
+        """Rotates nodes around a point, like ``mi_moverotate``.
+
+        The connected lines follow the nodes, arcs keep their angle.
+
+        :param nodes: The indices of the nodes.
+        :param angle: The counter-clockwise angle in degrees.
+        :param x: The x coordinate of the center of the rotation.
+        :param y: The y coordinate of the center of the rotation.
+        """
+        center = complex(x, y)
+        rotation = cmath.rect(1, math.radians(angle))
+        for node in set(nodes):
+            point = (self.point(node) - center) * rotation + center
+            self.nodes[node].x, self.nodes[node].y = point.real, point.imag
+
+    def set_block(
+        self,
+        label: int,
+        material: str,
+        circuit: str = "",
+        magdir: float = 0,
+        group: int = 0,
+        turns: int = 1,
+        mesh_size: float | None = None,
+    ):
+        """Sets the properties of a block label, like ``mi_setblockprop``.
+
+        :param label: The index of the label.
+        :param material: The name of the material.
+        :param circuit: The name of the circuit.
+        :param magdir: The direction of magnetisation in degrees.
+        :param group: The group of the label.
+        :param turns: The number of turns of the circuit.
+        :param mesh_size: The mesh size, ``None`` lets FEMM choose it.
+        """
+        # pylint: disable=too-many-arguments
+        block = self.labels[label]
+        block.block = self.property_index("BlockProps", material)
+        block.circuit = self.property_index("CircuitProps", circuit)
+        block.magdir = magdir
+        block.group = group
+        block.turns = turns
+        block.mesh_size = -1 if mesh_size is None else mesh_size
+
+    def set_segment_boundary(self, segment: int, boundary: str):
+        """Sets the boundary property of a line segment.
+
+        :param segment: The index of the segment.
+        :param boundary: The name of the boundary, empty for none.
+        """
+        self.segments[segment].boundary = self.property_index("BdryProps", boundary)
+
+    def set_arc_boundary(
+        self, arc: int, boundary: str, max_segment: float | None = None
+    ):
+        """Sets the boundary property of an arc segment.
+
+        :param arc: The index of the arc segment.
+        :param boundary: The name of the boundary, empty for none.
+        :param max_segment: The maximum angle of a mesh element on the arc,
+            ``None`` keeps the angle.
+        """
+        self.arcs[arc].boundary = self.property_index("BdryProps", boundary)
+        if max_segment is not None:
+            self.arcs[arc].max_segment = max_segment
+
+    def set_group(self, x: float, y: float, radius: float, group: int):
+        """Sets the group of everything inside of a circle.
+
+        Like ``mi_selectcircle`` selecting every kind of entity, followed by
+        ``mi_setgroup``.
+
+        :param x: The x coordinate of the center.
+        :param y: The y coordinate of the center.
+        :param radius: The radius of the circle.
+        :param group: The group to set.
+        """
+        # pylint: disable=too-many-arguments
+        center = complex(x, y)
+        inside = {
+            index
+            for index in range(len(self.nodes))
+            if abs(self.point(index) - center) <= radius
+        }
+        for index in inside:
+            self.nodes[index].group = group
+        for seg in self.segments:
+            if {seg.n0, seg.n1} <= inside:
+                seg.group = group
+        for index, arc in enumerate(self.arcs):
+            arc_center, arc_radius = self.arc_circle(index)
+            # The point of the arc furthest from the circle must be inside too
+            middle = arc_center + (self.point(arc.n0) - arc_center) * cmath.rect(
+                1, math.radians(arc.angle / 2)
+            )
+            if {arc.n0, arc.n1} <= inside and abs(middle - center) <= radius:
+                arc.group = group
+        for label in self.labels:
+            if abs(complex(label.x, label.y) - center) <= radius:
+                label.group = group
+
+    def add_material(self, material: Property):
+        """Adds a material from a material library, like ``mi_getmaterial``.
+
+        :param material: The block property of the material.
+        """
+        self.properties["BlockProps"].append(Property(list(material.lines)))
+
+    def add_circuit(self, name: str, current: float = 0, series: bool = True):
+        """Adds a circuit property, like ``mi_addcircprop``.
+
+        :param name: The name of the circuit.
+        :param current: The current of the circuit.
+        :param series: If the circuit is connected in series.
+        """
+        self.properties["CircuitProps"].append(
+            Property(
+                [
+                    f'<CircuitName> = "{name}"',
+                    f"<TotalAmps_re> = {_number(current)}",
+                    "<TotalAmps_im> = 0",
+                    f"<CircuitType> = {int(series)}",
+                ]
+            )
+        )
+
+    def add_boundary(self, name: str, boundary_type: int = 0):
+        """Adds a boundary property, like ``mi_addboundprop``.
+
+        Only the type of the boundary is set, every other value is zero.
+
+        :param name: The name of the boundary.
+        :param boundary_type: The FEMM boundary type, e.g. ``4`` for periodic,
+            ``5`` for anti-periodic and ``7`` for an anti-periodic air gap.
+        """
+        values = ("A_0", "A_1", "A_2", "Phi", "c0", "c0i", "c1", "c1i")
+        self.properties["BdryProps"].append(
+            Property(
+                [
+                    f'<BdryName> = "{name}"',
+                    f"<BdryType> = {boundary_type}",
+                    *(f"<{key}> = 0" for key in values),
+                    "<Mu_ssd> = 0",
+                    "<Sigma_ssd> = 0",
+                    "<innerangle> = 0",
+                    "<outerangle> = 0",
+                ]
+            )
+        )
+
+
+def read_materials(path: str) -> dict[str, Property]:
+    """Reads the materials of a FEMM material library.
+
+    :param path: The location of the library, e.g. ``matlib.dat`` of FEMM.
+    :returns: The block properties of the materials by name.
+    """
+    materials = {}
+    with open(path, encoding="utf-8", errors="replace") as file:
+        lines: list[str] | None = None
+        for line in file:
+            match line.strip().lower():
+                case "<beginblock>":
+                    lines = []
+                case "<endblock>" if lines is not None:
+                    material = Property(lines)
+                    materials.setdefault(material.name, material)
+                    lines = None
+                case _ if lines is not None:
+                    lines.append(line.strip())
+    return materials
+
+
+def plot_geometry(document: FemDocument, path: str):
+    """Saves a drawing of the geometry and block labels of a document.
+
+    :param document: The document to draw.
+    :param path: The location of the image.
+    """
+    # Imported here as only the variant images need it
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(8, 8))
+    axes = figure.subplots()
+    for seg in document.segments:
+        points = [document.point(seg.n0), document.point(seg.n1)]
+        axes.plot([p.real for p in points], [p.imag for p in points], "k", lw=0.5)
+    for index, arc in enumerate(document.arcs):
+        start = document.point(arc.n0)
+        center, _ = document.arc_circle(index)
+        steps = max(int(arc.angle), 2)
+        points = [
+            center + (start - center) * cmath.rect(1, angle)
+            for angle in np.radians(np.linspace(0, arc.angle, steps + 1))
+        ]
+        axes.plot([p.real for p in points], [p.imag for p in points], "k", lw=0.5)
+    blocks = document.properties["BlockProps"]
+    for label in document.labels:
+        name = blocks[label.block - 1].name if label.block > 0 else "<None>"
+        axes.annotate(name, (label.x, label.y), fontsize=6, ha="center")
+    axes.set_aspect("equal")
+    axes.axis("off")
+    figure.savefig(path, dpi=150)
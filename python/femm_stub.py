@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""Deterministic in-process stand-in for the pyfemm module.
+
+Used with ``FEMM_BACKEND=stub`` to benchmark and test the orchestration of the
+task scripts on machines without FEMM or wine. The torque and flux linkage are
+generated analytically from the rotor angle and the circuit currents:
+
+- The flux linkage of each phase is a sinusoid of the electrical rotor angle
+  with a fifth harmonic, plus the self inductance times the phase current.
+- The torque is the alignment torque of the currents with that flux linkage
+  plus a cogging torque with a period of one slot pitch.
+
+All the values are for the quarter model. ``FEMM_STUB_LATENCY`` adds a delay
+in seconds to every analysis and ``FEMM_STUB_CALL_LATENCY`` to every call.
+
+The Newton iterations of an analysis grow with the current, as the iron
+saturates, and shrink when it starts from a previous solution close to it.
+
+The mesh is read from the block labels and air gap arcs of the opened document.
+The amount of elements grows with the inverse square of the mesh size and the
+solution has a discretisation error growing with its square, so mesh
+convergence studies converge like they do in FEMM.
+"""
+import json
+import math
+import os
+import time
+from typing import Any, Callable
+
+from fem import FemDocument
+
+SUPPORTS_LUA = False  # The Lua sweep scripts cannot be run by the stub
+
+POLE_PAIRS = 2
+FLUX = 0.125  # Fundamental PM flux linkage, Wb
+FLUX_5 = 0.004  # Fifth harmonic PM flux linkage, Wb
+FLUX_OFFSET = -149.2  # Puts the peak torque near the load angle of FEMM
+INDUCTANCE = 0.9e-3  # Self inductance of a phase, H
+COGGING = 0.35  # Peak cogging torque, Nm
+COGGING_PERIOD = 15  # Cogging period, mechanical °
+AIRGAP_B = 0.85  # Peak airgap flux density, T
+CIRCUITS = {"A": 0, "B": 120, "C": -120}  # Phase shift of each circuit, °
+ITERATIONS = 8  # Newton iterations from scratch without current
+ITERATIONS_PER_AMP = 0.3  # Extra Newton iterations for every amp of current
+AUTO_MESH = 2.0  # Mesh size chosen by FEMM, mm
+SMART_MESH = 1.0  # Mesh size chosen by FEMM with smart meshing, mm
+AUTO_AIRGAP = 5.0  # Element angle on the air gap arcs, °
+SMART_AIRGAP = 2.0  # Element angle on the air gap arcs with smart meshing, °
+MESH_ELEMENTS = 4000  # Mesh elements with a 1 mm mesh
+AIRGAP_ELEMENTS = 360  # Mesh elements in the air gap with 1° elements
+MESH_ERROR = 0.003  # Relative error of the flux linkage per mm² of mesh size
+AIRGAP_ERROR = 0.002  # Relative error of the torque and air gap B per °²
+
+_STATE: dict[str, Any] = {}
+
+
+def _latency(name: str, scale: float = 1):
+    """Sleeps for the configured latency, times a scale."""
+    seconds = float(os.environ.get(name, "0")) * scale
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _reset(document: str | None = None):
+    """Resets the model to a freshly opened document."""
+    _STATE.update(
+        document=document,
+        currents={circuit: 0.0 for circuit in CIRCUITS},
+        sliding_angle=0.0,
+        rotor_offset=0.0,
+        magnet=True,
+        selected_group=None,
+        selected_labels=[],
+        edits=[],
+        solution=None,
+        mesh=1,
+        mesh_sizes=[],
+        airgap_angle=None,
+        analyses=0,
+        previous=None,
+        iterations=None,
+    )
+
+
+_reset()
+
+
+def rotor_angle() -> float:
+    """Gets the mechanical angle of the rotor in degrees."""
+    return _STATE["sliding_angle"] + _STATE["rotor_offset"]
+
+
+def pm_flux(circuit: str, angle: float) -> float:
+    """Gets the flux linkage of the magnets in a circuit.
+
+    :param circuit: The name of the circuit.
+    :param angle: The mechanical angle of the rotor in degrees.
+    :returns: The flux linkage in Wb.
+    """
+    if not _STATE["magnet"]:
+        return 0.0
+    electrical = math.radians(POLE_PAIRS * angle + CIRCUITS[circuit] + FLUX_OFFSET)
+    return FLUX * math.cos(electrical) + FLUX_5 * math.cos(5 * electrical)
+
+
+def pm_flux_derivative(circuit: str, angle: float) -> float:
+    """Gets the derivative of the magnet flux with the mechanical angle.
+
+    :param circuit: The name of the circuit.
+    :param angle: The mechanical angle of the rotor in degrees.
+    :returns: The derivative in Wb/rad.
+    """
+    if not _STATE["magnet"]:
+        return 0.0
+    electrical = math.radians(POLE_PAIRS * angle + CIRCUITS[circuit] + FLUX_OFFSET)
+    return -POLE_PAIRS * (
+        FLUX * math.sin(electrical) + 5 * FLUX_5 * math.sin(5 * electrical)
+    )
+
+
+def _read_mesh(document: str):
+    """Reads the mesh sizes of the block labels and air gap arcs of a document."""
+    try:
+        parsed = FemDocument.read(document)
+    except (OSError, ValueError, IndexError):
+        return
+    _STATE["mesh_sizes"] = [
+        label.mesh_size if label.mesh_size > 0 else None
+        for label in parsed.labels
+    ]
+    boundaries = [prop.name for prop in parsed.properties["BdryProps"]]
+    angles = [
+        arc.max_segment
+        for arc in parsed.arcs
+        if arc.boundary and boundaries[arc.boundary - 1] == "Sliding Boundary"
+    ]
+    _STATE["airgap_angle"] = min(angles, default=None)
+
+
+def mesh_size() -> tuple[float, float]:
+    """Gets the mean mesh size in mm and the element angle of the air gap in °."""
+    smart = bool(_STATE["mesh"])
+    automatic = SMART_MESH if smart else AUTO_MESH
+    sizes = [automatic if size is None else size for size in _STATE["mesh_sizes"]]
+    airgap = _STATE["airgap_angle"] or AUTO_AIRGAP
+    if smart:
+        airgap = min(airgap, SMART_AIRGAP)
+    return (sum(sizes) / len(sizes) if sizes else automatic), airgap
+
+
+def _solve() -> dict[str, Any]:
+    """Calculates the solution at the present excitation."""
+    angle = rotor_angle()
+    currents = _STATE["currents"]
+    size, airgap = mesh_size()
+    flux_scale = 1 - MESH_ERROR * size**2
+    flux = {
+        circuit: (pm_flux(circuit, angle) + INDUCTANCE * current) * flux_scale
+        for circuit, current in currents.items()
+    }
+    torque = sum(
+        current * pm_flux_derivative(circuit, angle)
+        for circuit, current in currents.items()
+    )
+    if _STATE["magnet"]:
+        torque += COGGING * math.sin(math.radians(360 * angle / COGGING_PERIOD))
+    torque *= 1 + AIRGAP_ERROR * airgap**2
+    return {
+        "angle": angle,
+        "flux": flux,
+        "torque": torque,
+        "currents": dict(currents),
+        "elements": numelements(),
+        "airgap_angle": airgap,
+    }
+
+
+def numelements() -> int:
+    """Gets the amount of mesh elements of the opened document."""
+    size, airgap = mesh_size()
+    return round(MESH_ELEMENTS / size**2 + AIRGAP_ELEMENTS / airgap)
+
+
+def _iterations(solution: dict[str, Any]) -> int:
+    """Gets the Newton iterations needed to reach a solution."""
+    currents = solution["currents"]
+    peak = max(abs(current) for current in currents.values())
+    cold = ITERATIONS + round(ITERATIONS_PER_AMP * peak)
+    previous = _STATE["previous"]
+    if previous is None:
+        return cold
+    # The change of the field in electrical cycles
+    change = abs(solution["angle"] - previous["angle"]) * POLE_PAIRS / 360
+    change += max(
+        abs(current - previous["currents"][circuit]) / (peak or 1)
+        for circuit, current in currents.items()
+    )
+    return min(cold, 2 + round(cold * 10 * change))
+
+
+# Session
+def openfemm(*_, **__):
+    """Starts the stub, all the arguments are ignored."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    _reset()
+
+
+def closefemm():
+    """Stops the stub."""
+    _reset()
+
+
+def opendocument(document: str):
+    """Opens a document, only its location is used."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    _reset(document)
+    _read_mesh(document)
+
+
+def newdocument(_: int = 0):
+    """Creates a new empty document."""
+    _reset()
+
+
+def mi_close():
+    """Closes the document."""
+    _reset()
+
+
+def mi_saveas(filename: str):
+    """Saves the document with a log of the edits made to it.
+
+    :param filename: The location to save to.
+    """
+    _latency("FEMM_STUB_CALL_LATENCY")
+    content = ""
+    document = _STATE["document"]
+    if document is not None and os.path.exists(document):
+        with open(document, encoding="utf-8", errors="replace") as file:
+            content = file.read()
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(content)
+        file.write("\n".join(_STATE["edits"]))
+    _STATE["document"] = filename
+    _STATE["edits"] = []
+
+
+def smartmesh(state: int):
+    """Sets the mesh setting."""
+    _STATE["mesh"] = state
+
+
+# Preprocessor
+def mi_modifycircprop(name: str, prop: int, value: float):
+    """Changes a circuit property, only the current is used."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    if prop == 1:
+        _STATE["currents"][name] = float(value)
+
+
+def mi_modifyboundprop(name: str, prop: int, value: float):
+    """Changes a boundary property, only the sliding boundary angle is used."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    if name == "Sliding Boundary" and prop == 10:
+        _STATE["sliding_angle"] = float(value)
+
+
+def mi_selectgroup(group: int):
+    """Selects a group."""
+    _STATE["selected_group"] = group
+
+
+def mi_selectlabel(x: float, y: float):
+    """Selects a block label."""
+    _STATE["selected_labels"].append((x, y))
+    _STATE["edits"].append(f"mi_selectlabel({x!r}, {y!r})")
+
+
+def mi_clearselected():
+    """Clears the selection."""
+    _STATE["selected_group"] = None
+    _STATE["selected_labels"] = []
+
+
+def mi_moverotate(x: float, y: float, angle: float):
+    """Rotates the selection, rotating the rotor when group 1 is selected."""
+    _STATE["edits"].append(f"mi_moverotate({x!r}, {y!r}, {angle!r})")
+    if _STATE["selected_group"] == 1:
+        _STATE["rotor_offset"] += angle
+
+
+def mi_setblockprop(material: str, *args):
+    """Sets the material of the selected labels.
+
+    Changing the label in the middle of the magnet removes the magnet.
+    """
+    _STATE["edits"].append(f"mi_setblockprop({material!r}, {args!r})")
+    for x, y in _STATE["selected_labels"]:
+        if 20 < math.hypot(x, y) < 24:
+            _STATE["magnet"] = material == "N42"
+
+
+def mi_setprevious(filename: str, prevtype: int = 0):
+    """Sets the solution the next analysis starts from, empty for none.
+
+    :raises NotImplementedError: If the solution is not used as the start of the
+        nonlinear iteration, the linearised solves are not modelled.
+    """
+    if prevtype != 0:
+        raise NotImplementedError(f"Previous solution type {prevtype}")
+    _STATE["previous"] = None
+    if filename:
+        with open(filename, encoding="utf-8") as file:
+            _STATE["previous"] = json.load(file)
+
+
+def mi_analyze(*_):
+    """Analyzes the model, saving the solution next to the document."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    _latency("FEMM_STUB_LATENCY", numelements() / MESH_ELEMENTS)
+    _STATE["analyses"] += 1
+    _STATE["solution"] = _solve()
+    _STATE["iterations"] = _iterations(_STATE["solution"])
+    document = _STATE["document"]
+    if document is not None:
+        solution = os.path.splitext(document)[0] + ".ans"
+        with open(solution, "w", encoding="utf-8") as file:
+            json.dump(_STATE["solution"], file)
+
+
+def last_iterations() -> int | None:
+    """Gets the Newton iterations of the last analysis."""
+    return _STATE["iterations"]
+
+
+def mi_loadsolution():
+    """Loads the solution."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    if _STATE["solution"] is None:
+        raise RuntimeError("The model has not been analyzed")
+
+
+# Postprocessor
+def _solution() -> dict[str, Any]:
+    """Gets the loaded solution."""
+    _latency("FEMM_STUB_CALL_LATENCY")
+    if _STATE["solution"] is None:
+        raise RuntimeError("No solution is loaded")
+    return _STATE["solution"]
+
+
+def mo_close():
+    """Closes the solution."""
+
+
+def mo_gapintegral(_: str, integral: int) -> float:
+    """Gets the torque on the sliding boundary."""
+    return _solution()["torque"] if integral == 0 else 0.0
+
+
+def mo_blockintegral(integral: int) -> float:
+    """Gets the torque on the selected blocks."""
+    return _solution()["torque"] if integral in (21, 22) else 0.0
+
+
+def mo_getcircuitproperties(circuit: str) -> list[float]:
+    """Gets the current, voltage and flux linkage of a circuit."""
+    solution = _solution()
+    return [solution["currents"][circuit], 0.0, solution["flux"][circuit]]
+
+
+def mo_getgapb(_: str, angle: float) -> list[float]:
+    """Gets the radial and tangential airgap flux density at an angle."""
+    solution = _solution()
+    electrical = math.radians(POLE_PAIRS * (angle - solution["angle"]))
+    scale = 1.0 if _STATE["magnet"] else 0.05
+    scale *= 1 - AIRGAP_ERROR * solution["airgap_angle"] ** 2
+    return [AIRGAP_B * scale * math.cos(electrical), 0.02 * math.sin(electrical)]
+
+
+def mo_getb(x: float, y: float) -> list[float]:
+    """Gets the flux density at a point, saturating with the current."""
+    solution = _solution()
+    current = max(abs(value) for value in solution["currents"].values())
+    magnitude = 1.9 * math.tanh((0.8 + 0.01 * current) * (1 + 0.01 * math.hypot(x, y)))
+    direction = math.atan2(y, x)
+    return [magnitude * math.cos(direction), magnitude * math.sin(direction)]
+
+
+def mo_numelements() -> int:
+    """Gets the amount of mesh elements of the solution."""
+    return _solution()["elements"]
+
+
+def _ignored(*_, **__):
+    """Command that does not change the stub model."""
+
+
+def _recorder(name: str) -> Callable[..., None]:
+    """Creates a preprocessor command that is only logged as an edit."""
+
+    def command(*args):
+        _STATE["edits"].append(f"{name}{args!r}")
+
+    command.__name__ = name
+    return command
+
+
+def __getattr__(name: str) -> Callable[..., Any]:
+    if name.startswith("mi_"):
+        return _recorder(name)
+    if name.startswith(("mo_", "main_")):
+        return _ignored
+    raise AttributeError(f"femm stub has no command {name}")
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""Two-level sweeps solving every point coarsely and few at full fidelity.
+
+Every solve of a specification is first solved on a coarse copy of its
+documents, with the mesh and the looser solver precision of a
+:class:`Fidelity`. Calibration steps at a stride and the steps around the
+extrema of the target field of every series are then solved at full fidelity.
+The difference between the full and the coarse values is fitted as a linear
+function of the coarse value for every variant and sweep, which corrects the
+coarse values of the points that are not solved again.
+
+The leave-one-out residual of the correction at every fully solved point
+estimates the error of the corrected points around it, interpolated over the
+steps in between. The gaps between fully solved steps whose estimate is above
+the tolerance are bisected and solved again until every estimate is within the
+tolerance or the budget of full solves is spent. The largest leave-one-out
+residual is the error bound of the corrected values.
+
+Set ``MULTI_FIDELITY=1`` to solve the sweeps of the tasks this way, see
+:func:`solve_spec`, which also answers them with the Fourier surrogates of
+:mod:`surrogate` if ``SURROGATE=1``.
+"""
+import logging
+import math
+import multiprocessing
+import os
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Any, Callable
+
+import numpy as np
+
+from fem import FemDocument
+from mesh import MeshSetting, apply_mesh
+from spec import SpecResult, SweepSpec, level_store, run_spec
+from surrogate import SURROGATE, run_surrogate
+from sweep import SweepResult
+
+# Solve the sweeps of the tasks with run_multi_fidelity
+MULTI_FIDELITY = os.environ.get("MULTI_FIDELITY", "0") == "1"
+# Directory of the coarse documents
+COARSE_DIR = "../dist/coarse"
+# Quantities measured about a solve itself, which are not corrected
+MEASURED = ("iterations", "analysis_time", "elements")
+
+
+@dataclass(frozen=True)
+class Fidelity:
+    """How a specification is solved at two levels of fidelity.
+
+    :param mesh: The mesh of the coarse solves, see :mod:`mesh`.
+    :param precision: The solver precision of the coarse solves, FEMM uses
+        ``1e-8``.
+    :param target: The field whose extrema are solved at full fidelity.
+    :param stride: The steps between the calibration steps of every series.
+    :param window: The steps on either side of an extremum solved at full
+        fidelity.
+    :param tolerance: The largest estimated error of the corrected values,
+        relative to the largest value of the field.
+    :param budget: The largest fraction of the solves solved at full fidelity.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    mesh: MeshSetting = MeshSetting("coarse", size=3, airgap=2, smartmesh=0)
+    precision: float = 1e-5
+    target: str = "torque"
+    stride: int = 12
+    window: int = 2
+    tolerance: float = 0.005
+    budget: float = 0.5
+
+
+@dataclass
+class MultiFidelityResult(SpecResult):
+    """The results of :func:`run_multi_fidelity`.
+
+    The values are the full fidelity values of the solves that were solved at
+    full fidelity and the corrected coarse values of the others. The sweep is
+    the sweep of the coarse solves.
+    """
+
+    coarse: dict[str, np.ndarray] = field(default_factory=dict)
+    fine: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+    errors: dict[str, np.ndarray] = field(default_factory=dict)
+    bounds: dict[str, float] = field(default_factory=dict)
+    fine_sweeps: list[SweepResult] = field(default_factory=list)
+
+    def log_fidelity(self, logger: logging.Logger):
+        """Logs the full fidelity solves and the error bound of every field.
+
+        :param logger: The logger to log to.
+        """
+        logger.info(
+            "Solved %s of %s points at full fidelity in %.2f s",
+            int(self.fine.sum()),
+            self.fine.size,
+            sum(sweep.wall_time for sweep in self.fine_sweeps),
+        )
+        for name, bound in self.bounds.items():
+            scale = np.nanmax(np.abs(self.values[name]), initial=0)
+            logger.info(
+                "Error bound of %s: %.4g (%.2f%% of the largest value)",
+                name,
+                bound,
+                100 * bound / scale if scale else 0,
+            )
+
+
+def _coarsen(
+    prepare: Callable[[FemDocument, Any], FemDocument | None] | None,
+    fidelity: Fidelity,
+    document: FemDocument,
+    variant: Any,
+) -> FemDocument:
+    """Prepares a variant with a coarse mesh and a loose solver precision."""
+    if prepare is not None:
+        document = prepare(document, variant) or document
+    apply_mesh(document, fidelity.mesh)
+    document.header["Precision"] = f"{fidelity.precision:g}"
+    return document
+
+
+def coarse_spec(spec: SweepSpec, fidelity: Fidelity) -> SweepSpec:
+    """Gets the specification of the coarse solves.
+
+    :param spec: The specification.
+    :param fidelity: The coarse mesh and precision.
+    :returns: The specification with coarse variants saved to ``COARSE_DIR``.
+    """
+    name = spec.variant_name
+    if spec.prepare is None:
+        name = os.path.splitext(os.path.basename(spec.document))[0]
+    return replace(
+        spec,
+        sweeps=[replace(sweep, mesh=fidelity.mesh.smartmesh) for sweep in spec.sweeps],
+        prepare=partial(_coarsen, spec.prepare, fidelity),
+        variant_dir=COARSE_DIR,
+        variant_name=f"{name}_coarse",
+        inherit_mesh=False,
+    )
+
+
+def _series(spec: SweepSpec) -> list[np.ndarray]:
+    """Gets the indices of the solves of every variant, sweep and current."""
+    return [
+        steps
+        for sweep in spec.sweeps
+        for variant in spec.indices(sweep.name)
+        for steps in variant
+    ]
+
+
+def _groups(spec: SweepSpec) -> list[np.ndarray]:
+    """Gets the indices of the solves of every variant and sweep."""
+    return [
+        variant.ravel() for sweep in spec.sweeps for variant in spec.indices(sweep.name)
+    ]
+
+
+def _initial(
+    series: list[np.ndarray], target: np.ndarray | None, fidelity: Fidelity
+) -> np.ndarray:
+    """Gets the calibration solves and the solves around the extrema."""
+    chosen = []
+    for indices in series:
+        count = len(indices)
+        chosen.extend(indices[:: fidelity.stride])
+        chosen.append(indices[-1])
+        if target is None:
+            continue
+        values = target[indices].reshape(count, -1)
+        values = (
+            values[:, 0] if values.shape[1] == 1 else np.linalg.norm(values, axis=1)
+        )
+        if np.isnan(values).all():
+            continue
+        for extremum in (np.nanargmax(values), np.nanargmin(values)):
+            start = max(0, extremum - fidelity.window)
+            chosen.extend(indices[start : extremum + fidelity.window + 1])
+    return np.unique(np.array(chosen, dtype=int))
+
+
+def _correct(
+    groups: list[np.ndarray],
+    coarse: np.ndarray,
+    values: np.ndarray,
+    fine: np.ndarray,
+) -> np.ndarray:
+    """Corrects the coarse values of a field that were not solved again.
+
+    :param groups: The indices of the solves sharing a correction.
+    :param coarse: The coarse values of the field.
+    :param values: The values of the field, changed in place.
+    :param fine: If every solve was solved at full fidelity.
+    :returns: The leave-one-out residual of every full solve, NaN for the
+        others.
+    """
+    residuals = np.full(len(values), math.nan)
+    for indices in groups:
+        low = coarse[indices].reshape(len(indices), -1)
+        high = values[indices].reshape(len(indices), -1)
+        valid = np.isfinite(low).all(axis=1)
+        known = fine[indices] & valid & np.isfinite(high).all(axis=1)
+        unknown = ~fine[indices] & valid
+        if not known.any():
+            continue
+
+        loo = np.zeros(known.sum())
+        for component in range(low.shape[1]):
+            # Linear in the coarse value with enough points, an offset otherwise
+            columns = 2 if known.sum() >= 3 else 1
+            design = np.column_stack((np.ones(len(low)), low[:, component]))
+            design = design[:, :columns]
+            difference = high[known, component] - low[known, component]
+            coefficients = np.linalg.lstsq(design[known], difference, rcond=None)[0]
+            residual = difference - design[known] @ coefficients
+            inverse = np.linalg.pinv(design[known].T @ design[known])
+            leverage = np.sum(design[known] @ inverse * design[known], axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                component_loo = np.where(
+                    leverage < 1 - 1e-9, np.abs(residual) / (1 - leverage), math.inf
+                )
+            loo = np.maximum(loo, component_loo)
+            high[unknown, component] = (
+                low[unknown, component] + design[unknown] @ coefficients
+            )
+
+        values[indices] = high.reshape(values[indices].shape)
+        residuals[indices[known]] = loo
+    return residuals
+
+
+def _estimate(
+    series: list[np.ndarray], residuals: np.ndarray, fine: np.ndarray
+) -> np.ndarray:
+    """Interpolates the residuals of the full solves over every series.
+
+    :returns: The estimated error of every solve, zero for the full solves and
+        infinite where nothing was solved at full fidelity.
+    """
+    errors = np.zeros(len(residuals))
+    for indices in series:
+        known = fine[indices] & np.isfinite(residuals[indices])
+        steps = np.arange(len(indices))
+        if known.any():
+            estimate = np.interp(steps, steps[known], residuals[indices][known])
+        else:
+            estimate = np.full(len(indices), math.inf)
+        errors[indices] = np.where(fine[indices], 0, estimate)
+    return errors
+
+
+def _refine(
+    series: list[np.ndarray],
+    errors: np.ndarray,
+    fine: np.ndarray,
+    limit: int,
+) -> np.ndarray:
+    """Bisects the gaps between full solves with an error above the tolerance.
+
+    :param series: The indices of the solves of every series.
+    :param errors: The error of every solve relative to the tolerance.
+    :param fine: If every solve was solved at full fidelity.
+    :param limit: The most solves to choose.
+    :returns: The indices of the solves to solve at full fidelity.
+    """
+    if limit <= 0:
+        return np.zeros(0, dtype=int)
+    candidates = []
+    for indices in series:
+        solved = np.flatnonzero(fine[indices])
+        for start, end in zip(solved[:-1], solved[1:]):
+            if end - start > 1:
+                worst = errors[indices[start + 1 : end]].max()
+                if worst > 1:
+                    candidates.append((worst, indices[(start + end) // 2]))
+    candidates.sort(reverse=True)
+    return np.array(sorted(index for _, index in candidates[:limit]), dtype=int)
+
+
+def run_multi_fidelity(
+    spec: SweepSpec,
+    fidelity: Fidelity = Fidelity(),
+    *,
+    processes: int | None = None,
+    store: str | None = None,
+) -> MultiFidelityResult:
+    """Solves a specification coarsely and only some of the points fully.
+
+    :param spec: The specification to solve.
+    :param fidelity: The coarse solves and the points solved at full fidelity.
+    :param processes: The amount of workers.
+    :param store: The location of the result store of the full fidelity solves,
+        which is shared with :func:`spec.run_spec` without ``indices``. The
+        coarse solves are stored next to it, see :func:`spec.level_store`.
+    :returns: The corrected results with the error bound of every field.
+    """
+    logger = multiprocessing.get_logger()
+    coarse = run_spec(
+        coarse_spec(spec, fidelity),
+        processes=processes,
+        store=level_store(store, "coarse"),
+    )
+    values = {name: value.copy() for name, value in coarse.values.items()}
+    fields = [name for name in values if name not in MEASURED]
+    count = len(next(iter(values.values())))
+    series = _series(spec)
+    groups = _groups(spec)
+
+    fine = np.zeros(count, dtype=bool)
+    residuals: dict[str, np.ndarray] = {}
+    errors: dict[str, np.ndarray] = {}
+    sweeps = []
+    chosen = _initial(series, coarse.values.get(fidelity.target), fidelity)
+    while chosen.size:
+        logger.info("Solving %s points at full fidelity", chosen.size)
+        result = run_spec(
+            spec,
+            processes=processes,
+            store=store,
+            indices=chosen,
+            prepare=not sweeps,
+        )
+        sweeps.append(result.sweep)
+        for name, value in values.items():
+            value[chosen] = result.values[name][chosen]
+        fine[chosen] = True
+
+        relative = np.zeros(count)
+        for name in fields:
+            residuals[name] = _correct(groups, coarse.values[name], values[name], fine)
+            errors[name] = _estimate(series, residuals[name], fine)
+            scale = np.nanmax(np.abs(values[name]), initial=0) * fidelity.tolerance
+            if scale > 0:
+                relative = np.maximum(relative, errors[name] / scale)
+        limit = int(fidelity.budget * count) - int(fine.sum())
+        chosen = _refine(series, relative, fine, limit)
+
+    bounds = {
+        name: float(np.nanmax(residuals[name], initial=0)) if (~fine).any() else 0.0
+        for name in fields
+    }
+    return MultiFidelityResult(
+        spec,
+        values,
+        coarse.sweep,
+        coarse=coarse.values,
+        fine=fine,
+        errors=errors,
+        bounds=bounds,
+        fine_sweeps=sweeps,
+    )
+
+
+def solve_spec(
+    spec: SweepSpec,
+    *,
+    processes: int | None = None,
+    store: str | None = None,
+    fidelity: Fidelity | None = None,
+) -> SpecResult:
+    """Solves a specification, in two levels of fidelity if ``MULTI_FIDELITY``.
+
+    If ``SURROGATE``, the points are predicted by the surrogates of
+    :func:`surrogate.run_surrogate` instead, which takes precedence.
+
+    :param spec: The specification to solve.
+    :param processes: The amount of workers.
+    :param store: The location of the result store. The full fidelity solves
+        of every mode resume from it, the coarse solves of two level sweeps
+        and the samples of the surrogates resume from stores next to it.
+    :param fidelity: The coarse solves and the points solved at full fidelity.
+    :returns: The results.
+    """
+    if SURROGATE:
+        surrogate_result = run_surrogate(spec, processes=processes, store=store)
+        surrogate_result.log_surrogate(multiprocessing.get_logger())
+        return surrogate_result
+    if not MULTI_FIDELITY:
+        return run_spec(spec, processes=processes, store=store)
+    result = run_multi_fidelity(
+        spec, fidelity or Fidelity(), processes=processes, store=store
+    )
+    result.log_fidelity(multiprocessing.get_logger())
+    return result
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""Parametric geometry of the machine.
+
+The sliding band model is drawn from a :class:`MachineDimensions` instead of a
+DXF drawing, so any dimension can be swept without drawing a new model. The
+default dimensions are the ones of ``cw_sliding.dxf``.
+
+The model is a sector of whole poles with periodic or anti-periodic boundaries
+on its edges, or the full machine. :meth:`MachineDimensions.reduced` finds the
+smallest sector the machine repeats over.
+"""
+import logging
+import math
+import multiprocessing
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Any
+
+from fem import FemDocument
+from model import Boundary, Label, ModelSpec, build_model, compile_model
+
+# Materials
+AIR = "Air"
+IRON = "Pure Iron"
+N42 = "N42"
+STEEL_1018 = "1018 Steel"
+STEEL_M19 = "M-19 Steel"
+COPPER = "10 AWG"
+
+
+@dataclass(frozen=True)
+class MachineDimensions:
+    """The dimensions of the machine, lengths are in millimeters.
+
+    The stator teeth have parallel sides and the slots are centered half a slot
+    pitch from the edge of the model. The magnets are magnetised in parallel
+    and alternate in direction every pole.
+
+    :param poles: The number of rotor poles.
+    :param slots: The number of stator slots.
+    :param sector_poles: The number of poles in the model, the full machine is
+        drawn if it is the number of poles.
+    :param shaft_radius: The radius of the 1018 steel rotor shaft.
+    :param rotor_radius: The outer radius of the rotor core.
+    :param magnet_thickness: The radial thickness of the magnets.
+    :param magnet_pitch: The span of a magnet as a fraction of the pole pitch.
+    :param magnet_angle: The angle of the middle of the first magnet in degrees.
+    :param magnet_direction: The direction of magnetisation of the first magnet
+        in degrees.
+    :param airgap: The length of the air gap between the magnets and the
+        stator.
+    :param sliding_band: The radii of the sliding band as fractions of the air
+        gap.
+    :param slot_opening: The angle of the slot openings in degrees.
+    :param opening_depth: The depth of the slot openings.
+    :param tip_depth: The depth of the tooth tips below the slot openings.
+    :param tooth_width: The width of the stator teeth.
+    :param slot_bottom_radius: The radius of the bottom of the slots.
+    :param stator_radius: The outer radius of the stator core.
+    :param frame_radius: The outer radius of the frame.
+    :param depth: The depth of the machine.
+    :param turns: The number of turns of a coil.
+    :param winding: The circuit and direction of the coil in every slot of a
+        pole, the direction is reversed every pole.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    poles: int = 4
+    slots: int = 24
+    sector_poles: int = 1
+    shaft_radius: float = 12.5
+    rotor_radius: float = 20
+    magnet_thickness: float = 4
+    magnet_pitch: float = 0.5
+    magnet_angle: float = 52.5
+    magnet_direction: float = 45
+    airgap: float = 1
+    sliding_band: tuple[float, float] = (0.3, 0.7)
+    slot_opening: float = 2.28
+    opening_depth: float = 1.4
+    tip_depth: float = 2.6
+    tooth_width: float = 2.7
+    slot_bottom_radius: float = 43
+    stator_radius: float = 50
+    frame_radius: float = 62.5
+    depth: float = 100
+    turns: int = 40
+    winding: tuple[tuple[str, int], ...] = field(
+        default=(("B", 1), ("B", 1), ("C", -1), ("C", -1), ("A", 1), ("A", 1))
+    )
+
+    @property
+    def pole_pitch(self) -> float:
+        """The angle of a pole in degrees."""
+        return 360 / self.poles
+
+    @property
+    def slot_pitch(self) -> float:
+        """The angle between the slots in degrees."""
+        return 360 / self.slots
+
+    @property
+    def sector(self) -> float:
+        """The angle of the model in degrees."""
+        return self.pole_pitch * self.sector_poles
+
+    @property
+    def full(self) -> bool:
+        """If the full machine is drawn."""
+        return self.sector_poles == self.poles
+
+    @property
+    def scale(self) -> float:
+        """The multiplier from the results of the model to the full machine.
+
+        Circuit results and block integrals are of the drawn sector only, the
+        torque of the sliding band is already of the full machine.
+        """
+        return self.poles / self.sector_poles
+
+    def reduced(self) -> "MachineDimensions":
+        """Gets the same machine drawn as its smallest repeating sector."""
+        sector_poles, _ = smallest_sector(self.poles, self.slots)
+        return replace(self, sector_poles=sector_poles)
+
+    @property
+    def magnet_radius(self) -> float:
+        """The outer radius of the magnets."""
+        return self.rotor_radius + self.magnet_thickness
+
+    @property
+    def bore_radius(self) -> float:
+        """The inner radius of the stator."""
+        return self.magnet_radius + self.airgap
+
+    @property
+    def band_radii(self) -> tuple[float, float]:
+        """The inner and outer radius of the sliding band."""
+        inner, outer = self.sliding_band
+        return (
+            self.magnet_radius + inner * self.airgap,
+            self.magnet_radius + outer * self.airgap,
+        )
+
+    @property
+    def opening_radius(self) -> float:
+        """The radius of the bottom of the slot openings."""
+        return self.bore_radius + self.opening_depth
+
+    @property
+    def tip_radius(self) -> float:
+        """The radius of the bottom of the tooth tips."""
+        return self.opening_radius + self.tip_depth
+
+    def slot_half_angle(self, radius: float) -> float:
+        """Gets half of the angle of a slot at a radius in degrees."""
+        tooth = math.degrees(math.asin(self.tooth_width / 2 / radius))
+        return self.slot_pitch / 2 - tooth
+
+    @property
+    def slot_opening_factor(self) -> float:
+        """The slot opening as a fraction of the slot width at the tooth tips."""
+        return self.slot_opening / (2 * self.slot_half_angle(self.tip_radius))
+
+    def magnets(self) -> list[tuple[float, float]]:
+        """Gets the middle and the direction of every magnet in degrees."""
+        return [
+            (
+                self.magnet_angle + pole * self.pole_pitch,
+                self.magnet_direction + pole * (self.pole_pitch + 180),
+            )
+            for pole in range(self.sector_poles)
+        ]
+
+    def validate(self):
+        """Checks that the dimensions describe a machine that can be drawn."""
+        slots_per_pole = self.slots / self.poles
+        if self.poles % self.sector_poles or not slots_per_pole.is_integer():
+            raise ValueError("The model must contain whole poles and slots")
+        if len(self.winding) != slots_per_pole:
+            raise ValueError("The winding must have a coil for every slot of a pole")
+        if not 0 < self.magnet_pitch <= 1:
+            raise ValueError("The magnet pitch must be between 0 and 1")
+        span = self.magnet_pitch * self.pole_pitch / 2
+        for middle, _ in self.magnets():
+            if not self.full and (middle - span < 0 or middle + span > self.sector):
+                raise ValueError("The magnets must be inside of the model")
+        radii = (
+            self.shaft_radius,
+            self.rotor_radius,
+            self.magnet_radius,
+            *self.band_radii,
+            self.bore_radius,
+            self.opening_radius,
+            self.tip_radius,
+            self.slot_bottom_radius,
+            self.stator_radius,
+            self.frame_radius,
+        )
+        if any(inner >= outer for inner, outer in zip(radii, radii[1:])):
+            raise ValueError("The radii of the machine must increase outwards")
+        if self.slot_opening / 2 >= self.slot_half_angle(self.tip_radius):
+            raise ValueError("The slot opening must be narrower than the slot")
+
+
+def smallest_sector(poles: int, slots: int) -> tuple[int, bool]:
+    """Finds the smallest sector the machine repeats over.
+
+    The machine repeats every ``360 / t`` degrees, where ``t`` is the greatest
+    common divisor of the slots and the pole pairs. When that sector has an even
+    number of slots, half of it repeats with the field reversed, so it is
+    anti-periodic and holds an odd number of poles.
+
+    :param poles: The number of rotor poles.
+    :param slots: The number of stator slots.
+    :returns: The number of poles in the sector and if its edges are
+        anti-periodic.
+    """
+    periodicity = math.gcd(slots, poles // 2)
+    if slots // periodicity % 2 == 0:
+        return poles // (2 * periodicity), True
+    return poles // periodicity, False
+
+
+def polar(radius: float, angle: float) -> tuple[float, float]:
+    """Gets the cartesian coordinates of a point.
+
+    :param radius: The distance from the origin.
+    :param angle: The angle in degrees.
+    :returns: The x and y coordinates.
+    """
+    radians = math.radians(angle)
+    return radius * math.cos(radians), radius * math.sin(radians)
+
+
+def _arc(document: FemDocument, radius: float, start: float, end: float):
+    """Draws an arc around the origin, split in two if it is a half circle."""
+    angles = [start, end]
+    if end - start >= 180:
+        angles.insert(1, (start + end) / 2)
+    for angle in angles:
+        document.add_node(*polar(radius, angle))
+    for first, last in zip(angles, angles[1:]):
+        document.add_arc(*polar(radius, first), *polar(radius, last), last - first, 1)
+
+
+def _line(document: FemDocument, start: tuple[float, float], end: tuple[float, float]):
+    """Draws a line segment, adding the nodes at its ends."""
+    document.add_node(*start)
+    document.add_node(*end)
+    document.add_segment(*start, *end)
+
+
+def draw_machine(dimensions: MachineDimensions, document: FemDocument):
+    """Draws the geometry of the machine.
+
+    :param dimensions: The dimensions of the machine.
+    :param document: The document to draw on.
+    """
+    # pylint: disable=too-many-locals
+    dimensions.validate()
+    sector = dimensions.sector
+    band_inner, band_outer = dimensions.band_radii
+
+    # Rotor and stator
+    for radius in (
+        dimensions.shaft_radius,
+        dimensions.rotor_radius,
+        band_inner,
+        band_outer,
+        dimensions.stator_radius,
+        dimensions.frame_radius,
+    ):
+        _arc(document, radius, 0, sector)
+
+    # Magnets
+    span = dimensions.magnet_pitch * dimensions.pole_pitch / 2
+    for middle, _ in dimensions.magnets():
+        for angle in (middle - span, middle + span):
+            _line(
+                document,
+                polar(dimensions.rotor_radius, angle),
+                polar(dimensions.magnet_radius, angle),
+            )
+        _arc(document, dimensions.magnet_radius, middle - span, middle + span)
+
+    # Slots
+    opening = dimensions.slot_opening / 2
+    tip = dimensions.slot_half_angle(dimensions.tip_radius)
+    bottom = dimensions.slot_half_angle(dimensions.slot_bottom_radius)
+    slots = round(dimensions.slots * sector / 360)
+    middles = [dimensions.slot_pitch * (slot + 0.5) for slot in range(slots)]
+    for middle in middles:
+        for side in (-1, 1):
+            _line(
+                document,
+                polar(dimensions.bore_radius, middle + side * opening),
+                polar(dimensions.opening_radius, middle + side * opening),
+            )
+            _line(
+                document,
+                polar(dimensions.opening_radius, middle + side * opening),
+                polar(dimensions.tip_radius, middle + side * tip),
+            )
+            _line(
+                document,
+                polar(dimensions.tip_radius, middle + side * tip),
+                polar(dimensions.slot_bottom_radius, middle + side * bottom),
+            )
+        _arc(document, dimensions.opening_radius, middle - opening, middle + opening)
+        _arc(document, dimensions.slot_bottom_radius, middle - bottom, middle + bottom)
+
+    # Teeth faces, open at the slot openings
+    edges = [0.0]
+    for middle in middles:
+        edges.extend((middle - opening, middle + opening))
+    edges.append(sector)
+    for start, end in zip(edges[::2], edges[1::2]):
+        _arc(document, dimensions.bore_radius, start, end)
+
+    # Edges of the sector
+    if not dimensions.full:
+        for angle in (0, sector):
+            _line(document, (0, 0), polar(band_inner, angle))
+            _line(
+                document,
+                polar(band_outer, angle),
+                polar(dimensions.frame_radius, angle),
+            )
+
+
+def _edge_boundaries(dimensions: MachineDimensions) -> list[Boundary]:
+    """Creates the boundaries on the segments of both edges of the sector."""
+    if dimensions.full:
+        return []
+    boundary_type = 5 if dimensions.sector_poles % 2 else 4
+    band_inner, band_outer = dimensions.band_radii
+    rotor = [0, dimensions.shaft_radius, dimensions.rotor_radius]
+    span = dimensions.magnet_pitch * dimensions.pole_pitch / 2
+    middles = [middle for middle, _ in dimensions.magnets()]
+    if math.isclose(min(middles) - span, 0, abs_tol=1e-9) or math.isclose(
+        max(middles) + span, dimensions.sector
+    ):
+        # The magnets split the edges
+        rotor.append(dimensions.magnet_radius)
+
+    sections = [
+        (f"Rotor Boundary {index}", inner, outer)
+        for index, (inner, outer) in enumerate(zip(rotor, rotor[1:]))
+    ]
+    sections.extend(
+        (
+            ("Air Gap 0", rotor[-1], band_inner),
+            ("Air Gap 1", band_outer, dimensions.bore_radius),
+            ("Stator Boundary 0", dimensions.bore_radius, dimensions.stator_radius),
+            ("Stator Boundary 1", dimensions.stator_radius, dimensions.frame_radius),
+        )
+    )
+    return [
+        Boundary(
+            name,
+            boundary_type,
+            segments=(
+                polar((inner + outer) / 2, 0),
+                polar((inner + outer) / 2, dimensions.sector),
+            ),
+        )
+        for name, inner, outer in sections
+    ]
+
+
+def _labels(dimensions: MachineDimensions) -> list[Label]:
+    """Creates the block labels of the machine."""
+    half = dimensions.sector / 2
+    band_inner, band_outer = dimensions.band_radii
+    labels = [
+        Label(*polar(dimensions.shaft_radius / 2, half), STEEL_1018, group=1),
+        Label(
+            *polar((dimensions.shaft_radius + dimensions.rotor_radius) / 2, half),
+            STEEL_M19,
+            group=1,
+        ),
+        Label(*polar((dimensions.magnet_radius + band_inner) / 2, half), AIR),
+        Label(*polar((band_outer + dimensions.bore_radius) / 2, half), AIR),
+        Label(
+            *polar(
+                (dimensions.slot_bottom_radius + dimensions.stator_radius) / 2, half
+            ),
+            STEEL_M19,
+        ),
+        Label(
+            *polar((dimensions.stator_radius + dimensions.frame_radius) / 2, half),
+            IRON,
+        ),
+    ]
+
+    radius = dimensions.rotor_radius + dimensions.magnet_thickness / 2
+    for middle, direction in dimensions.magnets():
+        labels.append(
+            Label(*polar(radius, middle), N42, magdir=direction % 360, group=1)
+        )
+
+    radius = (dimensions.tip_radius + dimensions.slot_bottom_radius) / 2
+    slots = round(dimensions.slots * dimensions.sector / 360)
+    for slot in range(slots):
+        pole, coil = divmod(slot, len(dimensions.winding))
+        circuit, direction = dimensions.winding[coil]
+        labels.append(
+            Label(
+                *polar(radius, dimensions.slot_pitch * (slot + 0.5)),
+                COPPER,
+                circuit=circuit,
+                turns=dimensions.turns * direction * (-1) ** pole,
+            )
+        )
+    return labels
+
+
+def machine_model(dimensions: MachineDimensions) -> ModelSpec:
+    """Creates the model of a machine.
+
+    :param dimensions: The dimensions of the machine.
+    :returns: The model, see :func:`model.compile_model`.
+    """
+    dimensions.validate()
+    band_type = 7 if dimensions.sector_poles % 2 else 6
+    band_inner, band_outer = dimensions.band_radii
+    arc_angle = dimensions.sector / 4
+    return ModelSpec(
+        None,
+        materials=(AIR, IRON, N42, STEEL_1018, STEEL_M19, COPPER),
+        circuits=("A", "B", "C"),
+        boundaries=(
+            Boundary(
+                "Boundary",
+                arcs=(
+                    polar(dimensions.frame_radius, arc_angle),
+                    polar(dimensions.frame_radius, 3 * arc_angle),
+                ),
+                max_segment=5,
+            ),
+            Boundary(
+                "Sliding Boundary",
+                band_type,
+                arcs=tuple(
+                    polar(radius, angle)
+                    for radius in (band_inner, band_outer)
+                    for angle in (arc_angle, 3 * arc_angle)
+                ),
+                max_segment=5,
+            ),
+            *_edge_boundaries(dimensions),
+        ),
+        groups=((sum(dimensions.band_radii) / 2, 1),),
+        labels=tuple(_labels(dimensions)),
+        depth=dimensions.depth,
+        geometry=partial(draw_machine, dimensions),
+    )
+
+
+def build_variant(_: Any, dimensions: MachineDimensions) -> FemDocument:
+    """Builds a machine as a variant of a :class:`spec.SweepSpec`.
+
+    :param dimensions: The dimensions of the variant.
+    :returns: The document of the variant.
+    """
+    return compile_model(machine_model(dimensions))
+
+
+if __name__ == "__main__":
+    multiprocessing.log_to_stderr(logging.INFO)
+    build_model(machine_model(MachineDimensions()), "../dist/cw1_parametric.fem")
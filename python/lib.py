@@ -1,19 +1,39 @@
 #!/usr/bin/env python3
 """Shared library code for all the scripts."""
+
+import hashlib
+import importlib
+import itertools
+import math
 import multiprocessing
 import os
 import shutil
 import tempfile
+import threading
+import re
+import time
+import warnings
+from concurrent.futures import Future
+from dataclasses import dataclass
 from functools import wraps
 from multiprocessing import Process, Queue
-from typing import Any, Callable, TypeVar, ParamSpec
+from queue import Empty
+from types import ModuleType
+from typing import Any, Callable, Iterable, TypeVar, ParamSpec
 
-import femm  # type: ignore
 import numpy as np
-import matplotlib.pyplot as plt
+
+from cache import SolveCache
+from mesh import document_hash, meshed_document
+from plotting import pyplot
+from tracing import now, record, span, trace_module, traced
+from tables import load_columns
 
 FEMM_DIR = "/home/user/.local/share/wineprefixes/default/drive_c/femm42/bin/"
 WINE_DIR = "/usr/bin/wine"
+# The FEMM backend to use, either "wine" (pyfemm), "xfemm" (native femmcli) or
+# "stub" (analytic stand-in for benchmarking)
+FEMM_BACKEND = os.environ.get("FEMM_BACKEND", "wine")
 
 RPM = 1500  # Mechanical RPM
 OMEGA = RPM * 360 / 60  # Mechanical °/sec
@@ -27,20 +47,83 @@ SLOT = 11.4  # The total angle of a slot
 TEETH = 3.6  # The total angle of a teeth
 I_PEAK = 20  # Rated current
 SLOT_OPENING_FACTOR = 2.28 / 9.66  # Slot opening factor
+POLES = 4  # Number of rotor poles
+SLOTS = 24  # Number of stator slots
+SOLVE_CACHE = "../dist/solve_cache.sqlite"  # Default location of the solve cache
+# Type of previous solution given to mi_setprevious. The manual only lists 1
+# (incremental permeability) and 2 (frozen permeability), which both solve a
+# problem linearised about the previous solution instead of the nonlinear one.
+# 0 keeps the nonlinear problem and only starts its iteration from the solution.
+PREVIOUS_TYPE = 0
+# How the worker processes are started, see worker_context()
+START_METHOD = os.environ.get("FEMM_START_METHOD", "forkserver")
+# Modules the fork server imports once, so the workers start with them imported
+WORKER_PRELOAD = ["lib", "store", "lua_sweep", "spec"]
+
+
+def load_backend(name: str) -> ModuleType:
+    """Loads the module that talks to FEMM.
+
+    :param name: The name of the backend, either "wine", "xfemm" or "stub".
+    :returns: A module with the pyfemm interface.
+    """
+    match name:
+        case "wine":
+            return importlib.import_module("femm")
+        case "xfemm":
+            return importlib.import_module("xfemm")
+        case "stub":
+            return importlib.import_module("femm_stub")
+    raise ValueError(f"Unknown FEMM backend: {name}")
+
+
+femm = trace_module(load_backend(FEMM_BACKEND))
 
 FEMMHandlerP = ParamSpec("FEMMHandlerP")
 FEMMHandlerT = TypeVar("FEMMHandlerT")
 
+# A quantity to extract from a solution, see solve()
+Quantity = str | tuple[Any, ...]
+# The Newton iterations, only extracted when the backend reports them as they
+# keep a sweep from running as one Lua script, see lua_sweep.run_sweep_script()
+ITERATIONS: tuple[Quantity, ...] = (
+    ("iterations",) if hasattr(femm, "last_iterations") else ()
+)
+
+# State of the FEMM instance when running inside of a FEMMPool worker
+_WORKER_STATE: dict[str, Any] = {}
+# Solve caches opened by this process
+_CACHES: dict[str, SolveCache] = {}
+# Lines of a .fem file set by solve()
+_EXCITATION_PATTERN = re.compile(
+    rb"^\s*<(TotalAmps_re|TotalAmps_im|InnerAngle|OuterAngle)>.*$"
+    rb"|^\s*\[(PrevSoln|PrevType)\].*$",
+    re.MULTILINE | re.IGNORECASE,
+)
+
 
 def get_data(file_path: str, skip_header=True, delimiter=",", **kwargs) -> np.ndarray:
-    """Gets the data from a CSV file.
+    """Gets the data of a table, see :func:`tables.load_table`.
+
+    The CSV options are deprecated. A CSV file read with other options than the
+    defaults is still parsed with ``np.genfromtxt`` every time.
 
-    :param file_path: The file path of the CSV file.
-    :param kwargs: Additional keyword args to add.
+    :param file_path: The file path of the table.
+    :param skip_header: Deprecated, the lines to skip at the start of the file.
+    :param delimiter: Deprecated, the string that separates the values.
+    :param kwargs: Deprecated, additional keyword args of ``np.genfromtxt``.
     """
-    return np.genfromtxt(
-        file_path, skip_header=skip_header, delimiter=delimiter, **kwargs
-    )
+    if skip_header is not True or delimiter != "," or kwargs:
+        warnings.warn(
+            "The CSV options of get_data are deprecated, tables are loaded with "
+            "tables.load_table",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return np.genfromtxt(
+            file_path, skip_header=skip_header, delimiter=delimiter, **kwargs
+        )
+    return load_columns(file_path)
 
 
 def plot_graph(x: list, y: list):
@@ -49,12 +132,17 @@ def plot_graph(x: list, y: list):
     :param x: The items on the x-axis.
     :param y: The items on the y-axis.
     """
+    plt = pyplot()
     plt.plot(x, y)
     plt.show()
 
 
-def setup_femm() -> str:
-    """Starts a new FEMM simulation."""
+def setup_femm(document: str = "../cw1.fem") -> str:
+    """Starts a new FEMM simulation.
+
+    :param document: The document to open in FEMM.
+    :returns: The location of the temporary copy of the document.
+    """
     os.environ["WINEDEBUG"] = "-all"
     femm_dir = "/home/user/.local/share/wineprefixes/default/drive_c/femm42/bin/"
 
@@ -62,7 +150,7 @@ def setup_femm() -> str:
         winepath="/usr/bin/wine",
         femmpath=femm_dir,
     )
-    femm.opendocument("../cw1.fem")
+    femm.opendocument(document)
 
     with tempfile.NamedTemporaryFile(suffix=".fem") as file:
         file.close()
@@ -77,24 +165,374 @@ def cleanup_femm(femm_file: str):
     os.remove(femm_file)
 
 
-def extract_queue(queue: Queue) -> np.ndarray:
-    """Extracts all the data from the queue."""
-    array = np.empty(queue.qsize(), dtype=None)
-    for i in range(queue.qsize()):
-        array[i] = queue.get()
-    return array
+@traced()
+def _open_document(document: str, dirname: str):
+    """Opens a document in the running FEMM instance on a temporary copy.
+
+    Any document that is already opened by this process is closed first so a
+    long-lived instance does not accumulate windows. Documents with a recorded
+    mesh setting are opened with it applied, see :mod:`mesh`.
+
+    :param document: The document to open in FEMM.
+    :param dirname: The directory to save the temporary copy to.
+    """
+    logger = multiprocessing.get_logger()
+    if _WORKER_STATE.get("document") is not None:
+        femm.mi_close()
+
+    path, smartmesh = meshed_document(document, FEMM_BACKEND)
+    femm.opendocument(path)
+    with tempfile.NamedTemporaryFile(suffix=".fem", dir=dirname) as file:
+        file.close()
+        femm.mi_saveas(file.name)
+        logger.debug("Using Temporary File: %s", file.name)
+    _WORKER_STATE["document"] = document
+    _WORKER_STATE["working_file"] = file.name
+    _WORKER_STATE["edited"] = False
+    _WORKER_STATE["smartmesh"] = smartmesh
+    _WORKER_STATE.pop("previous", None)
+    invalidate_model()
+
+
+def use_document(document: str, cache: str | None = None):
+    """Opens a document in a :class:`FEMMPool` worker for :func:`solve`.
+
+    The document is kept open between jobs that only solve it, so it is only
+    reopened when another document is open or a job may have edited it.
+
+    :param document: The document to open in FEMM.
+    :param cache: The location of the solve cache used by :func:`solve`.
+    """
+    if "dirname" not in _WORKER_STATE:
+        raise RuntimeError("Documents can only be reused inside of a FEMMPool")
+    if _WORKER_STATE.get("document") != document or _WORKER_STATE.get("edited"):
+        _open_document(document, _WORKER_STATE["dirname"])
+    _WORKER_STATE["cache"] = get_cache(cache)
+
+
+def femm_path(path: str) -> str:
+    """Gets the location of a file as seen by FEMM.
+
+    :param path: The location of the file.
+    :returns: The location on the wine ``Z:`` drive or the absolute location
+        for native backends.
+    """
+    if FEMM_BACKEND == "wine":
+        return "Z:" + os.path.abspath(path)
+    return os.path.abspath(path)
+
+
+def solved_hash(document: str) -> str:
+    """Gets the hash of a document as the workers solve it.
+
+    The hash changes with the content of the document and with the mesh
+    setting recorded for it, see :func:`mesh.meshed_document`.
+
+    :param document: The location of the document.
+    :returns: The hash.
+    """
+    path, smartmesh = meshed_document(document, FEMM_BACKEND)
+    return f"{document_hash(path)}:{smartmesh}"
+
+
+def start_femm(dirname: str, femm_dir: str = FEMM_DIR, wine_dir: str = WINE_DIR):
+    """Starts a FEMM instance of the configured backend.
+
+    Wine FEMM needs its own copy of the FEMM directory for every instance, the
+    native backends run from a working directory.
+
+    :param dirname: The directory for the files of the instance.
+    :param femm_dir: The location of the FEMM binary.
+    :param wine_dir: The location of the wine runtime binary.
+    """
+    logger = multiprocessing.get_logger()
+    if FEMM_BACKEND == "wine":
+        os.environ["WINEDEBUG"] = "-all"
+        shutil.copytree(femm_dir, dirname, dirs_exist_ok=True)
+        logger.debug("Using FEMM Thread Dir: %s", dirname)
+        femm.openfemm(winepath=wine_dir, femmpath=dirname)
+    else:
+        logger.debug("Using %s backend in: %s", FEMM_BACKEND, dirname)
+        femm.openfemm()
+
+
+def current_cache() -> SolveCache | None:
+    """Gets the solve cache of the running task function."""
+    return _WORKER_STATE.get("cache")
+
+
+def invalidate_model():
+    """Marks the geometry or materials of the opened document as changed.
+
+    This must be called after editing the model outside of :func:`solve` so the
+    solve cache does not return results of the old model.
+    """
+    _WORKER_STATE.pop("model_hash", None)
+
+
+def model_hash() -> str:
+    """Gets the hash of the opened document without its excitation.
+
+    The circuit currents and sliding boundary angles are removed before hashing
+    as they are part of the :class:`OperatingPoint` instead.
+
+    :returns: The hex digest of the document.
+    """
+    if "model_hash" not in _WORKER_STATE:
+        femm.mi_saveas(_WORKER_STATE["working_file"])
+        with open(_WORKER_STATE["working_file"], "rb") as file:
+            content = _EXCITATION_PATTERN.sub(b"", file.read())
+        # Results of different backends must not be mixed in the solve cache
+        digest = hashlib.sha256(FEMM_BACKEND.encode() + b"\0" + content)
+        _WORKER_STATE["model_hash"] = digest.hexdigest()
+    return _WORKER_STATE["model_hash"]
+
+
+@dataclass(frozen=True)
+class OperatingPoint:
+    """The excitation of the machine for a single solve."""
+
+    currents: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    rotor_angle: float | None = None
+    mesh: int = 1
+
+    @classmethod
+    def three_phase(
+        cls, current: float, phase_angle: float, rotor_angle: float | None = None
+    ) -> "OperatingPoint":
+        """Creates an operating point with a balanced three phase current.
+
+        :param current: The peak current of the phases.
+        :param phase_angle: The phase angle of phase A in degrees.
+        :param rotor_angle: The angle of the sliding boundary.
+        :returns: The operating point.
+        """
+        return cls(
+            (
+                current * np.sin(np.radians(phase_angle)),
+                current * np.sin(np.radians(phase_angle + 120)),
+                current * np.sin(np.radians(phase_angle - 120)),
+            ),
+            rotor_angle,
+        )
+
+
+@traced()
+def solve(
+    point: OperatingPoint,
+    quantities: tuple[Quantity, ...] = ("torque",),
+    warm_start: bool = False,
+) -> dict[Quantity, Any]:
+    """Solves the opened document at an operating point.
+
+    The supported quantities are:
+
+    - ``"torque"``: The torque on the sliding boundary.
+    - ``"flux"``: The flux linkage of phase A, B and C.
+    - ``"circuits"``: The circuit properties of phase A, B and C.
+    - ``("gapb", angle)``: The B field in the air gap at an angle.
+    - ``("b", x, y)``: The B field at a point.
+    - ``"iterations"``: The Newton iterations of the nonlinear solve, NaN when
+      the backend does not report them.
+    - ``"analysis_time"``: The seconds spent in ``mi_analyze``.
+    - ``"elements"``: The amount of mesh elements.
+
+    When the calling function is decorated with a solve cache the quantities
+    already solved at the point on the same model are returned without
+    analyzing it, including the iterations and time of the original analysis,
+    and only the missing quantities are solved.
+
+    :param point: The operating point to solve.
+    :param quantities: The quantities to extract from the solution.
+    :param warm_start: Starts the nonlinear iteration from the solution of the
+        last point analyzed on the same document and mesh, see :func:`analyze`.
+    :returns: The value of each of the quantities.
+    """
+    logger = multiprocessing.get_logger()
+    cache = current_cache()
+    if cache is None:
+        return analyze(point, quantities, warm_start)
+
+    current_model = model_hash()
+    values = cache.get_values(current_model, point, quantities)
+    missing = tuple(quantity for quantity in quantities if quantity not in values)
+    if missing:
+        solved = analyze(point, missing, warm_start)
+        cache.put_values(current_model, point, solved)
+        values.update(solved)
+    else:
+        logger.debug("Solve cache hit: %s", point)
+    return {quantity: values[quantity] for quantity in quantities}
+
+
+@traced()
+def analyze(
+    point: OperatingPoint,
+    quantities: tuple[Quantity, ...] = ("torque",),
+    warm_start: bool = False,
+) -> dict[Quantity, Any]:
+    """Analyzes the opened document at an operating point without the cache.
+
+    With a warm start the solution of the last point is set as the previous
+    solution of the document with ``mi_setprevious``, so consecutive points of
+    a sweep only need a few Newton iterations instead of starting from scratch.
+    The sliding boundary keeps the mesh the same between rotor angles, but the
+    first point after opening a document or changing the mesh starts cold.
+
+    :param point: The operating point to solve.
+    :param quantities: The quantities to extract from the solution, see
+        :func:`solve`.
+    :param warm_start: Starts from the solution of the last point.
+    :returns: The value of each of the quantities.
+    """
+    # Excitation
+    for circuit, current in zip("ABC", point.currents):
+        femm.mi_modifycircprop(circuit, 1, current)
+    if point.rotor_angle is not None:
+        femm.mi_modifyboundprop("Sliding Boundary", 10, point.rotor_angle)
+    mesh = mesh_state(point.mesh)
+    femm.smartmesh(mesh)
+    set_previous(mesh if warm_start else None)
+    # Backends that run a process for every query answer them with the analysis
+    prefetch = getattr(femm, "prefetch", None)
+    if prefetch is not None:
+        prefetch([query for quantity in quantities for query in _queries(quantity)])
+
+    # Anlyzing
+    start = time.perf_counter()
+    femm.mi_analyze(1)
+    elapsed = time.perf_counter() - start
+    femm.mi_loadsolution()
+
+    values = {quantity: _extract(quantity, elapsed) for quantity in quantities}
+    femm.mo_close()
+    if warm_start:
+        keep_solution(mesh)
+    return values
+
+
+def mesh_state(mesh: int) -> int:
+    """Gets the ``smartmesh`` state of a point on the opened document.
+
+    Smart meshing is turned off for documents whose recorded mesh setting does
+    not use it, see :func:`mesh.meshed_document`.
+
+    :param mesh: The mesh setting of the point, see :class:`OperatingPoint`.
+    :returns: The state.
+    """
+    return mesh if _WORKER_STATE.get("smartmesh", 1) else 0
+
+
+def working_file() -> str | None:
+    """Gets the working copy of the document opened in this worker."""
+    return _WORKER_STATE.get("working_file")
+
+
+def previous_solution() -> tuple[str, int] | None:
+    """Gets the solution kept to warm start from and its mesh setting."""
+    return _WORKER_STATE.get("previous")
+
+
+def set_previous(mesh: int | None):
+    """Sets the previous solution of the opened document.
+
+    :param mesh: The mesh setting of the point to solve, ``None`` to start
+        cold.
+    """
+    previous = _WORKER_STATE.get("previous")
+    if mesh is not None and previous is not None and previous[1] == mesh:
+        femm.mi_setprevious(femm_path(previous[0]), PREVIOUS_TYPE)
+        _WORKER_STATE["warm"] = True
+    elif _WORKER_STATE.pop("warm", False):
+        femm.mi_setprevious("", PREVIOUS_TYPE)
+
+
+def keep_solution(mesh: int, solution: str | None = None):
+    """Copies a solution of the opened document to start the next point from.
+
+    :param mesh: The mesh setting of the solution.
+    :param solution: The location of the solution, by default the one next to
+        the working copy of the document.
+    :raises FileNotFoundError: If the backend did not write the solution.
+    """
+    working_file = _WORKER_STATE.get("working_file")
+    if working_file is None:
+        return
+    if solution is None:
+        solution = os.path.splitext(working_file)[0] + ".ans"
+    if not os.path.exists(solution):
+        raise FileNotFoundError(f"No solution to warm start from at {solution}")
+    previous = os.path.join(os.path.dirname(working_file), "previous.ans")
+    shutil.copyfile(solution, previous)
+    _WORKER_STATE["previous"] = (previous, mesh)
+
+
+def _extract(quantity: Quantity, elapsed: float = math.nan) -> Any:
+    """Gets a quantity from the loaded solution.
+
+    :param quantity: The quantity to get, see :func:`solve`.
+    :param elapsed: The seconds the analysis took.
+    :returns: The value of the quantity.
+    """
+    match quantity:
+        case "iterations":
+            iterations = getattr(femm, "last_iterations", lambda: None)()
+            return math.nan if iterations is None else float(iterations)
+        case "analysis_time":
+            return elapsed
+        case "elements":
+            return float(femm.mo_numelements())
+        case "torque":
+            return femm.mo_gapintegral("Sliding Boundary", 0)
+        case "flux":
+            return tuple(femm.mo_getcircuitproperties(c)[2] for c in "ABC")
+        case "circuits":
+            return tuple(tuple(femm.mo_getcircuitproperties(c)) for c in "ABC")
+        case ("gapb", angle):
+            return tuple(femm.mo_getgapb("Sliding Boundary", angle))
+        case ("b", x, y):
+            return tuple(femm.mo_getb(x, y))
+    raise ValueError(f"Unknown quantity: {quantity}")
+
+
+def _queries(quantity: Quantity) -> list[tuple[str, tuple]]:
+    """Gets the post processor commands :func:`_extract` runs for a quantity.
+
+    :param quantity: The quantity, see :func:`solve`.
+    :returns: The name and arguments of every command.
+    """
+    match quantity:
+        case "elements":
+            return [("mo_numelements", ())]
+        case "torque":
+            return [("mo_gapintegral", ("Sliding Boundary", 0))]
+        case "flux" | "circuits":
+            return [("mo_getcircuitproperties", (c,)) for c in "ABC"]
+        case ("gapb", angle):
+            return [("mo_getgapb", ("Sliding Boundary", angle))]
+        case ("b", x, y):
+            return [("mo_getb", (x, y))]
+    return []
 
 
 def femm_handler(
-    document: str, *, femm_dir: str = FEMM_DIR, wine_dir: str = WINE_DIR
+    document: str,
+    *,
+    femm_dir: str = FEMM_DIR,
+    wine_dir: str = WINE_DIR,
+    cache: str | None = None,
 ) -> Callable[
     [Callable[FEMMHandlerP, FEMMHandlerT]], Callable[FEMMHandlerP, FEMMHandlerT]
 ]:
     """Function decorator to handle FEMM in a seperate instance.
 
+    When the decorated function is run inside of a :class:`FEMMPool` worker the
+    already running FEMM instance is reused and only the document is reopened.
+
     :param document: The document to open in FEMM.
     :param femm_dir: The location of the FEMM binary.
     :param wine_dir: The location of the wine runtime binary.
+    :param cache: The location of the solve cache used by :func:`solve`.
     :returns: Wrapped function.
     """
     logger = multiprocessing.get_logger()
@@ -103,80 +541,321 @@ def femm_handler(
     logger.debug("Using wine binary: %s", wine_dir)
 
     def custom_handler(
-        func: Callable[FEMMHandlerP, FEMMHandlerT]
+        func: Callable[FEMMHandlerP, FEMMHandlerT],
     ) -> Callable[FEMMHandlerP, FEMMHandlerT]:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            os.environ["WINEDEBUG"] = "-all"
-            with tempfile.TemporaryDirectory() as dirname:
-                shutil.copytree(femm_dir, dirname, dirs_exist_ok=True)
-                logger.debug("Using FEMM Thread Dir: %s", dirname)
+            if "dirname" in _WORKER_STATE:
+                # Reusing the FEMM instance of the pool worker
+                _open_document(document, _WORKER_STATE["dirname"])
+                _WORKER_STATE["cache"] = get_cache(cache)
+                try:
+                    with span(func.__qualname__, "task"):
+                        return func(*args, **kwargs)
+                finally:
+                    _WORKER_STATE["edited"] = True
 
+            with tempfile.TemporaryDirectory() as dirname:
                 # Setup FEMM instance
-                femm.openfemm(
-                    winepath=wine_dir,
-                    femmpath=dirname,
-                )
-                femm.opendocument(document)
-
-                with tempfile.NamedTemporaryFile(suffix=".fem", dir=dirname) as file:
-                    file.close()
-                    femm.mi_saveas(file.name)
-                    logger.debug("Using Temporary File: %s", file.name)
+                start_femm(dirname, femm_dir, wine_dir)
+                _open_document(document, dirname)
+                _WORKER_STATE["cache"] = get_cache(cache)
 
                 # Running decorated function
-                value = func(*args, **kwargs)
+                with span(func.__qualname__, "task"):
+                    value = func(*args, **kwargs)
 
                 # Closing FEMM instance
+                _WORKER_STATE.clear()
                 femm.closefemm()
                 logger.debug("Exiting FEMM")
                 return value
 
+        setattr(wrapper, "femm_document", document)
         return wrapper
 
     return custom_handler
 
 
+def worker_context(
+    method: str | None = None,
+) -> multiprocessing.context.BaseContext:
+    """Gets the context the worker processes are started with.
+
+    With forkserver every worker is forked from a server process that has only
+    imported ``WORKER_PRELOAD``, so neither the modules nor the state of the
+    main process are copied or imported again. Platforms without forkserver use
+    spawn instead.
+
+    :param method: The start method, ``START_METHOD`` by default.
+    :returns: The context.
+    """
+    method = method or START_METHOD
+    if method not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        context.set_forkserver_preload(WORKER_PRELOAD)
+    return context
+
+
+def get_cache(path: str | None) -> SolveCache | None:
+    """Gets the solve cache of this process at a path.
+
+    :param path: The location of the cache, no cache is used if it is ``None``.
+    :returns: The solve cache.
+    """
+    if path is None:
+        return None
+    if path not in _CACHES:
+        _CACHES[path] = SolveCache(path)
+    return _CACHES[path]
+
+
 class FEMMWorker(Process):
-    """Worker for an FEMM simulation."""
+    """Long-lived FEMM instance that runs jobs from a queue.
+
+    FEMM is started inside of the child process once, every job then only
+    reopens the document so the startup cost is paid once per worker. The
+    process is started with :func:`worker_context`, so the setup function must
+    be picklable.
+    """
 
     def __init__(
         self,
-        setup: Callable[[], None],
-        loop: Callable[[Any], Any],
-        queue: Queue,
-        out: Queue,
+        document: str,
+        jobs: Queue,
+        results: Queue,
+        *,
+        setup: Callable[[], None] | None = None,
+        femm_dir: str = FEMM_DIR,
+        wine_dir: str = WINE_DIR,
+        start_method: str | None = None,
     ):
-        super().__init__()
-        self.queue = queue
-        self.loop = loop
-        self.out_queue = out
+        # pylint: disable=too-many-arguments
+        super().__init__(daemon=True)
+        self.document = document
+        self.jobs = jobs
+        self.results = results
+        self.setup = setup
+        self.femm_dir = femm_dir
+        self.wine_dir = wine_dir
+        self.start_method = start_method
+
+    @staticmethod
+    def _Popen(process_obj: "FEMMWorker"):  # pylint: disable=invalid-name
+        # Started like the processes of the context instead of the default one
+        context = worker_context(process_obj.start_method)
+        return context.Process._Popen(process_obj)  # type: ignore
 
-        femm_dir = "/home/user/.local/share/wineprefixes/default/drive_c/femm42/bin/"
-        os.environ["WINEDEBUG"] = "-all"
+    def run(self):
+        """Starts FEMM and runs all the queued jobs."""
+        logger = multiprocessing.get_logger()
+
+        with tempfile.TemporaryDirectory() as dirname:
+            start_femm(dirname, self.femm_dir, self.wine_dir)
+            _WORKER_STATE["dirname"] = dirname
+
+            if self.setup is not None:
+                _open_document(self.document, dirname)
+                self.setup()
+                _WORKER_STATE["edited"] = True
+
+            for job_id, func, args, kwargs, submitted in iter(self.jobs.get, None):
+                started = now()
+                self.results.put(("start", job_id, self.name, started))
+                record("queued", "queue", submitted, started, job=job_id)
+                try:
+                    # Decorated functions reopens their own document
+                    if not hasattr(func, "femm_document"):
+                        _open_document(self.document, dirname)
+                        _WORKER_STATE["cache"] = None
+                        _WORKER_STATE["edited"] = True
+                    name = getattr(func, "__qualname__", type(func).__name__)
+                    with span(name, "job", job=job_id):
+                        value = func(*args, **kwargs)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    logger.exception("Job %s failed", job_id)
+                    self.results.put(("error", job_id, self.name, error))
+                else:
+                    self.results.put(("done", job_id, self.name, value))
+
+            _WORKER_STATE.clear()
+            femm.closefemm()
+            logger.debug("Exiting FEMM Worker")
+
+
+class FEMMPool:
+    """Pool of long-lived FEMM instances.
+
+    Example
+    -------
+
+    >>> with FEMMPool("../dist/cw1_sliding.fem", 4) as pool:
+    ...     torque = pool.map(task_5, currents)
+
+    :param document: The document opened for jobs that are not decorated with
+        :func:`femm_handler`.
+    :param processes: The amount of FEMM instances to start, defaults to the
+        amount of CPUs.
+    :param setup: Function ran once in every worker after FEMM is started.
+    :param femm_dir: The location of the FEMM binary.
+    :param wine_dir: The location of the wine runtime binary.
+    :param start_method: How the workers are started, see
+        :func:`worker_context`.
+    """
 
-        # pylint: disable = consider-using-with
-        self.dirname = tempfile.TemporaryDirectory()
-        shutil.copytree(femm_dir, self.dirname.name, dirs_exist_ok=True)
+    def __init__(
+        self,
+        document: str,
+        processes: int | None = None,
+        *,
+        setup: Callable[[], None] | None = None,
+        femm_dir: str = FEMM_DIR,
+        wine_dir: str = WINE_DIR,
+        start_method: str | None = None,
+    ):
+        # pylint: disable=too-many-arguments
+        context = worker_context(start_method)
+        self._jobs: Queue = context.Queue()
+        self._results: Queue = context.Queue()
+        self._futures: dict[int, Future] = {}
+        self._running: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._closed = False
+        # Exit codes of the workers once they have all died
+        self._dead: str | None = None
+
+        self.workers = [
+            FEMMWorker(
+                document,
+                self._jobs,
+                self._results,
+                setup=setup,
+                femm_dir=femm_dir,
+                wine_dir=wine_dir,
+                start_method=start_method,
+            )
+            for _ in range(processes or os.cpu_count() or 1)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(
+        self, func: Callable[..., FEMMHandlerT], /, *args, **kwargs
+    ) -> "Future[FEMMHandlerT]":
+        """Schedules a function to run in one of the FEMM instances.
+
+        :param func: The function to run, it must be picklable.
+        :param args: Positional arguments to the function.
+        :param kwargs: Keyword arguments to the function.
+        :returns: Future of the function result.
+        """
+        if self._closed:
+            raise RuntimeError("Cannot submit to a closed FEMMPool")
+
+        future: Future = Future()
+        with self._lock:
+            if self._dead is not None:
+                raise RuntimeError(f"No FEMM workers are left: {self._dead}")
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+        self._jobs.put((job_id, func, args, kwargs, now()))
+        return future
+
+    def map(
+        self, func: Callable[[Any], FEMMHandlerT], iterable: Iterable[Any]
+    ) -> list[FEMMHandlerT]:
+        """Runs the function over every item in the pool.
+
+        :param func: The function to run, it must be picklable.
+        :param iterable: The items to pass to the function.
+        :returns: The results in the same order as the items.
+        """
+        futures = [self.submit(func, item) for item in iterable]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stops accepting jobs and tells the workers to exit when done."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self.workers:
+            self._jobs.put(None)
+
+    def join(self):
+        """Waits for all the workers to exit."""
+        for worker in self.workers:
+            worker.join()
+        # Wakes the collector up instead of waiting for its timeout
+        self._results.put(None)
+        self._collector.join()
+
+    def _collect(self):
+        """Resolves the futures from the results sent back by the workers."""
+        while True:
+            try:
+                message = self._results.get(timeout=1)
+            except Empty:
+                self._check_workers()
+                if self._closed and not any(w.is_alive() for w in self.workers):
+                    return
+                continue
+            if message is None:
+                self._check_workers()
+                return
+
+            kind, job_id, name, value = message
+            if kind == "start":
+                self._running[name] = job_id
+                continue
+
+            self._running.pop(name, None)
+            with self._lock:
+                future = self._futures.pop(job_id, None)
+            if future is None:
+                continue
+            if kind == "error":
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+    def _check_workers(self):
+        """Fails the jobs of workers that have died.
+
+        When no worker is left, e.g. FEMM failed to start, every queued job is
+        failed too, as nothing would ever run it.
+        """
+        for worker in self.workers:
+            if worker.is_alive() or worker.name not in self._running:
+                continue
+            job_id = self._running.pop(worker.name)
+            with self._lock:
+                future = self._futures.pop(job_id, None)
+            if future is not None:
+                future.set_exception(
+                    RuntimeError(f"{worker.name} exited with {worker.exitcode}")
+                )
 
-        femm.openfemm(
-            winepath="/usr/bin/wine",
-            femmpath=self.dirname.name,
+        if any(worker.is_alive() for worker in self.workers):
+            return
+        exitcodes = ", ".join(
+            f"{worker.name} exited with {worker.exitcode}" for worker in self.workers
         )
-        femm.opendocument("../cw1.fem")
-
-        with tempfile.NamedTemporaryFile(suffix=".fem", dir=self.dirname.name) as file:
-            file.close()
-            femm.mi_saveas(file.name)
-
-        setup()
-
-    def run(self):
-        """Loop to run all the qued items."""
-        for data in iter(self.queue.get, None):
-            self.out_queue.put(self.loop(data))
-
-    def __del__(self):
-        print("Deleting")
-        self.dirname.cleanup()
-        femm.closefemm()
+        with self._lock:
+            self._dead = exitcodes
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            future.set_exception(RuntimeError(f"No FEMM workers are left: {exitcodes}"))
+
+    def __enter__(self) -> "FEMMPool":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+        self.join()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Runs a whole sweep inside of FEMM as one generated Lua script.
+
+Every operating point normally takes around eight round trips between Python
+and FEMM. The sweep compiler writes all of them into a single Lua script that
+FEMM runs in one call, writing the extracted quantities into a results file
+that is parsed in bulk.
+
+Warm started sweeps save the document under two names in turn, so every point
+can start from the solution of the point before without overwriting it.
+"""
+import multiprocessing
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+import numpy as np
+
+from lib import (
+    PREVIOUS_TYPE,
+    OperatingPoint,
+    Quantity,
+    analyze,
+    current_cache,
+    femm,
+    femm_path,
+    keep_solution,
+    mesh_state,
+    model_hash,
+    previous_solution,
+    set_previous,
+    working_file,
+)
+from tracing import traced
+
+# Quantities measured around the analysis instead of read from the solution
+PER_POINT_QUANTITIES = ("iterations", "analysis_time")
+# Names the document is saved under in turn by warm started sweeps
+WARM_DOCUMENTS = ("warm_0.fem", "warm_1.fem")
+
+
+@dataclass(frozen=True)
+class WarmStart:
+    """How a compiled sweep starts every point from the one before.
+
+    :param documents: The two names the document is saved under in turn, as
+        seen by FEMM.
+    :param document: The name to save the document under after the sweep.
+    :param previous: The solution the first point can start from and its mesh
+        setting, as seen by FEMM.
+    """
+
+    documents: tuple[str, str]
+    document: str
+    previous: tuple[str, int] | None = None
+
+
+def quantity_size(quantity: Quantity) -> int:
+    """Gets the amount of numbers a quantity is written as.
+
+    :param quantity: The quantity, see :func:`lib.solve`.
+    :returns: The amount of numbers.
+    """
+    match quantity:
+        case "torque" | "elements":
+            return 1
+        case "flux":
+            return 3
+        case "circuits":
+            return 9
+        case ("gapb", _) | ("b", _, _):
+            return 2
+    raise ValueError(f"Unknown quantity: {quantity}")
+
+
+def _lua_extract(quantity: Quantity) -> list[str]:
+    """Gets the Lua statements that write a quantity to the results file.
+
+    :param quantity: The quantity, see :func:`lib.solve`.
+    :returns: The Lua statements.
+    """
+    match quantity:
+        case "torque":
+            return ['write(handle, " ", mo_gapintegral("Sliding Boundary", 0))']
+        case "elements":
+            return ['write(handle, " ", mo_numelements())']
+        case "flux":
+            return [
+                f'i, v, f = mo_getcircuitproperties("{circuit}")\n'
+                'write(handle, " ", f)'
+                for circuit in "ABC"
+            ]
+        case "circuits":
+            return [
+                f'i, v, f = mo_getcircuitproperties("{circuit}")\n'
+                'write(handle, " ", i, " ", v, " ", f)'
+                for circuit in "ABC"
+            ]
+        case ("gapb", angle):
+            return [
+                f'br, bt = mo_getgapb("Sliding Boundary", {angle!r})\n'
+                'write(handle, " ", br, " ", bt)'
+            ]
+        case ("b", x, y):
+            return [f'bx, by = mo_getb({x!r}, {y!r})\nwrite(handle, " ", bx, " ", by)']
+    raise ValueError(f"Unknown quantity: {quantity}")
+
+
+def compile_sweep(
+    points: Sequence[OperatingPoint],
+    quantities: Sequence[tuple[Quantity, ...]],
+    results_file: str,
+    warm: WarmStart | None = None,
+) -> str:
+    """Compiles the operating points into a Lua script.
+
+    Each line of the results file has the index of the point followed by the
+    numbers of every quantity. Like :func:`lib.analyze` a warm started point
+    only starts from the solution before it if the mesh is the same.
+
+    :param points: The operating points to solve.
+    :param quantities: The quantities to extract from the solution of each point.
+    :param results_file: The results file as seen by FEMM.
+    :param warm: Starts every point from the solution of the one before.
+    :returns: The Lua script.
+    """
+    lines = [f'handle = openfile("{results_file}", "w")']
+    mesh = None
+    previous = None if warm is None else warm.previous
+    for index, (point, point_quantities) in enumerate(zip(points, quantities)):
+        lines.append(f"-- Point {index}")
+        for circuit, current in zip("ABC", point.currents):
+            lines.append(f'mi_modifycircprop("{circuit}", 1, {float(current)!r})')
+        if point.rotor_angle is not None:
+            angle = float(point.rotor_angle)
+            lines.append(f'mi_modifyboundprop("Sliding Boundary", 10, {angle!r})')
+        if mesh_state(point.mesh) != mesh:
+            mesh = mesh_state(point.mesh)
+            lines.append(f"smartmesh({mesh})")
+        if warm is not None:
+            document = warm.documents[index % 2]
+            start = previous[0] if previous is not None and previous[1] == mesh else ""
+            lines.append(f'mi_setprevious("{start}", {PREVIOUS_TYPE})')
+            lines.append(f'mi_saveas("{document}")')
+            previous = (os.path.splitext(document)[0] + ".ans", mesh)
+
+        lines.extend(["mi_analyze(1)", "mi_loadsolution()", f"write(handle, {index})"])
+        for quantity in point_quantities:
+            lines.extend(_lua_extract(quantity))
+        lines.extend(['write(handle, "\\n")', "mo_close()"])
+    if warm is not None:
+        lines.append(f'mi_setprevious("", {PREVIOUS_TYPE})')
+        lines.append(f'mi_saveas("{warm.document}")')
+    lines.append("closefile(handle)")
+    return "\n".join(lines) + "\n"
+
+
+def parse_results(
+    results_file: str, quantities: Sequence[tuple[Quantity, ...]]
+) -> list[dict[Quantity, Any]]:
+    """Parses the results file written by a compiled sweep.
+
+    :param results_file: The location of the results file.
+    :param quantities: The quantities extracted from the solution of each point.
+    :returns: The value of each quantity for every point, see :func:`lib.solve`.
+    """
+    with open(results_file, encoding="utf-8") as file:
+        rows = [line.split() for line in file if line.strip()]
+    if len(rows) != len(quantities):
+        raise RuntimeError(f"FEMM solved {len(rows)} of {len(quantities)} points")
+
+    output: list[dict[Quantity, Any]] = [{} for _ in quantities]
+    for row in rows:
+        index = int(float(row[0]))
+        numbers = np.array(row[1:], dtype=float).tolist()
+        values = output[index]
+        column = 0
+        for quantity in quantities[index]:
+            size = quantity_size(quantity)
+            item = tuple(numbers[column : column + size])
+            column += size
+            match quantity:
+                case "torque" | "elements":
+                    values[quantity] = item[0]
+                case "circuits":
+                    values[quantity] = (item[0:3], item[3:6], item[6:9])
+                case _:
+                    values[quantity] = item
+    return output
+
+
+def runs_as_script(quantities: Sequence[tuple[Quantity, ...]]) -> bool:
+    """Checks if points are solved as one Lua script by :func:`run_sweep_script`.
+
+    :param quantities: The quantities to extract from the solution of each point.
+    :returns: If the backend runs Lua and none of the quantities are measured
+        around the analysis.
+    """
+    measured = any(
+        quantity in PER_POINT_QUANTITIES
+        for point_quantities in quantities
+        for quantity in point_quantities
+    )
+    return bool(getattr(femm, "SUPPORTS_LUA", True)) and not measured
+
+
+@traced()
+def run_sweep_script(
+    points: Sequence[OperatingPoint],
+    quantities: Sequence[tuple[Quantity, ...]],
+    warm_start: bool = False,
+) -> list[dict[Quantity, Any]]:
+    """Solves the points in the opened document using a single Lua script.
+
+    Backends that cannot run Lua solve the points one at a time instead, as do
+    sweeps measuring the iterations or time of every analysis, which are only
+    known outside of FEMM. The solution of the last point of a warm started
+    sweep is kept to start the next sweep from.
+
+    :param points: The operating points to solve.
+    :param quantities: The quantities to extract from the solution of each point.
+    :param warm_start: Starts every point from the solution of the one before,
+        see :func:`lib.analyze`.
+    :returns: The value of each quantity for every point.
+    """
+    logger = multiprocessing.get_logger()
+    document = working_file()
+    if not runs_as_script(quantities) or (warm_start and document is None):
+        logger.debug("Solving %s points one at a time", len(points))
+        return [
+            analyze(point, point_quantities, warm_start)
+            for point, point_quantities in zip(points, quantities)
+        ]
+
+    set_previous(None)
+    with tempfile.TemporaryDirectory() as dirname:
+        script_file = os.path.join(dirname, "sweep.lua")
+        results_file = os.path.join(dirname, "results.txt")
+        documents = [os.path.join(dirname, name) for name in WARM_DOCUMENTS]
+        warm = None
+        if warm_start:
+            previous = previous_solution()
+            warm = WarmStart(
+                (femm_path(documents[0]), femm_path(documents[1])),
+                femm_path(document),
+                None if previous is None else (femm_path(previous[0]), previous[1]),
+            )
+        with open(script_file, "w", encoding="utf-8") as file:
+            file.write(compile_sweep(points, quantities, femm_path(results_file), warm))
+
+        logger.debug("Running Lua sweep of %s points", len(points))
+        femm.callfemm(f'dofile("{femm_path(script_file)}")')
+        if warm_start and points:
+            last = documents[(len(points) - 1) % 2]
+            keep_solution(
+                mesh_state(points[-1].mesh), os.path.splitext(last)[0] + ".ans"
+            )
+        return parse_results(results_file, quantities)
+
+
+def solve_batch(
+    points: Sequence[OperatingPoint],
+    quantities: tuple[Quantity, ...] | list[tuple[Quantity, ...]] = ("torque",),
+    warm_start: bool = False,
+) -> list[dict[Quantity, Any]]:
+    """Solves many operating points in the opened document at once.
+
+    This gives the same results as calling :func:`lib.solve` for every point,
+    including the use of the solve cache, but the quantities missing from the
+    cache are solved for all the points in one FEMM call.
+
+    :param points: The operating points to solve.
+    :param quantities: The quantities to extract from every solution, or a list
+        with the quantities of each point.
+    :param warm_start: Starts every solved point from the solution of the one
+        solved before it.
+    :returns: The value of each quantity for every point.
+    """
+    points = list(points)
+    if isinstance(quantities, tuple):
+        quantities = [quantities] * len(points)
+    if len(quantities) != len(points):
+        raise ValueError("The quantities of every point are needed")
+
+    cache = current_cache()
+    output: list[dict[Quantity, Any]] = [{} for _ in points]
+    current_model = ""
+    if cache is not None:
+        current_model = model_hash()
+        for index, point in enumerate(points):
+            output[index] = cache.get_values(current_model, point, quantities[index])
+
+    # Only the quantities that are not cached are solved
+    needed = [
+        tuple(quantity for quantity in point_quantities if quantity not in values)
+        for values, point_quantities in zip(output, quantities)
+    ]
+    missing = [index for index, point_needed in enumerate(needed) if point_needed]
+    if missing:
+        solved = run_sweep_script(
+            [points[index] for index in missing],
+            [needed[index] for index in missing],
+            warm_start,
+        )
+        for index, values in zip(missing, solved):
+            output[index].update(values)
+            if cache is not None:
+                cache.put_values(current_model, points[index], values)
+
+    return [
+        {quantity: values[quantity] for quantity in point_quantities}
+        for values, point_quantities in zip(output, quantities)
+    ]
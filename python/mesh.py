@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Mesh settings of the models and the setting recorded for each of them.
+
+A :class:`MeshSetting` sets the mesh size of every block label, by material or
+for the whole model, the angle of the mesh elements on the arcs of the air gap
+and if FEMM refines the mesh with ``smartmesh``. The convergence study of
+:mod:`mesh_study` records the coarsest adequate setting of a model in
+``MESH_SETTINGS``, keyed by the backend and the hash of the document.
+
+:func:`meshed_document` gives the document with its recorded setting applied,
+which :class:`lib.FEMMPool` workers open instead of the document itself, so
+every sweep of a studied model uses its recorded mesh without any changes to the
+tasks. Variants prepared from a studied document inherit its setting, see
+:func:`inherit`.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Any, Sequence
+
+from fem import FemDocument
+
+# Mesh setting recorded for every studied model
+MESH_SETTINGS = "../dist/mesh_settings.json"
+# Directory of the documents with a recorded setting applied
+MESH_DIR = "../dist/meshes"
+# Boundaries of the arcs in the air gap
+AIRGAP_BOUNDARIES = ("Sliding Boundary",)
+# Version of the settings and meshed copies, changed when apply_mesh writes
+# them differently so the models are studied again
+MESH_VERSION = 2
+
+# Hashes of the documents by location, size and modification time
+_HASHES: dict[tuple[str, int, int], str] = {}
+# Recorded settings by the modification time of MESH_SETTINGS
+_SETTINGS: dict[str, Any] = {}
+
+
+@dataclass(frozen=True)
+class MeshSetting:
+    """The mesh of a model.
+
+    :param name: The name of the setting.
+    :param size: The mesh size of every block in mm, ``None`` lets FEMM choose
+        it.
+    :param regions: The mesh size of the blocks of a material in mm as
+        ``(material, size)``, in place of ``size``.
+    :param airgap: The maximum angle of a mesh element on the arcs of the air
+        gap in degrees, ``None`` keeps the angle of the document.
+    :param smartmesh: If FEMM refines the mesh, see ``femm.smartmesh``.
+    """
+
+    name: str
+    size: float | None = None
+    regions: tuple[tuple[str, float | None], ...] = ()
+    airgap: float | None = None
+    smartmesh: int = 1
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> "MeshSetting":
+        """Creates a setting from the values of :func:`dataclasses.asdict`."""
+        regions = tuple((str(name), size) for name, size in values["regions"])
+        return cls(**{**values, "regions": regions})
+
+    def digest(self) -> str:
+        """Gets a short hash of the setting."""
+        return hashlib.sha256(repr(self).encode()).hexdigest()[:16]
+
+
+def apply_mesh(document: FemDocument, setting: MeshSetting):
+    """Sets the mesh of a document.
+
+    :param document: The document to edit.
+    :param setting: The mesh setting.
+    """
+    materials = [prop.name for prop in document.properties["BlockProps"]]
+    boundaries = [prop.name for prop in document.properties["BdryProps"]]
+    regions = dict(setting.regions)
+    for label in document.labels:
+        if label.block <= 0:
+            continue
+        size = regions.get(materials[label.block - 1], setting.size)
+        label.mesh_size = -1 if size is None else size
+
+    if setting.airgap is not None:
+        for arc in document.arcs:
+            if arc.boundary and boundaries[arc.boundary - 1] in AIRGAP_BOUNDARIES:
+                arc.max_segment = setting.airgap
+
+
+def document_hash(document: str) -> str:
+    """Gets the hash of a document file.
+
+    :param document: The location of the document.
+    :returns: The hex digest of its content.
+    """
+    stat = os.stat(document)
+    key = (os.path.abspath(document), stat.st_size, stat.st_mtime_ns)
+    if key not in _HASHES:
+        with open(document, "rb") as file:
+            _HASHES[key] = hashlib.sha256(file.read()).hexdigest()
+    return _HASHES[key]
+
+
+def model_key(document: str, backend: str) -> str:
+    """Gets the key of the recorded setting of a document.
+
+    :param document: The location of the document.
+    :param backend: The FEMM backend the setting was studied with.
+    :returns: The key.
+    """
+    return f"{backend}:v{MESH_VERSION}:{document_hash(document)}"
+
+
+def load_settings(path: str = MESH_SETTINGS) -> dict[str, Any]:
+    """Loads the recorded settings, reloading them only when they change.
+
+    :param path: The location of the recorded settings.
+    :returns: The record of every model by its key.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _SETTINGS.get("key") != (path, mtime):
+        with open(path, encoding="utf-8") as file:
+            _SETTINGS.update(key=(path, mtime), records=json.load(file))
+    return _SETTINGS["records"]
+
+
+def _save_settings(records: dict[str, Any], path: str):
+    """Replaces the recorded settings at once, so readers never see half."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=os.path.dirname(path) or ".", suffix=".json", delete=False
+    ) as file:
+        json.dump(records, file, indent=2, sort_keys=True)
+    os.replace(file.name, path)
+
+
+def recorded_setting(
+    document: str, backend: str, path: str = MESH_SETTINGS
+) -> MeshSetting | None:
+    """Gets the recorded mesh setting of a document.
+
+    :param document: The location of the document.
+    :param backend: The FEMM backend.
+    :param path: The location of the recorded settings.
+    :returns: The setting, ``None`` if the document was not studied.
+    """
+    records = load_settings(path)
+    if not records:
+        return None
+    record = records.get(model_key(document, backend))
+    return None if record is None else MeshSetting.from_dict(record["setting"])
+
+
+def record_setting(
+    document: str,
+    setting: MeshSetting,
+    backend: str,
+    path: str = MESH_SETTINGS,
+    **stats: Any,
+):
+    """Records the mesh setting of a document.
+
+    :param document: The location of the document.
+    :param setting: The mesh setting.
+    :param backend: The FEMM backend the setting was studied with.
+    :param path: The location of the recorded settings.
+    :param stats: Values saved with the setting, e.g. the errors of the study.
+    """
+    records = dict(load_settings(path))
+    records[model_key(document, backend)] = {
+        "document": document,
+        "setting": asdict(setting),
+        **stats,
+    }
+    _save_settings(records, path)
+
+
+def inherit(
+    document: str, variants: Sequence[str], backend: str, path: str = MESH_SETTINGS
+):
+    """Records the mesh setting of a document for the variants made from it.
+
+    :param document: The location of the document.
+    :param variants: The locations of the variant documents.
+    :param backend: The FEMM backend.
+    :param path: The location of the recorded settings.
+    """
+    records = load_settings(path)
+    record = records.get(model_key(document, backend))
+    if record is None:
+        return
+    records = dict(records)
+    for variant in variants:
+        records[model_key(variant, backend)] = {
+            "document": variant,
+            "setting": record["setting"],
+            "inherited_from": record["document"],
+        }
+    _save_settings(records, path)
+
+
+def meshed_document(
+    document: str, backend: str, path: str = MESH_SETTINGS, mesh_dir: str = MESH_DIR
+) -> tuple[str, int]:
+    """Gets the document with its recorded mesh setting applied.
+
+    The meshed copy is written once to ``mesh_dir`` and reused by every worker.
+
+    :param document: The location of the document.
+    :param backend: The FEMM backend.
+    :param path: The location of the recorded settings.
+    :param mesh_dir: The directory of the meshed copies.
+    :returns: The location of the document to open and the ``smartmesh`` state,
+        the document itself and 1 if the document was not studied.
+    """
+    setting = recorded_setting(document, backend, path)
+    if setting is None:
+        return document, 1
+
+    name = f"{document_hash(document)[:16]}-{setting.digest()}-v{MESH_VERSION}.fem"
+    output = os.path.join(mesh_dir, name)
+    if not os.path.exists(output):
+        meshed = FemDocument.read(document)
+        apply_mesh(meshed, setting)
+        os.makedirs(mesh_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=mesh_dir, suffix=".fem", delete=False
+        ) as file:
+            file.write(meshed.format())
+        os.replace(file.name, output)
+    return output, setting.smartmesh
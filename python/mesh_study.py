@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Mesh convergence study picking the cheapest adequate mesh of a model.
+
+A few representative operating points, without current and at the rated current
+over a slot pitch, are solved with every mesh setting of ``SETTINGS``. The
+torque, flux linkage and air gap flux density of every setting are compared to
+the finest setting, and the setting with the fewest mesh elements whose errors
+are all within ``TOLERANCES`` is recorded for the model, see :mod:`mesh`. Every
+later sweep of the model then uses the recorded setting.
+
+The errors, mesh elements and analysis times of every setting are saved to
+``../dist/mesh_study.json``. The study has to be run again after the document
+changes, as the setting is recorded for the content of the document.
+"""
+import json
+import logging
+import multiprocessing
+import os
+from dataclasses import asdict, replace
+from typing import Any, Sequence
+
+import numpy as np
+
+from lib import FEMM_BACKEND, I_PEAK, MIDDLE
+from mesh import MeshSetting, apply_mesh, record_setting
+from spec import Sweep, SweepSpec, run_spec
+
+# Document of the model to study
+DOCUMENT = "../dist/cw1_sliding.fem"
+# Directory of the documents of every setting
+STUDY_DIR = "../dist/mesh_study"
+# Mesh settings of the study, the first is the reference
+SETTINGS = (
+    MeshSetting("reference", size=0.5, airgap=0.25),
+    MeshSetting("global 1 mm", size=1, airgap=0.5),
+    MeshSetting("global 1.5 mm", size=1.5, airgap=1),
+    MeshSetting("global 2 mm", size=2, airgap=1),
+    MeshSetting("global 4 mm", size=4, airgap=2),
+    MeshSetting("fine air gap", size=4, regions=(("Air", 1), ("N42", 1)), airgap=0.5),
+    MeshSetting("smartmesh", smartmesh=1),
+    MeshSetting("automatic", smartmesh=0),
+    MeshSetting("global 1 mm without smartmesh", size=1, airgap=0.5, smartmesh=0),
+    MeshSetting("global 2 mm without smartmesh", size=2, airgap=1, smartmesh=0),
+)
+# Largest error relative to the largest value of the reference
+TOLERANCES = {"torque": 0.01, "flux": 0.01, "gapb": 0.01}
+# Representative operating points, the rotor turns a slot pitch
+STUDY_SWEEP = Sweep(
+    "mesh",
+    steps=(0, 5, 10, 15),
+    currents=(0, I_PEAK),
+    load_angle=(77, 2),
+    rotor_angle=(23.1, 1),
+    quantities=("torque", "flux", ("gapb", MIDDLE), "elements", "analysis_time"),
+)
+
+
+def relative_error(values: np.ndarray, reference: np.ndarray) -> float:
+    """Gets the largest error relative to the largest value of the reference.
+
+    :param values: The values of a setting.
+    :param reference: The values of the reference setting.
+    :returns: The relative error.
+    """
+    scale = np.max(np.abs(reference))
+    if scale == 0:
+        return 0.0
+    return float(np.max(np.abs(values - reference)) / scale)
+
+
+def solve_settings(
+    document: str, settings: Sequence[MeshSetting], processes: int | None = None
+) -> dict[str, dict[str, np.ndarray]]:
+    """Solves the representative points with every mesh setting.
+
+    The settings are solved in one specification for every ``smartmesh``
+    state, as it is set for a whole sweep.
+
+    :param document: The document of the model.
+    :param settings: The mesh settings.
+    :param processes: The amount of workers.
+    :returns: The values of every quantity by the name of the setting.
+    """
+    groups: dict[int, list[MeshSetting]] = {}
+    for setting in settings:
+        groups.setdefault(setting.smartmesh, []).append(setting)
+
+    values = {}
+    for smartmesh, group in groups.items():
+        spec = SweepSpec(
+            document,
+            [replace(STUDY_SWEEP, mesh=smartmesh)],
+            variants=group,
+            prepare=apply_mesh,
+            variant_dir=STUDY_DIR,
+            variant_name=f"smartmesh_{smartmesh}_{{index}}",
+            inherit_mesh=False,
+        )
+        result = run_spec(spec, processes=processes)
+        for index, setting in enumerate(group):
+            values[setting.name] = {
+                name: result.get(STUDY_SWEEP.name, name)[index]
+                for name in ("torque", "flux", "gapb", "elements", "analysis_time")
+            }
+    return values
+
+
+def run_study(
+    document: str = DOCUMENT,
+    settings: Sequence[MeshSetting] = SETTINGS,
+    tolerances: dict[str, float] | None = None,
+    processes: int | None = None,
+) -> dict[str, Any]:
+    """Finds and records the coarsest adequate mesh setting of a model.
+
+    :param document: The document of the model.
+    :param settings: The mesh settings, the first is the reference.
+    :param tolerances: The largest relative error of every quantity.
+    :param processes: The amount of workers.
+    :returns: The chosen setting and the errors, mean mesh elements and mean
+        analysis time of every setting.
+    """
+    logger = multiprocessing.get_logger()
+    tolerances = tolerances or TOLERANCES
+    values = solve_settings(document, settings, processes)
+    reference = values[settings[0].name]
+
+    study = {}
+    for setting in settings:
+        setting_values = values[setting.name]
+        errors = {
+            name: relative_error(setting_values[name], reference[name])
+            for name in tolerances
+        }
+        study[setting.name] = {
+            "setting": asdict(setting),
+            "errors": errors,
+            "adequate": all(errors[name] <= tolerances[name] for name in tolerances),
+            "elements": float(np.nanmean(setting_values["elements"])),
+            "analysis_time": float(np.nanmean(setting_values["analysis_time"])),
+        }
+        logger.info(
+            "%s: %.0f elements, %.3f s, errors %s",
+            setting.name,
+            study[setting.name]["elements"],
+            study[setting.name]["analysis_time"],
+            ", ".join(f"{name} {error:.2%}" for name, error in errors.items()),
+        )
+
+    chosen = min(
+        (setting for setting in settings if study[setting.name]["adequate"]),
+        key=lambda setting: (
+            study[setting.name]["elements"],
+            study[setting.name]["analysis_time"],
+        ),
+    )
+    stats = study[chosen.name]
+    record_setting(
+        document,
+        chosen,
+        FEMM_BACKEND,
+        errors=stats["errors"],
+        elements=stats["elements"],
+        analysis_time=stats["analysis_time"],
+        tolerances=tolerances,
+    )
+    logger.info("Recorded mesh setting %s for %s", chosen.name, document)
+    return {"document": document, "chosen": chosen.name, "settings": study}
+
+
+if __name__ == "__main__":
+    logger = multiprocessing.log_to_stderr(logging.INFO)
+
+    os.makedirs("../dist", exist_ok=True)
+    with open("../dist/mesh_study.json", "w", encoding="utf-8") as file:
+        json.dump(run_study(), file, indent=2)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Performance metrics of the machine computed for many variants at once.
+
+Every function works along the angle axis of arrays shaped
+``(..., angles)``, or ``(..., angles, 3)`` for the three phases, usually
+``(variants, angles, 3)``, so all the variants of a sweep are processed in one
+call instead of a Python loop.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from lib import POLES, RPM
+
+
+@dataclass
+class MachineMetrics:
+    """The metrics of every variant, see :func:`machine_metrics`."""
+
+    # pylint: disable=too-many-instance-attributes
+    emf: np.ndarray
+    emf_time: np.ndarray
+    line_emf: np.ndarray
+    k_m: np.ndarray
+    phase_angles: np.ndarray
+    mean_torque: np.ndarray | None = None
+    peak_torque: np.ndarray | None = None
+    ripple: np.ndarray | None = None
+
+
+def step_time(step: float = 1, rpm: float = RPM) -> float:
+    """Gets the time the rotor takes to turn a step.
+
+    :param step: The step in mechanical degrees.
+    :param rpm: The mechanical speed of the rotor.
+    :returns: The time in seconds.
+    """
+    return step * 60 / (rpm * 360)
+
+
+def back_emf(
+    flux: np.ndarray, scale: float = 1, step: float = 1, rpm: float = RPM
+) -> np.ndarray:
+    """Gets the back EMF from the flux linkage of the rotor angles.
+
+    The EMF is the difference of consecutive angles, so it is one angle shorter
+    and lies half of a step after each angle, see :func:`emf_time`.
+
+    :param flux: The flux linkage with a shape of ``(..., angles, 3)``.
+    :param scale: The multiplier from the model to the full machine, see
+        :attr:`geometry.MachineDimensions.scale`.
+    :param step: The step between the rotor angles in mechanical degrees.
+    :param rpm: The mechanical speed of the rotor.
+    :returns: The EMF with a shape of ``(..., angles - 1, 3)``.
+    """
+    return scale * np.diff(flux, axis=-2) / step_time(step, rpm)
+
+
+def emf_time(count: int, step: float = 1, rpm: float = RPM) -> np.ndarray:
+    """Gets the time of the values of :func:`back_emf`.
+
+    :param count: The amount of rotor angles the flux was solved at.
+    :param step: The step between the rotor angles in mechanical degrees.
+    :param rpm: The mechanical speed of the rotor.
+    :returns: The time of every EMF value in seconds.
+    """
+    dt = step_time(step, rpm)
+    return np.arange(1, count) * dt - dt / 2
+
+
+def line_voltages(phase: np.ndarray) -> np.ndarray:
+    """Gets the line-to-line voltages of the phase voltages.
+
+    :param phase: The voltages of phase A, B and C with a shape of
+        ``(..., 3)``.
+    :returns: The voltages of A to C, B to A and C to B, so the first one is
+        ``Va - Vc`` like the tasks use.
+    """
+    return phase - np.roll(phase, 1, axis=-1)
+
+
+def k_m(emf: np.ndarray, rpm: float = RPM) -> np.ndarray:
+    """Gets the EMF constant from the peak EMF of every phase.
+
+    :param emf: The EMF with a shape of ``(..., angles, 3)``.
+    :param rpm: The mechanical speed of the rotor.
+    :returns: The EMF constant in V s/rad with a shape of ``(...)``.
+    """
+    return emf.max(axis=(-2, -1)) / (rpm * 2 * np.pi / 60)
+
+
+def phase_angles(
+    values: np.ndarray, angles: np.ndarray, pole_pairs: int = POLES // 2
+) -> np.ndarray:
+    """Gets the electrical angle of the fundamental of every phase.
+
+    The angles are relative to phase A, so a balanced machine gives 0, -120 and
+    120 or 0, 120 and -120 depending on the phase sequence.
+
+    :param values: The values of the phases with a shape of
+        ``(..., angles, 3)``, covering whole electrical periods.
+    :param angles: The mechanical angle of every value in degrees.
+    :param pole_pairs: The pole pairs of the machine.
+    :returns: The angles in degrees between -180 and 180 with a shape of
+        ``(..., 3)``.
+    """
+    rotation = np.exp(-1j * pole_pairs * np.radians(np.asarray(angles)))
+    phasors = np.einsum("...ap,a->...p", values, rotation)
+    relative = phasors / phasors[..., :1]
+    return np.degrees(np.angle(relative))
+
+
+def mag(b_values: tuple[ArrayLike, ArrayLike] | np.ndarray) -> np.ndarray:
+    """Finds the magnitude of the B field.
+
+    :param b_values: The x and y components, arrays of any shape.
+    :returns: The magnitude with the shape of a component.
+    """
+    return np.sqrt(np.asarray(b_values[0]) ** 2 + np.asarray(b_values[1]) ** 2)
+
+
+def torque_ripple(torque: np.ndarray) -> np.ndarray:
+    """Gets the peak-to-peak torque ripple relative to the mean torque.
+
+    :param torque: The torque with a shape of ``(..., angles)``.
+    :returns: The ripple in percent with a shape of ``(...)``.
+    """
+    mean = np.abs(torque.mean(axis=-1))
+    spread = np.ptp(torque, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(mean > 0, 100 * spread / mean, np.inf)
+
+
+def ripple_amplitude(torque: np.ndarray) -> np.ndarray:
+    """Gets the amplitude of the torque ripple the way the tasks report it.
+
+    :param torque: The torque with a shape of ``(..., angles)``.
+    :returns: The peak absolute torque minus the mean torque with a shape of
+        ``(...)``.
+    """
+    return np.abs(torque).max(axis=-1) - torque.mean(axis=-1)
+
+
+def peak_above_mean(torque: np.ndarray) -> np.ndarray:
+    """Gets how far the torque rises above its mean, as the task plots show it.
+
+    :param torque: The torque with a shape of ``(..., angles)``.
+    :returns: The peak torque minus the mean torque with a shape of ``(...)``.
+    """
+    return torque.max(axis=-1) - torque.mean(axis=-1)
+
+
+def machine_metrics(
+    flux: np.ndarray,
+    torque: np.ndarray | None = None,
+    scale: float = 1,
+    step: float = 1,
+    rpm: float = RPM,
+    pole_pairs: int = POLES // 2,
+) -> MachineMetrics:
+    """Gets every metric of the machine in one call.
+
+    :param flux: The flux linkage with the rotor turning, with a shape of
+        ``(..., angles, 3)`` and the first angle at 0°.
+    :param torque: The torque with a shape of ``(..., angles)``, if it was
+        solved.
+    :param scale: The multiplier from the flux of the model to the full
+        machine.
+    :param step: The step between the rotor angles in mechanical degrees.
+    :param rpm: The mechanical speed of the rotor.
+    :param pole_pairs: The pole pairs of the machine.
+    :returns: The metrics.
+    """
+    flux = np.asarray(flux)
+    emf = back_emf(flux, scale, step, rpm)
+    angles = np.arange(flux.shape[-2]) * step
+    metrics = MachineMetrics(
+        emf,
+        emf_time(flux.shape[-2], step, rpm),
+        line_voltages(emf),
+        k_m(emf, rpm),
+        phase_angles(flux, angles, pole_pairs),
+    )
+    if torque is not None:
+        torque = np.asarray(torque)
+        metrics.mean_torque = torque.mean(axis=-1)
+        metrics.peak_torque = np.abs(torque).max(axis=-1)
+        metrics.ripple = torque_ripple(torque)
+    return metrics
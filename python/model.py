@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Compiles FEMM models from a DXF drawing and a table of assignments.
+
+The geometry of the drawing is imported like ``mi_readdxf`` and the materials,
+circuits, boundaries, groups and block labels of a :class:`ModelSpec` are
+assigned in one pass, so the ``.fem`` file is written without FEMM.
+"""
+import math
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterator, Sequence
+
+from fem import FemDocument, read_materials
+
+# The materials of the models, copied from the matlib.dat library of FEMM 4.2,
+# FEMM_MATLIB sets another library, e.g. the one of the FEMM installation
+MATERIAL_LIBRARY = os.environ.get("FEMM_MATLIB", "../materials.dat")
+
+# Distance to join the end points of a drawing at, relative to its size
+DXF_TOLERANCE = 1e-5
+# Group codes of the points, radius and angles of the lines, arcs and circles
+GEOMETRY_CODES = ("10", "20", "11", "21", "40", "50", "51")
+
+
+@dataclass(frozen=True)
+class Boundary:
+    """A boundary property and the lines it is set on.
+
+    :param name: The name of the boundary.
+    :param boundary_type: The FEMM boundary type, see
+        :meth:`fem.FemDocument.add_boundary`.
+    :param segments: Coordinates of the line segments, the closest segment to
+        each is used.
+    :param arcs: Coordinates of the arc segments, the closest arc to each is
+        used.
+    :param max_segment: The maximum angle of a mesh element on the arcs.
+    """
+
+    name: str
+    boundary_type: int = 0
+    segments: Sequence[tuple[float, float]] = ()
+    arcs: Sequence[tuple[float, float]] = ()
+    max_segment: float | None = None
+
+
+@dataclass(frozen=True)
+class Label:
+    """A block label, see :meth:`fem.FemDocument.set_block`."""
+
+    # pylint: disable=too-many-instance-attributes
+    x: float
+    y: float
+    material: str
+    circuit: str = ""
+    magdir: float = 0
+    group: int = 0
+    turns: int = 0
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """The drawing of a model and everything assigned to it.
+
+    :param dxf: The location of the DXF drawing, ``None`` for a model drawn
+        by its geometry function.
+    :param materials: The names of the materials in the material library.
+    :param circuits: The names of the series circuits.
+    :param boundaries: The boundaries, in the order they are set.
+    :param groups: The radius and group of circles around the origin, every
+        line inside of the circle is put into the group.
+    :param labels: The block labels.
+    :param depth: The depth of the model in millimeters.
+    :param library: The location of the material library.
+    :param geometry: Picklable function that draws the geometry of the model.
+    """
+
+    dxf: str | None
+    materials: Sequence[str] = ()
+    circuits: Sequence[str] = ()
+    boundaries: Sequence[Boundary] = ()
+    groups: Sequence[tuple[float, int]] = ()
+    labels: Sequence[Label] = ()
+    depth: float = 100
+    library: str = MATERIAL_LIBRARY
+    geometry: Callable[[FemDocument], None] | None = None
+
+
+def read_dxf(path: str) -> Iterator[tuple[str, dict[int, float]]]:
+    """Reads the entities of a DXF drawing.
+
+    :param path: The location of the drawing.
+    :returns: The type and the numeric group codes of every entity.
+    """
+    with open(path, encoding="utf-8", errors="replace") as file:
+        lines = [line.strip() for line in file]
+    pairs = zip(lines[::2], lines[1::2])
+
+    in_entities = False
+    entity: str | None = None
+    codes: dict[int, float] = {}
+    for code, value in pairs:
+        if code == "0":
+            if entity is not None:
+                yield entity, codes
+            entity, codes = None, {}
+            if value == "ENDSEC":
+                in_entities = False
+            elif in_entities:
+                entity = value
+        elif code == "2" and value == "ENTITIES":
+            in_entities = True
+        elif entity is not None and code in GEOMETRY_CODES:
+            codes.setdefault(int(code), float(value))
+
+
+def add_dxf(document: FemDocument, path: str, tolerance: float = DXF_TOLERANCE):
+    """Adds the lines, arcs and circles of a DXF drawing, like ``mi_readdxf``.
+
+    End points closer than the tolerance are joined into a single node. Every
+    end point is added before the lines, so lines are split at the end points of
+    the lines touching them.
+
+    :param document: The document to add to.
+    :param path: The location of the drawing.
+    :param tolerance: The distance to join end points at, relative to the
+        largest coordinate of the drawing.
+    """
+    lines = []
+    arcs = []
+    for entity, codes in read_dxf(path):
+        match entity:
+            case "LINE":
+                lines.append(
+                    (complex(codes[10], codes[20]), complex(codes[11], codes[21]))
+                )
+            case "ARC" | "CIRCLE":
+                center = complex(codes[10], codes[20])
+                start = codes.get(50, 0.0)
+                end = codes.get(51, 180.0)
+                span = (end - start) % 360 or 360
+                arcs.append((center, codes[40], start, start + span))
+                if entity == "CIRCLE":
+                    # Circles are imported as two half circles
+                    arcs.append((center, codes[40], 180.0, 360.0))
+
+    def polar(center: complex, radius: float, angle: float) -> complex:
+        return center + radius * complex(
+            math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        )
+
+    ends = [point for line in lines for point in line]
+    for center, radius, start, end in arcs:
+        ends.extend((polar(center, radius, start), polar(center, radius, end)))
+    distance = tolerance * max((abs(point) for point in ends), default=1)
+    nodes: list[complex] = []
+    for point in ends:
+        if all(abs(point - node) > distance for node in nodes):
+            nodes.append(point)
+            document.add_node(point.real, point.imag)
+
+    for start, end in lines:
+        document.add_segment(start.real, start.imag, end.real, end.imag)
+    for center, radius, start, end in arcs:
+        first, last = polar(center, radius, start), polar(center, radius, end)
+        document.add_arc(first.real, first.imag, last.real, last.imag, end - start, 1)
+
+
+def compile_model(spec: ModelSpec) -> FemDocument:
+    """Builds the document of a model.
+
+    :param spec: The model to build.
+    :returns: The document.
+    """
+    logger = multiprocessing.get_logger()
+    document = FemDocument.new(spec.depth)
+
+    if spec.dxf is not None:
+        logger.info("Importing %s", spec.dxf)
+        add_dxf(document, spec.dxf)
+    if spec.geometry is not None:
+        spec.geometry(document)
+    logger.debug(
+        "%s nodes, %s segments and %s arcs",
+        len(document.nodes),
+        len(document.segments),
+        len(document.arcs),
+    )
+
+    library = read_materials(spec.library)
+    for material in spec.materials:
+        document.add_material(library[material])
+    for circuit in spec.circuits:
+        document.add_circuit(circuit)
+
+    for boundary in spec.boundaries:
+        document.add_boundary(boundary.name, boundary.boundary_type)
+        for coords in boundary.segments:
+            segment = document.closest_segment(*coords)
+            document.set_segment_boundary(segment, boundary.name)
+        for coords in boundary.arcs:
+            arc = document.closest_arc(*coords)
+            document.set_arc_boundary(arc, boundary.name, boundary.max_segment)
+
+    for radius, group in spec.groups:
+        document.set_group(0, 0, radius, group)
+
+    for label in spec.labels:
+        index = document.add_label(label.x, label.y)
+        document.set_block(
+            index,
+            label.material,
+            label.circuit,
+            label.magdir,
+            label.group,
+            label.turns,
+        )
+    return document
+
+
+def build_model(spec: ModelSpec, output: str):
+    """Builds the document of a model and saves it.
+
+    :param spec: The model to build.
+    :param output: The location of the ``.fem`` file.
+    """
+    logger = multiprocessing.get_logger()
+    document = compile_model(spec)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    document.write(output)
+    logger.info("Saved %s", output)
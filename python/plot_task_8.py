@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """Script to plot Torque based on equivalent circuit."""
 import numpy as np
-import matplotlib.pyplot as plt
+
+from plotting import plt
 
 if __name__ == "__main__":
     angle = np.arange(360)
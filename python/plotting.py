@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Plotting imported only when it is used.
+
+Importing ``matplotlib.pyplot`` takes longer than starting a FEMM worker, and
+the workers of a sweep import the module of the script again without ever
+plotting. Scripts use the ``plt`` of this module instead, which imports
+``pyplot`` the first time one of its functions is called.
+
+The headless ``Agg`` backend is forced in worker processes, without a display
+and when the ``HEADLESS`` environment variable is 1, so ``plt.show`` never
+blocks a run that nobody is watching.
+"""
+import multiprocessing
+import os
+import sys
+from types import ModuleType
+from typing import Any
+
+# Force the headless backend even when a display is available
+HEADLESS = os.environ.get("HEADLESS", "0") == "1"
+
+
+def headless() -> bool:
+    """Checks if figures can only be saved and not shown."""
+    if HEADLESS or multiprocessing.parent_process() is not None:
+        return True
+    return sys.platform.startswith("linux") and not (
+        os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")
+    )
+
+
+def pyplot() -> ModuleType:
+    """Imports ``matplotlib.pyplot``, with the headless backend if needed.
+
+    :returns: The ``pyplot`` module.
+    """
+    # pylint: disable=import-outside-toplevel
+    if "matplotlib.pyplot" not in sys.modules and headless():
+        import matplotlib
+
+        matplotlib.use("Agg")
+    from matplotlib import pyplot as module
+
+    return module
+
+
+class LazyPyplot:
+    """Stand-in for ``matplotlib.pyplot`` that imports it on first use.
+
+    >>> from plotting import plt
+    >>> plt.plot([0, 1], [1, 0])  # pyplot is imported here
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(pyplot(), name)
+
+
+plt = LazyPyplot()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""Renders the figures of the report from the saved tables.
+
+Every figure is a :class:`FigureSpec` drawn from one or more tables, see
+:mod:`tables`. The figures are drawn on a bare ``matplotlib.figure.Figure`` in a
+process pool, so no interactive backend is ever loaded and nothing blocks
+waiting for a window. A figure is only rendered again when the hash of its spec
+and of its input tables changed since it was last rendered, the hashes are kept
+in ``MANIFEST``, so the report is regenerated in seconds after a single sweep.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from lib import worker_context
+from tables import load_table
+
+# Hashes of the inputs of every rendered figure
+MANIFEST = "../dist/report.json"
+# Formats every figure is saved in
+FORMATS = ("png", "svg")
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    """A figure of the report.
+
+    :param output: The location of the image without its extension.
+    :param tables: The locations of the tables the figure is drawn from.
+    :param draw: Picklable function that draws the tables on the axes, called
+        as ``draw(axes, *tables)``, see :func:`lines`.
+    :param title: The title of the figure.
+    :param xlabel: The label of the x-axis.
+    :param ylabel: The label of the y-axis.
+    """
+
+    output: str
+    tables: Sequence[str]
+    draw: Callable[..., None]
+    title: str = ""
+    xlabel: str = ""
+    ylabel: str = ""
+
+
+def _draw_lines(
+    axes: Any,
+    table: np.ndarray,
+    *,
+    x: str,
+    y: Sequence[str],
+    labels: Sequence[str],
+    xticks: bool,
+    marker: str | None,
+):
+    """Draws columns of a table against one of its columns, see :func:`lines`."""
+    # pylint: disable=too-many-arguments
+    for index, name in enumerate(y):
+        label = labels[index] if labels else None
+        axes.plot(table[x], table[name], marker=marker, label=label)
+    axes.set_xlim(table[x].min(), table[x].max())
+    if xticks:
+        axes.set_xticks(table[x])
+    if labels:
+        axes.legend()
+
+
+def lines(
+    x: str,
+    *y: str,
+    labels: Sequence[str] = (),
+    xticks: bool = False,
+    marker: str | None = None,
+) -> Callable[..., None]:
+    """Draws columns of a table as lines.
+
+    :param x: The header of the column on the x-axis.
+    :param y: The headers of the columns drawn.
+    :param labels: The legend of every line, no legend is drawn if empty.
+    :param xticks: If every value on the x-axis gets a tick.
+    :param marker: The marker of the points.
+    :returns: The draw function of a :class:`FigureSpec`.
+    """
+    return partial(_draw_lines, x=x, y=y, labels=labels, xticks=xticks, marker=marker)
+
+
+def _draw_slot_openings(axes: Any, summary: np.ndarray, raw: np.ndarray, kind: str):
+    """Draws the waveforms of the smallest, best and largest slot opening."""
+    factors = summary["Slot Opening Factor"]
+    best = int(np.argmax(summary["Overall Torque"]))
+    for factor in (factors[0], factors[best], factors[-1]):
+        axes.plot(
+            raw["Load Angle"],
+            raw[f"{kind} {round(factor, 2)}"],
+            label=f"Opening Factor: {round(factor, 2)}",
+        )
+    axes.set_xlim(raw["Load Angle"].min(), raw["Load Angle"].max())
+    axes.legend()
+
+
+# Every figure of the report by the task that saves its tables
+FIGURES: dict[str, list[FigureSpec]] = {
+    "task_1": [
+        FigureSpec(
+            "../dist/task_1",
+            ("../dist/task_1",),
+            lines("Angle", "Cogging Torque"),
+            "Cogging Torque of the Machine",
+            "Rotation Angle, °",
+            "Torque, Nm",
+        ),
+    ],
+    "task_2": [
+        FigureSpec(
+            "../dist/task_2_1",
+            ("../dist/task_2",),
+            lines(
+                "Time",
+                "Va",
+                "Vb",
+                "Vc",
+                labels=("Winding A", "Winding B", "Winding C"),
+            ),
+            "Back EMF of the Machine",
+            "Time, s",
+            "Back EMF, V",
+        ),
+        FigureSpec(
+            "../dist/task_2_2",
+            ("../dist/task_2",),
+            lines("Time", "Vll"),
+            "Line-to-Line Back EMF of the Machine",
+            "Time, s",
+            "Line-to-Line Back EMF, V",
+        ),
+    ],
+    "task_3": [
+        FigureSpec(
+            "../dist/task_3",
+            ("../dist/task_3",),
+            lines("Load Angle", "Torque Developed"),
+            "Torque Developed at Different Load Angle",
+            "Load Angle, °",
+            "Torque Developed, Nm",
+        ),
+        FigureSpec(
+            "../dist/task_3_ripple",
+            ("../dist/task_3_ripple",),
+            lines("Load Angle", "Torque Developed"),
+            "Torque Ripple of the Machine",
+            "Load Angle, °",
+            "Torque Developed, Nm",
+        ),
+    ],
+    "task_4": [
+        FigureSpec(
+            "../dist/task_4",
+            ("../dist/task_4",),
+            lines(
+                "current",
+                "yoke",
+                "teeth",
+                "magnet",
+                labels=("Yoke", "Teeth", "Magnet"),
+                xticks=True,
+                marker="o",
+            ),
+            "Magnetic Field Density at Different Peak Current",
+            "Peak Current, A",
+            "Magnetic Field Density, T",
+        ),
+    ],
+    "task_5": [
+        FigureSpec(
+            "../dist/task_5",
+            ("../dist/task_5",),
+            lines("current", "torque", xticks=True, marker="o"),
+            "Mean Torque at Different Peak Current",
+            "Peak Current, A",
+            "Mean Torque, Nm",
+        ),
+    ],
+    "task_9": [
+        FigureSpec(
+            "../dist/task_9_torque",
+            ("../dist/task_9",),
+            lines("Pitch Factor", "Torque", xticks=True),
+            "Rated Torque at Different Magnet Pitch Factor",
+            "Pitch Factor",
+            "Rated Torque, Nm",
+        ),
+        FigureSpec(
+            "../dist/task_9_back_emf",
+            ("../dist/task_9",),
+            lines("Pitch Factor", "EMF", xticks=True),
+            "Back EMF at Different Magnet Pitch Factor",
+            "Pitch Factor",
+            "Back EMF, V",
+        ),
+        FigureSpec(
+            "../dist/task_9_airgap_flux",
+            ("../dist/task_9",),
+            lines("Pitch Factor", "Airgap Flux", xticks=True),
+            "Airgap Flux Density at Different Magnet Pitch Factor",
+            "Pitch Factor",
+            "Airgap Flux Density, T",
+        ),
+    ],
+    "task_10": [
+        FigureSpec(
+            "../dist/task_10_overall_torque",
+            ("../dist/task_10",),
+            lines("Slot Opening Factor", "Overall Torque", xticks=True),
+            "Overall Torque at Different Slot Opening Factor",
+            "Slot Opening Factor",
+            "Overall Torque, Nm",
+        ),
+        FigureSpec(
+            "../dist/task_10_torque_ripple",
+            ("../dist/task_10", "../dist/task_10_raw"),
+            partial(_draw_slot_openings, kind="Ripple"),
+            "Torque Ripple at Various Slot Opening Factor",
+            "Load Angle, °",
+            "Developed Torque, Nm",
+        ),
+        FigureSpec(
+            "../dist/task_10_ripple_amplitude",
+            ("../dist/task_10",),
+            lines("Slot Opening Factor", "Torque Ripple Amplitude", xticks=True),
+            "Torque Ripple Amplitude at Different Slot Opening Factor",
+            "Slot Opening Factor",
+            "Torque Ripple Amplitude, Nm",
+        ),
+        FigureSpec(
+            "../dist/task_10_cogging_torque",
+            ("../dist/task_10", "../dist/task_10_raw"),
+            partial(_draw_slot_openings, kind="Cogging"),
+            "Cogging Torque at Various Slot Opening Factor",
+            "Load Angle, °",
+            "Cogging Torque, Nm",
+        ),
+        FigureSpec(
+            "../dist/task_10_cogging_amplitude",
+            ("../dist/task_10",),
+            lines("Slot Opening Factor", "Cogging Ripple Amplitude", xticks=True),
+            "Cogging Torque Amplitude at Different Slot Opening Factor",
+            "Slot Opening Factor",
+            "Cogging Torque Amplitude, Nm",
+        ),
+    ],
+}
+
+
+def table_hash(path: str) -> str:
+    """Hashes the names, types and values of a table.
+
+    :param path: The location of the table.
+    :returns: The hex digest.
+    """
+    table = load_table(path)
+    digest = hashlib.sha256(str(table.dtype.descr).encode())
+    digest.update(table.tobytes())
+    return digest.hexdigest()
+
+
+def figure_hash(figure: FigureSpec, tables: dict[str, str]) -> str:
+    """Hashes a figure and the tables it is drawn from.
+
+    :param figure: The figure.
+    :param tables: The hash of every table by its location.
+    :returns: The hex digest.
+    """
+    draw: Any = figure.draw
+    if isinstance(draw, partial):
+        # Named without the module, which is __main__ when run as a script
+        draw = (draw.func.__qualname__, draw.args, sorted(draw.keywords.items()))
+    else:
+        draw = draw.__qualname__
+    fields = (figure.output, tuple(figure.tables), draw, figure.title)
+    digest = hashlib.sha256(repr((*fields, figure.xlabel, figure.ylabel)).encode())
+    for path in figure.tables:
+        digest.update(tables[path].encode())
+    return digest.hexdigest()
+
+
+def render_figure(figure: FigureSpec, formats: Sequence[str] = FORMATS):
+    """Draws a figure and saves it in every format.
+
+    :param figure: The figure.
+    :param formats: The extensions of the images.
+    """
+    # Imported here as only the report workers draw
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.figure import Figure
+
+    image = Figure()
+    axes = image.subplots()
+    figure.draw(axes, *(load_table(path) for path in figure.tables))
+    axes.set_title(figure.title)
+    axes.set_xlabel(figure.xlabel)
+    axes.set_ylabel(figure.ylabel)
+    for extension in formats:
+        image.savefig(f"{figure.output}.{extension}")
+
+
+def render_report(
+    figures: Sequence[FigureSpec],
+    *,
+    formats: Sequence[str] = FORMATS,
+    processes: int | None = None,
+    manifest: str = MANIFEST,
+    force: bool = False,
+) -> list[str]:
+    """Renders the figures whose inputs changed since they were last rendered.
+
+    Figures with a missing table are left out.
+
+    :param figures: The figures.
+    :param formats: The extensions of the images.
+    :param processes: The amount of processes drawing the figures.
+    :param manifest: The location of the hashes of the rendered figures.
+    :param force: If every figure is rendered again.
+    :returns: The outputs of the figures that were rendered.
+    """
+    logger = multiprocessing.get_logger()
+    rendered: dict[str, str] = {}
+    if os.path.exists(manifest):
+        with open(manifest, encoding="utf-8") as file:
+            rendered = json.load(file)
+
+    tables: dict[str, str] = {}
+    stale: dict[str, FigureSpec] = {}
+    for figure in figures:
+        try:
+            for path in figure.tables:
+                if path not in tables:
+                    tables[path] = table_hash(path)
+        except FileNotFoundError as error:
+            logger.warning("Skipping %s: %s", figure.output, error)
+            continue
+        key = figure_hash(figure, tables)
+        exists = all(os.path.exists(f"{figure.output}.{ext}") for ext in formats)
+        if force or not exists or rendered.get(figure.output) != key:
+            stale[key] = figure
+    logger.info("Rendering %s of %s figures", len(stale), len(figures))
+    if not stale:
+        return []
+
+    done = []
+    with ProcessPoolExecutor(processes, mp_context=worker_context()) as executor:
+        futures = {
+            key: executor.submit(render_figure, figure, formats)
+            for key, figure in stale.items()
+        }
+        for key, future in futures.items():
+            output = stale[key].output
+            try:
+                future.result()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Rendering %s failed", output)
+                rendered.pop(output, None)
+                continue
+            logger.debug("Rendered %s", output)
+            rendered[output] = key
+            done.append(output)
+
+    os.makedirs(os.path.dirname(manifest) or ".", exist_ok=True)
+    with open(manifest, "w", encoding="utf-8") as file:
+        json.dump(rendered, file, indent=2, sort_keys=True)
+    return done
+
+
+def all_figures() -> list[FigureSpec]:
+    """Gets every figure of the report."""
+    return [figure for figures in FIGURES.values() for figure in figures]
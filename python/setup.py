@@ -1,26 +1,21 @@
 #!/usr/bin/env python3
 """Document creation and setup"""
+import logging
 import math
-import os
+import multiprocessing
 
-import femm  # type: ignore
+from geometry import MachineDimensions, machine_model
+from model import Boundary, Label, ModelSpec, build_model
 
-
-def add_label(
-    x: float,
-    y: float,
-    mat: str,
-    circ: str = "",
-    magdir: float = 0,
-    group: int = 0,
-    turns: int = 0,
-):
-    """Adds a new label to the problem."""
-    # pylint: disable=too-many-arguments
-    femm.mi_addblocklabel(x, y)
-    femm.mi_selectlabel(x, y)
-    femm.mi_setblockprop(mat, 1, 0, circ, magdir, group, turns)
-    femm.mi_clearselected()
+# Materials
+AIR = "Air"
+IRON = "Pure Iron"
+N42 = "N42"
+STEEL_1018 = "1018 Steel"
+STEEL_M19 = "M-19 Steel"
+COPPER = "10 AWG"
+# Circuit of the coils in the slots of a pole, the direction reverses every pole
+WINDING = ("A", "A", "B", "B", "C", "C")
 
 
 def cosd(value: float) -> float:
@@ -33,77 +28,73 @@ def sind(value: float) -> float:
     return math.sin(math.radians(value))
 
 
-if __name__ == "__main__":
-    femm.openfemm(
-        winepath="/usr/bin/wine",
-        femmpath="/home/user/.local/share/wineprefixes/default/drive_c/femm42/bin/",
-    )
-    femm.newdocument(0)
-    femm.mi_probdef(None, "millimeters", "planar", None, 100)
-    femm.smartmesh(0)
+def magnet_labels() -> list[Label]:
+    """Creates the labels of the magnets."""
+    magdirs = [45, -45, 180 + 45, 180 - 45]
+    return [
+        Label(
+            22 * cosd(i * 90 + 45),
+            22 * sind(i * 90 + 45),
+            N42,
+            magdir=magdirs[i],
+            group=1,
+        )
+        for i in range(4)
+    ]
+
 
-    # Importing
-    femm.mi_readdxf("../cw.dxf")
-    femm.mi_zoomnatural()
+def winding_labels() -> list[Label]:
+    """Creates the labels of the windings in the slots."""
+    multiplier = 1
+    diff = 360 / 24
+    labels = []
+    for i in range(24):
+        x_val = 34 * cosd(i * diff + 90)
+        y_val = 34 * sind(i * diff + 90)
+        index = i % len(WINDING)
+        if index == 0:
+            multiplier = multiplier * -1
+        labels.append(
+            Label(x_val, y_val, COPPER, circuit=WINDING[index], turns=multiplier * 40)
+        )
+    return labels
 
-    # Importing Materials
-    AIR = "Air"
-    IRON = "Pure Iron"
-    N42 = "N42"
-    STEEL_1018 = "1018 Steel"
-    STEEL_M19 = "M-19 Steel"
-    COPPER = "10 AWG"
-    femm.mi_getmaterial(AIR)
-    femm.mi_getmaterial(IRON)
-    femm.mi_getmaterial(N42)
-    femm.mi_getmaterial(STEEL_1018)
-    femm.mi_getmaterial(STEEL_M19)
-    femm.mi_getmaterial(COPPER)
 
-    # Adding Circuits
-    femm.mi_addcircprop("A", 0, 1)
-    femm.mi_addcircprop("B", 0, 1)
-    femm.mi_addcircprop("C", 0, 1)
+CW1 = ModelSpec(
+    "../cw.dxf",
+    materials=(AIR, IRON, N42, STEEL_1018, STEEL_M19, COPPER),
+    circuits=("A", "B", "C"),
+    boundaries=(Boundary("Boundary", arcs=((62.5, 0), (0, -62.5)), max_segment=5),),
+    groups=((24.5, 1),),
+    labels=(
+        # Rotor Inner
+        Label(0, 0, STEEL_1018, group=1),
+        # Rotor Outer
+        Label(0, 16.25, STEEL_M19, group=1),
+        # Air Gap
+        Label(0, 24.5, AIR),
+        # Magnets
+        *magnet_labels(),
+        # Stator Radius
+        Label(0, 46.5, STEEL_M19),
+        # Outer Cage Radius
+        Label(0, 56.25, IRON),
+        # Windings/Slots
+        *winding_labels(),
+    ),
+)
 
-    # Adding Boundary
-    femm.mi_addboundprop("Boundary")
-    femm.mi_selectarcsegment(62.5, 0)
-    femm.mi_selectarcsegment(0, -62.5)
-    femm.mi_setarcsegmentprop(5, "Boundary", 0, 0)
-    femm.mi_clearselected()
-    femm.mi_selectcircle(0, 0, 24.5, 4)
-    femm.mi_setgroup(1)
+# The machine of cw.dxf drawn as its smallest repeating sector. Its geometry
+# is the one of cw_sliding.dxf turned back by half a slot pitch, so the sector
+# is cw.dxf turned by 7.5°, with the radial magnets and the winding of CW1.
+CW1_REDUCED = MachineDimensions(
+    magnet_angle=52.5,
+    magnet_direction=52.5,
+    winding=tuple((circuit, 1) for circuit in WINDING),
+).reduced()
 
-    # Adding Materials
-    # Rotor Inner
-    add_label(0, 0, STEEL_1018, group=1)
-    # Rotor Outer
-    add_label(0, 16.25, STEEL_M19, group=1)
-    # Air Gap
-    add_label(0, 24.5, AIR)
-    # Magnets
-    magdirs = [45, -45, 180 + 45, 180 - 45]
-    for i in range(4):
-        x_val = 22 * cosd(i * 90 + 45)
-        y_val = 22 * sind(i * 90 + 45)
-        add_label(x_val, y_val, N42, magdir=magdirs[i], group=1)
-    # Stator Radius
-    add_label(0, 46.5, STEEL_M19)
-    # Outer Cage Radius
-    add_label(0, 56.25, IRON)
-    # Windings/Slots
-    circuits = ["A", "A", "B", "B", "C", "C"]
-    MULTIPLIER = 1
-    DIFF = 360 / 24
-    for i in range(24):
-        x_val = 34 * cosd(i * DIFF + 90)
-        y_val = 34 * sind(i * DIFF + 90)
-        index = i % 6
-        if i % 6 == 0:
-            MULTIPLIER = MULTIPLIER * -1
-        add_label(x_val, y_val, COPPER, circ=circuits[index], turns=MULTIPLIER * 40)
 
-    # Document saving
-    os.makedirs("../dist", exist_ok=True)
-    femm.mi_saveas("../dist/cw1.fem")
-    femm.closefemm()
+if __name__ == "__main__":
+    multiprocessing.log_to_stderr(logging.INFO)
+    build_model(CW1, "../dist/cw1.fem")
+    build_model(machine_model(CW1_REDUCED), "../dist/cw1_reduced.fem")
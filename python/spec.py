@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""Declarative sweep specifications expanded into a flat list of solves.
+
+A specification lists the geometry variants of a model and the sweeps of
+operating points to solve on every variant. Every variant is prepared once into
+its own document without FEMM, then all the operating points of all the variants
+are scheduled across the pool together instead of one variant per worker.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from fem import FemDocument
+from lib import (
+    FEMM_BACKEND,
+    I_PEAK,
+    SOLVE_CACHE,
+    FEMMPool,
+    OperatingPoint,
+    Quantity,
+    solved_hash,
+    use_document,
+    worker_context,
+)
+from lua_sweep import solve_batch
+from mesh import inherit
+from store import ResultStore, SharedResults
+from sweep import SweepResult, run_sweep
+from tracing import traced
+
+
+def quantity_name(quantity: Quantity) -> str:
+    """Gets the name of the field a quantity is stored in.
+
+    The air gap flux density is stored in the same field for every angle, so a
+    sweep can measure it at an angle that changes with every step.
+
+    :param quantity: The quantity, see :func:`lib.solve`.
+    :returns: The name of the field.
+    """
+    match quantity:
+        case str():
+            return quantity
+        case ("gapb", _):
+            return "gapb"
+        case ("b", x, y):
+            return f"b({x:g}, {y:g})"
+    raise ValueError(f"Unknown quantity: {quantity}")
+
+
+def quantity_shape(quantity: Quantity) -> tuple[int, ...]:
+    """Gets the shape of the value of a quantity.
+
+    :param quantity: The quantity, see :func:`lib.solve`.
+    :returns: The shape.
+    """
+    match quantity:
+        case "torque" | "iterations" | "analysis_time" | "elements":
+            return ()
+        case "flux":
+            return (3,)
+        case "circuits":
+            return (3, 3)
+        case ("gapb", _) | ("b", _, _):
+            return (2,)
+    raise ValueError(f"Unknown quantity: {quantity}")
+
+
+@dataclass(frozen=True)
+class Sweep:
+    """A family of operating points swept over a common step.
+
+    The load angle of the current and the angle of the rotor both change
+    linearly with the step, given as ``(offset, per step)``. Every current is
+    swept over every step.
+
+    >>> # Task 3: the rotor turns half of the electrical angle of the current
+    >>> Sweep("torque", load_angle=(77, 1), rotor_angle=(23.1, 0.5))
+
+    :param name: The name of the sweep.
+    :param steps: The steps to solve.
+    :param currents: The peak phase currents.
+    :param load_angle: The electrical load angle of phase A in degrees.
+    :param rotor_angle: The angle of the sliding boundary in degrees, ``None``
+        leaves the rotor where it is.
+    :param quantities: The quantities to extract, or a function that gets the
+        quantities of a step.
+    :param mesh: The mesh setting, see :class:`lib.OperatingPoint`.
+    :param warm_start: Starts every step from the solution of the step before,
+        see :func:`lib.analyze`.
+    """
+
+    name: str
+    steps: Sequence[float] = tuple(range(360))
+    currents: Sequence[float] = (I_PEAK,)
+    load_angle: tuple[float, float] = (0, 1)
+    rotor_angle: tuple[float, float] | None = (0, 0)
+    quantities: tuple[Quantity, ...] | Callable[[float], tuple[Quantity, ...]] = (
+        "torque",
+    )
+    mesh: int = 1
+    warm_start: bool = False
+
+    def point(self, current: float, step: float) -> OperatingPoint:
+        """Gets the operating point of a current at a step."""
+        rotor_angle = None
+        if self.rotor_angle is not None:
+            rotor_angle = self.rotor_angle[0] + self.rotor_angle[1] * step
+        load_angle = self.load_angle[0] + self.load_angle[1] * step
+        point = OperatingPoint.three_phase(current, load_angle, rotor_angle)
+        return replace(point, mesh=self.mesh)
+
+    def step_quantities(self, step: float) -> tuple[Quantity, ...]:
+        """Gets the quantities to extract at a step."""
+        if callable(self.quantities):
+            return self.quantities(step)
+        return self.quantities
+
+
+@dataclass(frozen=True)
+class SweepTask:
+    """A single solve of a specification."""
+
+    document: str
+    point: OperatingPoint
+    quantities: tuple[Quantity, ...]
+    warm_start: bool = False
+
+
+@dataclass
+class SweepSpec:
+    """The variants of a model and the sweeps to solve on each of them.
+
+    :param document: The document of the model.
+    :param sweeps: The sweeps to solve on every variant.
+    :param variants: The geometry parameters of the variants, ``None`` solves
+        the document as it is.
+    :param prepare: Picklable function that edits a copy of the document into
+        a variant, given the :class:`fem.FemDocument` and the geometry
+        parameter. It may return a new document instead, e.g.
+        :func:`geometry.build_variant` to sweep the dimensions of the machine.
+    :param variant_dir: The directory the variant documents are saved to.
+    :param variant_name: The format of the variant document names, given the
+        ``index`` and ``variant``.
+    :param cache: The location of the solve cache.
+    :param inherit_mesh: If the variants use the mesh setting recorded for the
+        document, see :func:`mesh.inherit`.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    document: str
+    sweeps: Sequence[Sweep]
+    variants: Sequence[Any] = (None,)
+    prepare: Callable[[FemDocument, Any], FemDocument | None] | None = None
+    variant_dir: str = "../dist/variants"
+    variant_name: str = "variant_{index}"
+    cache: str | None = SOLVE_CACHE
+    inherit_mesh: bool = True
+
+    def variant_document(self, index: int) -> str:
+        """Gets the document of a variant."""
+        if self.prepare is None:
+            return self.document
+        name = self.variant_name.format(index=index, variant=self.variants[index])
+        return os.path.join(self.variant_dir, f"{name}.fem")
+
+    def tasks(self) -> list[SweepTask]:
+        """Expands the specification into a flat list of solves.
+
+        The solves are ordered by variant, sweep, current and then step.
+        """
+        return [
+            SweepTask(
+                self.variant_document(index),
+                sweep.point(current, step),
+                sweep.step_quantities(step),
+                sweep.warm_start,
+            )
+            for index in range(len(self.variants))
+            for sweep in self.sweeps
+            for current in sweep.currents
+            for step in sweep.steps
+        ]
+
+    def chains(self) -> list[int | None]:
+        """Gets the warm start chain of every solve of :meth:`tasks`.
+
+        The steps of a warm started sweep at one current on one variant form a
+        chain, the solves of the other sweeps have none.
+        """
+        chains: list[int | None] = []
+        for _ in self.variants:
+            for sweep in self.sweeps:
+                for _ in sweep.currents:
+                    chain = len(chains) if sweep.warm_start else None
+                    chains.extend([chain] * len(sweep.steps))
+        return chains
+
+    def fields(self) -> dict[str, tuple[int, ...]]:
+        """Gets the shape of every stored quantity."""
+        fields: dict[str, tuple[int, ...]] = {}
+        for sweep in self.sweeps:
+            for step in sweep.steps:
+                for quantity in sweep.step_quantities(step):
+                    fields[quantity_name(quantity)] = quantity_shape(quantity)
+        return fields
+
+    def indices(self, sweep_name: str) -> np.ndarray:
+        """Gets the indices of the solves of a sweep in :meth:`tasks`.
+
+        :param sweep_name: The name of the sweep.
+        :returns: The indices with a shape of ``(variants, currents, steps)``.
+        """
+        sizes = [len(sweep.currents) * len(sweep.steps) for sweep in self.sweeps]
+        names = [sweep.name for sweep in self.sweeps]
+        position = names.index(sweep_name)
+        sweep = self.sweeps[position]
+        starts = np.arange(len(self.variants)) * sum(sizes) + sum(sizes[:position])
+        block = np.arange(sizes[position]).reshape(
+            len(sweep.currents), len(sweep.steps)
+        )
+        return starts[:, np.newaxis, np.newaxis] + block
+
+
+@dataclass
+class SpecResult:
+    """The results of a specification."""
+
+    spec: SweepSpec
+    values: dict[str, np.ndarray]
+    sweep: SweepResult
+
+    def get(self, sweep_name: str, quantity: Quantity) -> np.ndarray:
+        """Gets the values of a quantity of a sweep.
+
+        :param sweep_name: The name of the sweep.
+        :param quantity: The quantity or the name of its field.
+        :returns: The values with a shape of ``(variants, currents, steps, ...)``.
+        """
+        return self.values[quantity_name(quantity)][self.spec.indices(sweep_name)]
+
+    def log_iterations(self, logger: logging.Logger):
+        """Logs the mean Newton iterations and analysis time of every sweep.
+
+        Only the sweeps that extracted ``"iterations"`` or ``"analysis_time"``
+        are logged, see :func:`lib.solve`.
+
+        :param logger: The logger to log to.
+        """
+        for sweep in self.spec.sweeps:
+            for quantity in ("iterations", "analysis_time"):
+                if quantity not in self.values:
+                    continue
+                values = self.get(sweep.name, quantity)
+                if np.isnan(values).all():
+                    continue
+                logger.info(
+                    "Sweep %s mean %s: %.3g (warm start: %s)",
+                    sweep.name,
+                    quantity,
+                    np.nanmean(values),
+                    sweep.warm_start,
+                )
+
+
+def _same_run(first: SweepTask, second: SweepTask) -> bool:
+    """Checks if two tasks can be solved in the same batch."""
+    return (first.document, first.warm_start) == (second.document, second.warm_start)
+
+
+class _SpecBatch:
+    """Solves a batch of tasks, reusing the opened variant document."""
+
+    femm_document = None  # The document is opened by the batch itself
+
+    def __init__(self, fields: dict[str, tuple[int, ...]], cache: str | None):
+        self.fields = fields
+        self.cache = cache
+
+    def __call__(self, tasks: list[SweepTask]) -> list[dict[str, Any]]:
+        records = []
+        start = 0
+        while start < len(tasks):
+            # Solving every run of tasks on the same document at once
+            document = tasks[start].document
+            warm_start = tasks[start].warm_start
+            end = start
+            while end < len(tasks) and _same_run(tasks[start], tasks[end]):
+                end += 1
+            use_document(document, self.cache)
+            values = solve_batch(
+                [task.point for task in tasks[start:end]],
+                [task.quantities for task in tasks[start:end]],
+                warm_start,
+            )
+            for value in values:
+                record = {
+                    name: np.full(shape, math.nan)
+                    for name, shape in self.fields.items()
+                }
+                record.update(
+                    (quantity_name(quantity), item) for quantity, item in value.items()
+                )
+                records.append(record)
+            start = end
+        return records
+
+
+@traced()
+def _prepare_variant(
+    prepare: Callable[[FemDocument, Any], FemDocument | None],
+    document: FemDocument,
+    variant: Any,
+    output: str,
+):
+    """Edits a copy of the document into a variant and saves it."""
+    (prepare(document, variant) or document).write(output)
+
+
+def prepare_variants(spec: SweepSpec, processes: int | None = None):
+    """Writes the document of every variant of a specification.
+
+    The variants are edited in parallel without FEMM, each process gets its
+    own copy of the document. The variants get the mesh setting recorded for
+    the document unless ``spec.inherit_mesh`` is false.
+
+    :param spec: The specification to prepare.
+    :param processes: The amount of processes.
+    """
+    if spec.prepare is None:
+        return
+    logger = multiprocessing.get_logger()
+    logger.info("Preparing %s variants of %s", len(spec.variants), spec.document)
+    os.makedirs(spec.variant_dir, exist_ok=True)
+    document = FemDocument.read(spec.document)
+    with ProcessPoolExecutor(processes, mp_context=worker_context()) as executor:
+        futures = [
+            executor.submit(
+                _prepare_variant,
+                spec.prepare,
+                document,
+                variant,
+                spec.variant_document(index),
+            )
+            for index, variant in enumerate(spec.variants)
+        ]
+        for future in futures:
+            future.result()
+    if spec.inherit_mesh:
+        variants = [spec.variant_document(i) for i in range(len(spec.variants))]
+        inherit(spec.document, variants, FEMM_BACKEND)
+
+
+def level_store(store: str | None, level: str) -> str | None:
+    """Gets the location of the store of another level of a sweep.
+
+    >>> level_store("../dist/task_8.store", "coarse")
+    '../dist/task_8.coarse.store'
+
+    :param store: The location of the store of the sweep, if it has one.
+    :param level: The name of the level.
+    :returns: The location next to the store, ``None`` without a store.
+    """
+    if store is None:
+        return None
+    stem, extension = os.path.splitext(store)
+    return f"{stem}.{level}{extension}"
+
+
+def run_spec(
+    spec: SweepSpec,
+    *,
+    processes: int | None = None,
+    batch_size: int | None = None,
+    store: str | None = None,
+    indices: Sequence[int] | None = None,
+    prepare: bool = True,
+) -> SpecResult:
+    """Solves every sweep of a specification on every variant.
+
+    :param spec: The specification to solve.
+    :param processes: The amount of workers.
+    :param batch_size: The amount of solves per batch of the sweeps without a
+        warm start, see :meth:`SweepSpec.chains`.
+    :param store: The location of a result store to resume from, the results
+        are only kept in shared memory if it is ``None``. The store is made for
+        every solve of the specification, whichever ``indices`` are solved.
+    :param indices: The indices in :meth:`SweepSpec.tasks` of the solves to
+        solve, every solve if ``None``. The values of the others are NaN.
+    :param prepare: If the variant documents are written, false reuses the
+        documents of an earlier run.
+    :returns: The results.
+    """
+    logger = multiprocessing.get_logger()
+    all_tasks = spec.tasks()
+    all_chains = spec.chains()
+    fields = spec.fields()
+    wanted = list(range(len(all_tasks))) if indices is None else list(indices)
+    logger.info("Sweep of %s variants with %s solves", len(spec.variants), len(wanted))
+
+    # A store keeps every solve, so the solves of other indices are kept for
+    # the next run, while shared memory only holds the solves of this run
+    results: ResultStore | SharedResults
+    tasks = all_tasks
+    chains = all_chains
+    subset = None
+    if store is None:
+        tasks = [all_tasks[i] for i in wanted]
+        chains = [all_chains[i] for i in wanted]
+        results = SharedResults(tasks, fields)
+    else:
+        # The variants are written first, as the store is kept only for the
+        # same documents
+        if prepare:
+            prepare_variants(spec, processes)
+            prepare = False
+        documents = dict.fromkeys(task.document for task in all_tasks)
+        results = ResultStore(
+            store, all_tasks, fields, [solved_hash(document) for document in documents]
+        )
+        subset = indices
+
+    try:
+        missing = results.missing()
+        if subset is not None:
+            missing = sorted(set(missing).intersection(subset))
+        if not missing:
+            logger.info("All %s solves already in the store", len(wanted))
+            sweep = SweepResult(tasks, [], 0)
+        else:
+            if prepare:
+                prepare_variants(spec, processes)
+            with FEMMPool(spec.document, processes) as pool:
+                sweep = run_sweep(
+                    _SpecBatch(fields, spec.cache),
+                    tasks,
+                    batch_size=batch_size,
+                    pool=pool,
+                    store=results,
+                    chains=chains,
+                    subset=subset,
+                )
+            # The records are views of the store
+            sweep.results = []
+        values = {name: np.array(results[name]) for name in fields}
+    finally:
+        if isinstance(results, SharedResults):
+            results.close()
+
+    if indices is not None:
+        for name, value in values.items():
+            values[name] = np.full((len(all_tasks), *value.shape[1:]), math.nan)
+            values[name][wanted] = value if subset is None else value[wanted]
+    return SpecResult(spec, values, sweep)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Harmonic analysis of torque and EMF waveforms.
+
+The waveforms are sampled evenly over a span of rotor angle, along the last
+axis of arrays of any shape, so the spectra of every variant and current of a
+sweep are found with one ``rfft``. The harmonics are numbered in mechanical
+orders, cycles per revolution of the rotor, and electrical orders, cycles per
+electrical period.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from lib import POLES
+
+# Windows for waveforms that do not cover whole periods
+WINDOWS: dict[str, Callable[[int], np.ndarray]] = {
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+}
+
+
+@dataclass
+class Spectrum:
+    """The harmonics of waveforms.
+
+    :param orders: The mechanical order of every bin.
+    :param amplitudes: The peak amplitude of every bin with a shape of
+        ``(..., bins)``, the absolute mean value for order 0.
+    :param phases: The phase of every bin in degrees.
+    :param pole_pairs: The pole pairs of the machine.
+    """
+
+    orders: np.ndarray
+    amplitudes: np.ndarray
+    phases: np.ndarray
+    pole_pairs: int = POLES // 2
+
+    @property
+    def electrical_orders(self) -> np.ndarray:
+        """The electrical order of every bin."""
+        return self.orders / self.pole_pairs
+
+    def harmonic(self, order: float, electrical: bool = False) -> np.ndarray:
+        """Gets the amplitude of a harmonic from the bin nearest to it.
+
+        :param order: The order of the harmonic.
+        :param electrical: If the order is electrical instead of mechanical.
+        :returns: The amplitudes with a shape of ``(...)``, zero if no bin is
+            within half a bin of the order.
+        """
+        orders = self.electrical_orders if electrical else self.orders
+        index = int(np.abs(orders - order).argmin())
+        spacing = orders[1] - orders[0] if orders.size > 1 else np.inf
+        if abs(orders[index] - order) > spacing / 2:
+            return np.zeros(self.amplitudes.shape[:-1])
+        return self.amplitudes[..., index]
+
+    def table(
+        self, count: int = 15, electrical: bool = True
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Gets the amplitudes of the first whole harmonics.
+
+        :param count: The amount of harmonics, starting from order 1.
+        :param electrical: If the orders are electrical instead of mechanical.
+        :returns: The orders and the amplitudes with a shape of
+            ``(..., count)``.
+        """
+        orders = np.arange(1, count + 1)
+        amplitudes = np.stack(
+            [self.harmonic(order, electrical) for order in orders], axis=-1
+        )
+        return orders, amplitudes
+
+    def thd(self, fundamental: float = 1, electrical: bool = True) -> np.ndarray:
+        """Gets the total harmonic distortion.
+
+        Only the multiples of the fundamental are counted, the mean value and
+        the bins between them are not.
+
+        :param fundamental: The order of the fundamental.
+        :param electrical: If the order is electrical instead of mechanical.
+        :returns: The distortion in percent with a shape of ``(...)``.
+        """
+        orders = self.electrical_orders if electrical else self.orders
+        distortion = np.zeros(self.amplitudes.shape[:-1])
+        for multiple in range(2, int(orders[-1] / fundamental) + 1):
+            distortion += self.harmonic(fundamental * multiple, electrical) ** 2
+        base = self.harmonic(fundamental, electrical)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(base > 0, 100 * np.sqrt(distortion) / base, np.inf)
+
+    def dominant(
+        self, count: int = 3, electrical: bool = False
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Gets the largest harmonics, ignoring the mean value.
+
+        :param count: The amount of harmonics.
+        :param electrical: If the orders are electrical instead of mechanical.
+        :returns: The orders and the amplitudes of the harmonics with a shape
+            of ``(..., count)``, largest first.
+        """
+        orders = self.electrical_orders if electrical else self.orders
+        ripple = self.amplitudes[..., 1:]
+        index = np.argsort(-ripple, axis=-1)[..., :count]
+        return orders[1:][index], np.take_along_axis(ripple, index, axis=-1)
+
+    def period(self, electrical: bool = False) -> np.ndarray:
+        """Gets the period of the largest harmonic.
+
+        :param electrical: If the period is in electrical instead of mechanical
+            degrees.
+        :returns: The period in degrees with a shape of ``(...)``.
+        """
+        orders, _ = self.dominant(1, electrical)
+        return 360 / orders[..., 0]
+
+
+def spectrum(
+    values: np.ndarray,
+    span: float = 360,
+    window: str | None = None,
+    pole_pairs: int = POLES // 2,
+) -> Spectrum:
+    """Finds the harmonics of waveforms.
+
+    Periodic waveforms must cover whole periods without repeating the first
+    sample at the end, e.g. the 360 angles of a full revolution. A window
+    reduces the leakage of waveforms that do not, the amplitudes are corrected
+    for its gain.
+
+    :param values: The waveforms with the samples along the last axis.
+    :param span: The mechanical angle the samples cover in degrees.
+    :param window: The name of the window, see ``WINDOWS``, or ``None``.
+    :param pole_pairs: The pole pairs of the machine.
+    :returns: The spectrum of every waveform.
+    """
+    values = np.asarray(values, dtype=float)
+    count = values.shape[-1]
+    if window is not None:
+        weights = WINDOWS[window](count)
+        values = values * weights / weights.mean()
+
+    transform = np.fft.rfft(values, axis=-1) / count
+    amplitudes = np.abs(transform)
+    amplitudes[..., 1:] *= 2
+    if count % 2 == 0:
+        # The Nyquist bin has no negative frequency
+        amplitudes[..., -1] /= 2
+    orders = np.fft.rfftfreq(count, span / count / 360)
+    return Spectrum(orders, amplitudes, np.degrees(np.angle(transform)), pole_pairs)
+
+
+def save_spectra(path: str, **spectra: Spectrum):
+    """Saves spectra next to the data of a sweep.
+
+    :param path: The location of the ``.npz`` file.
+    :param spectra: The spectra to save by name.
+    """
+    arrays = {}
+    for name, item in spectra.items():
+        arrays[f"{name}_orders"] = item.orders
+        arrays[f"{name}_amplitudes"] = item.amplitudes
+        arrays[f"{name}_phases"] = item.phases
+    np.savez(path, **arrays)
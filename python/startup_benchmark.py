@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark of starting the FEMM workers with every start method.
+
+Each run starts a :class:`lib.FEMMPool` and waits for every worker to finish a
+job that does nothing, so it measures how long the workers take to import their
+modules and start FEMM. The first run of forkserver includes starting the server
+itself. The import time of the modules a worker needs is measured in a new
+interpreter, next to ``matplotlib.pyplot`` for comparison.
+
+Set ``FEMM_BACKEND=stub`` to leave FEMM itself out of the measurement.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from lib import WORKER_PRELOAD, FEMMPool
+
+# Start methods to compare
+METHODS = [
+    method
+    for method in ("fork", "spawn", "forkserver")
+    if method in multiprocessing.get_all_start_methods()
+]
+# Modules whose import time is measured, the workers import the first ones
+IMPORTS = (*WORKER_PRELOAD, "task_9", "matplotlib.pyplot")
+
+
+def ready() -> int:
+    """Job that only reports which worker ran it."""
+    return os.getpid()
+
+
+def time_startup(
+    method: str,
+    processes: int = 4,
+    document: str = "../dist/cw1_sliding.fem",
+) -> float:
+    """Times starting a pool.
+
+    :param method: The start method of the workers.
+    :param processes: The amount of workers.
+    :param document: The document the workers open.
+    :returns: The time until every worker has run a job in seconds.
+    """
+    start = time.perf_counter()
+    with FEMMPool(document, processes, start_method=method) as pool:
+        futures = [pool.submit(ready) for _ in range(processes)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+def time_import(module: str) -> float:
+    """Times importing a module in a new interpreter.
+
+    :param module: The name of the module.
+    :returns: The import time in seconds.
+    """
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    return float(output.stdout)
+
+
+def benchmark(processes: int = 4, repeat: int = 5) -> dict[str, dict[str, float]]:
+    """Times the startup of every start method and the imports of the workers.
+
+    :param processes: The amount of workers.
+    :param repeat: The amount of runs of every start method.
+    :returns: The first, median and fastest time of every start method and the
+        import time of every module in seconds.
+    """
+    logger = multiprocessing.get_logger()
+    results: dict[str, dict[str, float]] = {"imports": {}}
+    for module in IMPORTS:
+        results["imports"][module] = time_import(module)
+        logger.info("import %s: %.3f s", module, results["imports"][module])
+
+    for method in METHODS:
+        times = [time_startup(method, processes) for _ in range(repeat)]
+        results[method] = {
+            "first": times[0],
+            "median": statistics.median(times),
+            "fastest": min(times),
+        }
+        logger.info(
+            "%s: %.3f s first, %.3f s median for %s workers",
+            method,
+            times[0],
+            results[method]["median"],
+            processes,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    logger = multiprocessing.log_to_stderr(logging.INFO)
+
+    os.makedirs("../dist", exist_ok=True)
+    with open("../dist/startup_benchmark.json", "w", encoding="utf-8") as file:
+        json.dump(benchmark(), file, indent=2)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Stores of sweep results indexed by operating point.
+
+Every field of the results is an array with one row per operating point, next
+to an array of flags marking the finished points. Workers write each point into
+the arrays as soon as it is solved, so no results need to be sent back to the
+main process.
+
+- :class:`ResultStore` keeps the arrays in memory-mapped ``.npy`` files, so a
+  sweep that is stopped part way through only needs to solve the missing points
+  when it is started again.
+- :class:`SharedResults` keeps the arrays in shared memory for sweeps that do
+  not need to be resumed.
+"""
+
+import abc
+import dataclasses
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Collection, Mapping, Sequence
+
+import numpy as np
+
+from tables import as_table, save_table, write_table_csv
+
+INDEX_FILE = "index.json"
+DONE_FILE = "done.npy"
+DONE = "__done__"  # Name of the shared memory of the done flags
+
+# Shared memory attached to by this process, by the name of the segment, so the
+# jobs of a worker reuse the same mapping instead of attaching again
+_ATTACHED: dict[str, SharedMemory] = {}
+
+
+def points_key(points: Sequence[Any], documents: Sequence[str] = ()) -> str:
+    """Creates a key that identifies the points of a sweep.
+
+    :param points: The operating points of the sweep.
+    :param documents: The hashes of the documents the points are solved on, see
+        :func:`lib.solved_hash`.
+    :returns: The hex digest of the points and documents.
+    """
+    digest = hashlib.sha256(repr(list(points)).encode())
+    for document in documents:
+        digest.update(b"\0" + document.encode())
+    return digest.hexdigest()
+
+
+def _attach(names: Collection[str]) -> list[SharedMemory]:
+    """Attaches to shared memory once per process.
+
+    A worker solves one sweep at a time, so the segments of other results are
+    closed when it attaches to new ones.
+
+    :param names: The names of the segments.
+    :returns: The segments.
+    """
+    for name in set(_ATTACHED) - set(names):
+        _close(_ATTACHED.pop(name))
+    for name in names:
+        if name not in _ATTACHED:
+            # The workers share the resource tracker of the creating process,
+            # so attaching does not add another owner
+            _ATTACHED[name] = SharedMemory(name=name)
+    return [_ATTACHED[name] for name in names]
+
+
+def _close(memory: SharedMemory):
+    """Closes shared memory in this process."""
+    try:
+        memory.close()
+    except BufferError:
+        # Views of the arrays are still in use, the memory is freed once they
+        # are gone
+        pass
+
+
+def as_record(result: Any) -> Mapping[str, Any]:
+    """Converts the result of a point into a mapping of field values.
+
+    :param result: A mapping, dataclass or named tuple.
+    :returns: The values of each field.
+    """
+    if isinstance(result, Mapping):
+        return result
+    if dataclasses.is_dataclass(result):
+        return {
+            field.name: getattr(result, field.name)
+            for field in dataclasses.fields(result)
+        }
+    if hasattr(result, "_asdict"):
+        return result._asdict()
+    raise TypeError(f"Cannot store a result of type {type(result).__name__}")
+
+
+class ArrayStore(abc.ABC):
+    """Base of the stores of sweep results.
+
+    :param points: The operating points of the sweep.
+    :param fields: The shape of every field of a single point.
+    :param documents: The hashes of the documents the points are solved on.
+    """
+
+    def __init__(
+        self,
+        points: Sequence[Any],
+        fields: Mapping[str, tuple[int, ...]],
+        documents: Sequence[str] = (),
+    ):
+        self.count = len(points)
+        self.key = points_key(points, documents)
+        self.fields = {name: tuple(shape) for name, shape in fields.items()}
+        self._pid = -1
+        self._arrays: dict[str, np.ndarray] = {}
+        self._done: np.ndarray | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The arrays are reopened by every process
+        state = self.__dict__.copy()
+        state.update(_pid=-1, _arrays={}, _done=None)
+        return state
+
+    @abc.abstractmethod
+    def _open(self):
+        """Opens the arrays in this process."""
+
+    @property
+    def done(self) -> np.ndarray:
+        """Whether each point has finished."""
+        self._open()
+        return np.array(self._done, dtype=bool)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every point has finished."""
+        return bool(self.done.all())
+
+    def missing(self) -> list[int]:
+        """Gets the indices of the points that have not finished."""
+        return np.flatnonzero(~self.done).tolist()
+
+    def write(self, index: int, result: Any):
+        """Writes the result of a point and marks it as finished.
+
+        :param index: The index of the point.
+        :param result: The values of every field, see :func:`as_record`.
+        """
+        self._open()
+        record = as_record(result)
+        for name, array in self._arrays.items():
+            array[index] = np.asarray(record[name], dtype=float)
+            if isinstance(array, np.memmap):
+                array.flush()
+        # Only marked as finished once all the values are written
+        assert self._done is not None
+        self._done[index] = 1
+        if isinstance(self._done, np.memmap):
+            self._done.flush()
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Gets a read-only view of a field for every point."""
+        self._open()
+        view = self._arrays[name].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def record(self, index: int) -> dict[str, Any]:
+        """Gets the values of every field of a point."""
+        return {name: self[name][index] for name in self.fields}
+
+    def to_npz(self, path: str, **extra: np.ndarray):
+        """Saves every field into a NumPy archive.
+
+        :param path: The location of the archive.
+        :param extra: Other arrays to save with the fields.
+        """
+        np.savez(path, **{name: self[name] for name in self.fields}, **extra)
+
+    def to_table(self, path: str, columns: Mapping[str, str]) -> np.ndarray:
+        """Saves scalar fields as columns of a table, see :func:`tables.save_table`.
+
+        :param path: The location of the table.
+        :param columns: The field of each column by its header.
+        :returns: The table.
+        """
+        return save_table(
+            path, {header: self[name] for header, name in columns.items()}
+        )
+
+    def to_csv(self, path: str, columns: Mapping[str, str]):
+        """Saves scalar fields as columns of a CSV file.
+
+        :param path: The location of the CSV file.
+        :param columns: The field of each column by its header.
+        """
+        write_table_csv(
+            path, as_table({header: self[name] for header, name in columns.items()})
+        )
+
+
+class ResultStore(ArrayStore):
+    """Results of a sweep stored on disk as they are solved.
+
+    The store is created the first time it is used. When a store already exists
+    at the location for the same points, fields and documents its finished
+    points are kept, otherwise it is replaced. Pass the hashes of the solved
+    documents so editing a document or recording a new mesh setting for it
+    does not resume from the values of the old model.
+
+    >>> store = ResultStore("../dist/task_8.store", range(360), {"torque": ()})
+    >>> store.missing()[:3]
+    [0, 1, 2]
+
+    :param path: The directory of the store.
+    :param points: The operating points of the sweep.
+    :param fields: The shape of every field of a single point.
+    :param documents: The hashes of the documents the points are solved on, see
+        :func:`lib.solved_hash`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        points: Sequence[Any],
+        fields: Mapping[str, tuple[int, ...]],
+        documents: Sequence[str] = (),
+    ):
+        super().__init__(points, fields, documents)
+        self.path = path
+
+    def _index(self) -> dict[str, Any]:
+        """Gets the description of the store written to the index file."""
+        return {
+            "count": self.count,
+            "key": self.key,
+            "fields": {name: list(shape) for name, shape in self.fields.items()},
+        }
+
+    def _open(self):
+        """Opens the files of the store, creating them if needed."""
+        if self._pid == os.getpid():
+            return
+        logger = multiprocessing.get_logger()
+        index_file = os.path.join(self.path, INDEX_FILE)
+        index = None
+        if os.path.exists(index_file):
+            with open(index_file, encoding="utf-8") as file:
+                index = json.load(file)
+
+        mode = "r+"
+        if index != self._index():
+            if index is not None:
+                logger.warning("Replacing result store of another sweep: %s", self.path)
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path)
+            mode = "w+"
+
+        self._arrays = {
+            name: np.lib.format.open_memmap(
+                os.path.join(self.path, f"{name}.npy"),
+                mode=mode,
+                dtype=float,
+                shape=(self.count, *shape),
+            )
+            for name, shape in self.fields.items()
+        }
+        self._done = np.lib.format.open_memmap(
+            os.path.join(self.path, DONE_FILE),
+            mode=mode,
+            dtype=np.uint8,
+            shape=(self.count,),
+        )
+        if mode == "w+":
+            # The index is written last so a partly created store is replaced
+            self._done.flush()
+            with open(index_file, "w", encoding="utf-8") as file:
+                json.dump(self._index(), file)
+        self._pid = os.getpid()
+
+    def clear(self):
+        """Removes the store from disk."""
+        self._arrays = {}
+        self._done = None
+        self._pid = -1
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class SharedResults(ArrayStore):
+    """Results of a sweep kept in shared memory.
+
+    The arrays are created by the process that creates the results and attached
+    to by the workers it is sent to. They are removed when the results are
+    closed, so copy any values that are needed afterwards.
+
+    >>> with SharedResults(range(11), {"torque": ()}) as results:
+    ...     sweep = run_sweep(task_5, range(11), store=results)
+    ...     torque = np.array(results["torque"])
+
+    :param points: The operating points of the sweep.
+    :param fields: The shape of every field of a single point.
+    """
+
+    def __init__(self, points: Sequence[Any], fields: Mapping[str, tuple[int, ...]]):
+        super().__init__(points, fields)
+        self._memory: dict[str, SharedMemory] = {}
+        shapes = {name: (self.count, *shape) for name, shape in self.fields.items()}
+        for name, shape in shapes.items():
+            size = max(1, int(np.prod(shape)) * np.dtype(float).itemsize)
+            self._memory[name] = SharedMemory(create=True, size=size)
+        self._memory[DONE] = SharedMemory(create=True, size=max(1, self.count))
+        self.names = {name: memory.name for name, memory in self._memory.items()}
+        self._owner = os.getpid()
+
+        self._open()
+        assert self._done is not None
+        for array in self._arrays.values():
+            array[:] = 0
+        self._done[:] = 0
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = super().__getstate__()
+        state["_memory"] = {}
+        return state
+
+    def _open(self):
+        """Attaches to the shared memory in this process."""
+        if self._pid == os.getpid():
+            return
+        if not self._memory:
+            self._memory = dict(zip(self.names, _attach(list(self.names.values()))))
+        self._arrays = {
+            name: np.ndarray(
+                (self.count, *shape), dtype=float, buffer=self._memory[name].buf
+            )
+            for name, shape in self.fields.items()
+        }
+        self._done = np.ndarray(
+            (self.count,), dtype=np.uint8, buffer=self._memory[DONE].buf
+        )
+        self._pid = os.getpid()
+
+    def close(self):
+        """Releases the shared memory, removing it in the creating process."""
+        self._arrays = {}
+        self._done = None
+        self._pid = -1
+        for memory in self._memory.values():
+            _ATTACHED.pop(memory.name, None)
+            _close(memory)
+            if os.getpid() == self._owner:
+                memory.unlink()
+        self._memory = {}
+
+    def __enter__(self) -> "SharedResults":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
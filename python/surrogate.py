@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""Fourier surrogate of the torque and flux linkage fitted to sparse solves.
+
+The torque and flux linkage of the machine are smooth periodic functions of the
+electrical rotor angle and of the load angle of the current, so they are fitted
+as truncated Fourier series in both angles with coefficients polynomial in the
+peak current. A term of power ``p`` in the current only has harmonics of the
+load angle from ``-p`` to ``p`` in steps of 2, like the products of ``p``
+phase currents, so the series stays small enough to fit from a few hundred
+solves.
+
+The samples are lines through the rotor and load angles at a few currents,
+each solved as a :class:`spec.Sweep`. Every fit reports its error from K-fold
+cross-validation, and :meth:`FourierSurrogate.predict` evaluates any amount of
+points in one vectorized call.
+
+:func:`run_surrogate` answers every point of a specification with the surrogate
+of each variant and confirms the predictions with a few targeted solves. Set
+``SURROGATE=1`` to solve the sweeps of the tasks this way, see
+:func:`fidelity.solve_spec`.
+"""
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from lib import POLES
+from spec import SpecResult, Sweep, SweepSpec, level_store, quantity_name, run_spec
+
+# Answer the sweeps of the tasks with run_surrogate
+SURROGATE = os.environ.get("SURROGATE", "0") == "1"
+# Directory the surrogate of every variant is saved to
+SURROGATE_DIR = "../dist/surrogates"
+# Quantities the surrogate predicts
+QUANTITIES = ("torque", "flux")
+# Highest harmonic of the electrical rotor angle
+ROTOR_ORDER = 12
+# Degree of the polynomial in the peak current
+CURRENT_DEGREE = 2
+# Folds of the cross-validation
+FOLDS = 5
+# Ridge regularisation relative to the mean squared feature
+RIDGE = 1e-9
+# Peak currents of the samples, evenly spaced from zero to the largest current
+# of the specification
+SAMPLE_CURRENTS = 5
+# Steps of every sample line
+SAMPLE_STEPS = 24
+# Electrical cycles of the load angle and the rotor angle over every line
+SAMPLE_LINES = ((1, 1), (1, 2), (2, 1), (1, 3), (3, 1))
+# Solves confirming the predictions of every variant
+CONFIRM = 8
+
+# Offsets the lines by the golden ratio so they do not cross at the same points
+_GOLDEN = (math.sqrt(5) - 1) / 2
+
+
+def fourier_terms(rotor_order: int = ROTOR_ORDER, degree: int = CURRENT_DEGREE):
+    """Gets the terms of the series.
+
+    :param rotor_order: The highest harmonic of the electrical rotor angle.
+    :param degree: The degree of the polynomial in the peak current.
+    :returns: The power of the current, the harmonic of the rotor angle, the
+        harmonic of the load angle and if it is a sine of every term, with a
+        shape of ``(terms, 4)``.
+    """
+    terms = []
+    for power in range(degree + 1):
+        for load_order in range(-power, power + 1, 2):
+            for order in range(rotor_order + 1):
+                if order == 0 and load_order < 0:
+                    continue
+                terms.append((power, order, load_order, 0))
+                if order or load_order:
+                    terms.append((power, order, load_order, 1))
+    return np.array(terms)
+
+
+def fourier_features(
+    terms: np.ndarray,
+    rotor_angle: ArrayLike,
+    load_angle: ArrayLike,
+    current: ArrayLike,
+    current_scale: float = 1,
+) -> np.ndarray:
+    """Evaluates every term of the series.
+
+    :param terms: The terms, see :func:`fourier_terms`.
+    :param rotor_angle: The mechanical rotor angles in degrees.
+    :param load_angle: The electrical load angles of phase A in degrees.
+    :param current: The peak currents.
+    :param current_scale: The current the powers are taken relative to.
+    :returns: The terms with a shape of ``(*points, terms)``, the points
+        broadcast together.
+    """
+    rotor, load, peak = np.broadcast_arrays(
+        np.asarray(rotor_angle, dtype=float),
+        np.asarray(load_angle, dtype=float),
+        np.asarray(current, dtype=float),
+    )
+    # Every harmonic and power is evaluated once and indexed by the terms
+    orders = np.arange(terms[:, 1].max() + 1)
+    load_orders = np.arange(terms[:, 2].min(), terms[:, 2].max() + 1)
+    electrical = np.radians(rotor * POLES / 2)[..., np.newaxis]
+    rotor_waves = np.exp(1j * orders * electrical)
+    load_waves = np.exp(1j * load_orders * np.radians(load)[..., np.newaxis])
+    waves = (
+        rotor_waves[..., terms[:, 1]] * load_waves[..., terms[:, 2] - load_orders[0]]
+    )
+    trig = np.where(terms[:, 3] == 1, waves.imag, waves.real)
+    powers = (peak[..., np.newaxis] / current_scale) ** np.arange(terms[:, 0].max() + 1)
+    return trig * powers[..., terms[:, 0]]
+
+
+def _least_squares(design: np.ndarray, targets: np.ndarray, ridge: float):
+    """Fits the coefficients of every target with ridge regularisation."""
+    penalty = math.sqrt(ridge * np.mean(design**2)) * np.eye(design.shape[1])
+    padded = np.vstack((targets, np.zeros((design.shape[1], targets.shape[1]))))
+    return np.linalg.lstsq(np.vstack((design, penalty)), padded, rcond=None)[0]
+
+
+@dataclass
+class FourierSurrogate:
+    """Truncated Fourier series of the quantities of a model.
+
+    :param terms: The terms of the series, see :func:`fourier_terms`.
+    :param current_scale: The current the powers are taken relative to.
+    :param coefficients: The coefficients of every quantity with a shape of
+        ``(terms, *quantity)``.
+    :param errors: The RMS and largest error from cross-validation of every
+        quantity, and the largest error relative to the largest sample.
+    """
+
+    terms: np.ndarray
+    current_scale: float
+    coefficients: dict[str, np.ndarray]
+    errors: dict[str, dict[str, float]] = field(default_factory=dict)
+    _amplitudes: dict[str, np.ndarray] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def amplitudes(self, quantity: str) -> np.ndarray:
+        """Gets the coefficients of a quantity as complex amplitudes.
+
+        :param quantity: The quantity.
+        :returns: The amplitudes with a shape of ``(powers, load harmonics,
+            rotor harmonics, values)``, the load harmonics from the lowest.
+        """
+        if quantity not in self._amplitudes:
+            power, order, load_order, sine = self.terms.T
+            coefficients = self.coefficients[quantity].reshape(len(self.terms), -1)
+            load_order = load_order - load_order.min()
+            shape = (power.max() + 1, load_order.max() + 1, order.max() + 1)
+            amplitudes = np.zeros((*shape, coefficients.shape[1]), dtype=complex)
+            # a cos(x) + b sin(x) is the real part of (a - jb) exp(jx)
+            weights = np.where(sine == 1, -1j, 1)[:, np.newaxis] * coefficients
+            np.add.at(amplitudes, (power, load_order, order), weights)
+            self._amplitudes[quantity] = amplitudes
+        return self._amplitudes[quantity]
+
+    def predict(
+        self,
+        rotor_angle: ArrayLike,
+        load_angle: ArrayLike,
+        current: ArrayLike,
+        quantity: str = "torque",
+    ) -> np.ndarray:
+        """Predicts a quantity at many operating points at once.
+
+        >>> surrogate.predict(23.1 + 0.5 * steps, 77 + steps, 20).mean()
+
+        :param rotor_angle: The mechanical rotor angles in degrees.
+        :param load_angle: The electrical load angles of phase A in degrees.
+        :param current: The peak currents.
+        :param quantity: The quantity, ``"torque"`` or ``"flux"``.
+        :returns: The values with a shape of ``(*points, *quantity)``.
+        """
+        rotor, load, peak = np.broadcast_arrays(
+            np.asarray(rotor_angle, dtype=float),
+            np.asarray(load_angle, dtype=float),
+            np.asarray(current, dtype=float),
+        )
+        amplitudes = self.amplitudes(quantity)
+        powers, loads, orders, size = amplitudes.shape
+        electrical = np.radians(rotor.ravel() * POLES / 2)
+        rotor_waves = np.exp(1j * np.outer(electrical, np.arange(orders)))
+        load_orders = np.arange(loads) + self.terms[:, 2].min()
+        load_waves = np.exp(1j * np.outer(np.radians(load.ravel()), load_orders))
+        peak_powers = (peak.ravel()[:, np.newaxis] / self.current_scale) ** np.arange(
+            powers
+        )
+
+        # Summing over the rotor harmonics first, then the load angle and power
+        by_rotor = rotor_waves @ np.moveaxis(amplitudes, 2, 0).reshape(orders, -1)
+        by_rotor = by_rotor.reshape(-1, powers, loads, size)
+        values = np.einsum("xpnk,xn,xp->xk", by_rotor, load_waves, peak_powers).real
+        return values.reshape(rotor.shape + self.coefficients[quantity].shape[1:])
+
+    def save(self, path: str):
+        """Saves the surrogate to a ``.npz`` file.
+
+        :param path: The location of the file.
+        """
+        np.savez(
+            path,
+            terms=self.terms,
+            current_scale=self.current_scale,
+            errors=json.dumps(self.errors),
+            **{
+                f"coefficients_{name}": value
+                for name, value in self.coefficients.items()
+            },
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FourierSurrogate":
+        """Loads a surrogate saved by :meth:`save`.
+
+        :param path: The location of the file.
+        :returns: The surrogate.
+        """
+        with np.load(path) as file:
+            return cls(
+                file["terms"],
+                float(file["current_scale"]),
+                {
+                    name.removeprefix("coefficients_"): file[name]
+                    for name in file.files
+                    if name.startswith("coefficients_")
+                },
+                json.loads(str(file["errors"])),
+            )
+
+
+def fit_surrogate(
+    rotor_angle: np.ndarray,
+    load_angle: np.ndarray,
+    current: np.ndarray,
+    outputs: dict[str, np.ndarray],
+    *,
+    rotor_order: int = ROTOR_ORDER,
+    degree: int = CURRENT_DEGREE,
+    folds: int = FOLDS,
+    ridge: float = RIDGE,
+) -> FourierSurrogate:
+    """Fits the series to samples and cross-validates it.
+
+    :param rotor_angle: The mechanical rotor angle of every sample in degrees.
+    :param load_angle: The electrical load angle of every sample in degrees.
+    :param current: The peak current of every sample.
+    :param outputs: The values of every quantity with a shape of
+        ``(samples, *quantity)``.
+    :param rotor_order: The highest harmonic of the electrical rotor angle.
+    :param degree: The degree of the polynomial in the peak current.
+    :param folds: The folds of the cross-validation.
+    :param ridge: The ridge regularisation.
+    :returns: The surrogate.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    terms = fourier_terms(rotor_order, degree)
+    current_scale = float(np.max(np.abs(current))) or 1.0
+    design = fourier_features(terms, rotor_angle, load_angle, current, current_scale)
+    targets = np.hstack([value.reshape(len(design), -1) for value in outputs.values()])
+    valid = np.isfinite(targets).all(axis=1)
+    design, targets = design[valid], targets[valid]
+    if len(design) < len(terms):
+        raise ValueError(f"{len(design)} samples cannot fit {len(terms)} terms")
+
+    fitted = _least_squares(design, targets, ridge)
+    residuals = np.zeros_like(targets)
+    order = np.random.default_rng(0).permutation(len(design))
+    for fold in np.array_split(order, folds):
+        training = np.setdiff1d(order, fold)
+        fold_fit = _least_squares(design[training], targets[training], ridge)
+        residuals[fold] = targets[fold] - design[fold] @ fold_fit
+
+    coefficients = {}
+    errors = {}
+    column = 0
+    for name, value in outputs.items():
+        shape = value.shape[1:]
+        size = int(np.prod(shape, dtype=int))
+        coefficients[name] = fitted[:, column : column + size].reshape(-1, *shape)
+        residual = residuals[:, column : column + size]
+        largest = np.max(np.abs(targets[:, column : column + size]))
+        errors[name] = {
+            "rms": float(np.sqrt(np.mean(residual**2))),
+            "max": float(np.max(np.abs(residual))),
+            "relative": float(np.max(np.abs(residual)) / largest) if largest else 0.0,
+        }
+        column += size
+    return FourierSurrogate(terms, current_scale, coefficients, errors)
+
+
+def sample_currents(spec: SweepSpec, amount: int = SAMPLE_CURRENTS) -> list[float]:
+    """Gets the peak currents the samples are solved at.
+
+    The polynomial in the current only holds between the currents it is fitted
+    to, so they span from zero to the largest current of the specification.
+
+    :param spec: The specification to answer with the surrogate.
+    :param amount: The amount of currents.
+    :returns: The currents, only zero if every sweep is without current.
+    """
+    largest = max(
+        abs(float(current)) for sweep in spec.sweeps for current in sweep.currents
+    )
+    return np.unique(np.linspace(0, largest, amount)).tolist()
+
+
+def sample_spec(spec: SweepSpec) -> SweepSpec:
+    """Gets the samples the surrogate of every variant is fitted to.
+
+    :param spec: The specification to answer with the surrogate.
+    :returns: The specification with the sample lines in place of its sweeps.
+    """
+    currents = sample_currents(spec)
+    sweeps = []
+    for index, (load_cycles, rotor_cycles) in enumerate(SAMPLE_LINES):
+        offset = (index * _GOLDEN) % 1
+        sweeps.append(
+            Sweep(
+                f"sample_{index}",
+                steps=range(SAMPLE_STEPS),
+                currents=currents,
+                load_angle=(360 * offset, 360 * load_cycles / SAMPLE_STEPS),
+                rotor_angle=(
+                    720 / POLES * offset,
+                    720 / POLES * rotor_cycles / SAMPLE_STEPS,
+                ),
+                quantities=QUANTITIES,
+            )
+        )
+    return replace(spec, sweeps=sweeps)
+
+
+def sweep_inputs(sweep: Sweep) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gets the rotor angle, load angle and peak current of every solve.
+
+    A sweep that leaves the rotor where it is is taken at the angle of the
+    document.
+
+    :param sweep: The sweep.
+    :returns: The inputs with a shape of ``(currents, steps)``.
+    """
+    steps = np.asarray(sweep.steps, dtype=float)
+    rotor = np.zeros_like(steps)
+    if sweep.rotor_angle is not None:
+        rotor = sweep.rotor_angle[0] + sweep.rotor_angle[1] * steps
+    load = sweep.load_angle[0] + sweep.load_angle[1] * steps
+    current = np.asarray(sweep.currents, dtype=float)[:, np.newaxis]
+    rotor, load, current = np.broadcast_arrays(rotor, load, current)
+    return rotor, load, current
+
+
+def _extracted(sweep: Sweep) -> set[str]:
+    """Gets the fields a sweep extracts at any step."""
+    return {
+        quantity_name(quantity)
+        for step in sweep.steps
+        for quantity in sweep.step_quantities(step)
+    }
+
+
+@dataclass
+class SurrogateResult(SpecResult):
+    """The results of :func:`run_surrogate`.
+
+    The values are predicted by the surrogates, apart from the confirming
+    solves. The sweep is the sweep of the samples.
+    """
+
+    surrogates: list[FourierSurrogate] = field(default_factory=list)
+    confirmed: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=int))
+    confirmation: dict[str, float] = field(default_factory=dict)
+
+    def log_surrogate(self, logger: logging.Logger):
+        """Logs the errors of the surrogates and the confirming solves.
+
+        :param logger: The logger to log to.
+        """
+        for variant, surrogate in zip(self.spec.variants, self.surrogates):
+            label = "" if variant is None else f" of {variant}"
+            for name, errors in surrogate.errors.items():
+                logger.info(
+                    "Surrogate%s %s cross-validated error: %.4g RMS, %.4g max (%.2f%%)",
+                    label,
+                    name,
+                    errors["rms"],
+                    errors["max"],
+                    100 * errors["relative"],
+                )
+        for name, error in self.confirmation.items():
+            logger.info(
+                "Largest %s error of %s confirming solves: %.4g",
+                name,
+                self.confirmed.size,
+                error,
+            )
+
+
+def run_surrogate(
+    spec: SweepSpec,
+    *,
+    processes: int | None = None,
+    confirm: int = CONFIRM,
+    surrogate_dir: str | None = SURROGATE_DIR,
+    store: str | None = None,
+) -> SurrogateResult:
+    """Answers a specification with a surrogate of every variant.
+
+    The samples are solved on the variants of the specification, then the
+    torque and flux linkage of every solve are predicted. The solves with the
+    largest and smallest predicted torque of every variant, and random others
+    up to ``confirm``, are solved to confirm the predictions and keep their
+    solved values. Other quantities are NaN.
+
+    :param spec: The specification to answer.
+    :param processes: The amount of workers.
+    :param confirm: The confirming solves of every variant.
+    :param surrogate_dir: The directory the surrogates are saved to, they are
+        not saved if ``None``.
+    :param store: The location of the result store of the confirming solves,
+        which is shared with :func:`spec.run_spec` without ``indices``. The
+        samples are stored next to it, see :func:`spec.level_store`.
+    :returns: The predicted results.
+    """
+    samples_spec = sample_spec(spec)
+    samples = run_spec(
+        samples_spec, processes=processes, store=level_store(store, "samples")
+    )
+    inputs = [sweep_inputs(sweep) for sweep in samples_spec.sweeps]
+    surrogates = []
+    for variant in range(len(spec.variants)):
+        surrogate = fit_surrogate(
+            *(
+                np.concatenate([item[axis].ravel() for item in inputs])
+                for axis in range(3)
+            ),
+            {
+                name: np.concatenate(
+                    [
+                        samples.get(sweep.name, name)[variant].reshape(
+                            -1, *samples.values[name].shape[1:]
+                        )
+                        for sweep in samples_spec.sweeps
+                    ]
+                )
+                for name in QUANTITIES
+            },
+        )
+        surrogates.append(surrogate)
+        if surrogate_dir is not None:
+            os.makedirs(surrogate_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(spec.variant_document(variant)))[0]
+            surrogate.save(os.path.join(surrogate_dir, f"{name}.npz"))
+
+    count = len(spec.tasks())
+    values = {
+        name: np.full((count, *shape), math.nan)
+        for name, shape in spec.fields().items()
+    }
+    for sweep in spec.sweeps:
+        indices = spec.indices(sweep.name)
+        rotor, load, current = sweep_inputs(sweep)
+        for name in _extracted(sweep).intersection(QUANTITIES):
+            for variant, surrogate in enumerate(surrogates):
+                values[name][indices[variant]] = surrogate.predict(
+                    rotor, load, current, name
+                )
+
+    confirmed = _confirming(spec, values.get("torque"), confirm)
+    confirmation = {}
+    if confirmed.size:
+        solved = run_spec(
+            spec, processes=processes, store=store, indices=confirmed, prepare=False
+        )
+        for name in _predicted(values):
+            error = np.abs(solved.values[name][confirmed] - values[name][confirmed])
+            confirmation[name] = float(np.nanmax(error, initial=0))
+        for name, value in values.items():
+            value[confirmed] = solved.values[name][confirmed]
+
+    return SurrogateResult(
+        spec,
+        values,
+        samples.sweep,
+        surrogates=surrogates,
+        confirmed=confirmed,
+        confirmation=confirmation,
+    )
+
+
+def _predicted(values: dict[str, np.ndarray]) -> list[str]:
+    """Gets the fields predicted by the surrogate."""
+    return [name for name in QUANTITIES if name in values]
+
+
+def _confirming(spec: SweepSpec, torque: np.ndarray | None, confirm: int) -> np.ndarray:
+    """Chooses the solves confirming the predictions of every variant."""
+    generator = np.random.default_rng(0)
+    chosen = []
+    for variant in range(len(spec.variants)):
+        indices = np.concatenate(
+            [spec.indices(sweep.name)[variant].ravel() for sweep in spec.sweeps]
+        )
+        picked: list[int] = []
+        if torque is not None and np.isfinite(torque[indices]).any():
+            picked.extend(
+                indices[[np.nanargmax(torque[indices]), np.nanargmin(torque[indices])]]
+            )
+        rest = np.setdiff1d(indices, picked)
+        amount = min(max(confirm - len(picked), 0), rest.size)
+        picked.extend(generator.choice(rest, amount, replace=False))
+        chosen.extend(picked[:confirm])
+    return np.unique(np.array(chosen, dtype=int))
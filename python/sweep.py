@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Dynamic scheduling of sweeps over operating points."""
+import logging
+import math
+import multiprocessing
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from lib import FEMMPool
+from store import ArrayStore
+from tracing import span
+
+BatchFunction = Callable[[list[Any]], list[Any]]
+
+
+@dataclass
+class WorkerStats:
+    """The amount of work done by a single worker during a sweep."""
+
+    batches: int = 0
+    points: int = 0
+    busy: float = 0
+
+
+@dataclass
+class SweepResult:
+    """The results of a sweep.
+
+    The results are in the same order as the requested points. Sweeps with a
+    store have the stored record of every point instead.
+    """
+
+    points: list[Any]
+    results: list[Any]
+    wall_time: float
+    workers: dict[str, WorkerStats] = field(default_factory=dict)
+
+    def utilisation(self) -> dict[str, float]:
+        """Gets the fraction of the sweep time each worker spent working."""
+        if self.wall_time <= 0:
+            return {name: 0.0 for name in self.workers}
+        return {
+            name: stats.busy / self.wall_time for name, stats in self.workers.items()
+        }
+
+    def log_utilisation(self, logger: logging.Logger):
+        """Logs the utilisation of every worker.
+
+        :param logger: The logger to log to.
+        """
+        logger.info("Solved %s points in %.2f s", len(self.points), self.wall_time)
+        utilisation = self.utilisation()
+        for name, stats in sorted(self.workers.items()):
+            logger.info(
+                "%s: %s points in %s batches, %.2f s busy (%.0f%%)",
+                name,
+                stats.points,
+                stats.batches,
+                stats.busy,
+                utilisation[name] * 100,
+            )
+
+
+class _TimedBatch:
+    """Runs a batch function and records who ran it and for how long."""
+
+    def __init__(self, func: BatchFunction, store: ArrayStore | None = None):
+        self.func = func
+        self.store = store
+        if hasattr(func, "femm_document"):
+            # Lets the worker know the function opens its own document
+            self.femm_document = getattr(func, "femm_document")
+
+    def __call__(
+        self, batch: list[Any], indices: list[int]
+    ) -> tuple[str, float, int, list[Any] | None]:
+        start = time.perf_counter()
+        name = getattr(self.func, "__qualname__", type(self.func).__name__)
+        with span(name, "batch", points=len(batch)):
+            results = self.func(batch)
+        elapsed = time.perf_counter() - start
+        if len(results) != len(batch):
+            raise ValueError(
+                f"Batch of {len(batch)} points returned {len(results)} results"
+            )
+        name = multiprocessing.current_process().name
+        if self.store is None:
+            return name, elapsed, len(results), results
+
+        # The results are already in the store so none are sent back
+        with span("write", "store", points=len(results)):
+            for index, result in zip(indices, results):
+                self.store.write(index, result)
+        return name, elapsed, len(results), None
+
+
+def batches(points: Sequence[Any], batch_size: int) -> list[list[Any]]:
+    """Splits the points into batches of at most ``batch_size`` points.
+
+    Every point is in exactly one batch, in order.
+
+    :param points: The points to split.
+    :param batch_size: The maximum amount of points in a batch.
+    :returns: The batches.
+    """
+    if batch_size < 1:
+        raise ValueError("The batch size must be at least 1")
+    return [list(points[i : i + batch_size]) for i in range(0, len(points), batch_size)]
+
+
+def default_batch_size(count: int, processes: int) -> int:
+    """Gets a batch size that gives every worker several batches.
+
+    :param count: The amount of points in the sweep.
+    :param processes: The amount of workers.
+    :returns: The batch size.
+    """
+    return max(1, min(8, math.ceil(count / (processes * 4))))
+
+
+def chained_batches(
+    indices: Sequence[int],
+    chains: Sequence[Any],
+    batch_size: int,
+    processes: int,
+) -> list[list[int]]:
+    """Splits the points into batches that keep warm start chains together.
+
+    The consecutive points of a chain are split into as few contiguous batches
+    as keep every worker busy, one batch per chain once there are as many
+    chains as workers, so only the first point of every batch starts cold. The
+    points without a chain are split into batches of at most ``batch_size``
+    points. Every point is in exactly one batch, in order.
+
+    :param indices: The indices of the points to split.
+    :param chains: The chain of every point, ``None`` for points without one.
+    :param batch_size: The maximum amount of points in a batch without a chain.
+    :param processes: The amount of workers.
+    :returns: The batches of indices.
+    """
+    runs: list[list[int]] = []
+    for index in indices:
+        if runs and chains[runs[-1][-1]] == chains[index]:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+
+    count = sum(1 for run in runs if chains[run[0]] is not None)
+    pieces = math.ceil(processes / count) if count else 1
+    output: list[list[int]] = []
+    for run in runs:
+        if chains[run[0]] is None:
+            output.extend(batches(run, batch_size))
+        else:
+            output.extend(batches(run, math.ceil(len(run) / pieces)))
+    return output
+
+
+def run_sweep(
+    func: BatchFunction,
+    points: Sequence[Any],
+    *,
+    document: str = "../dist/cw1_sliding.fem",
+    processes: int | None = None,
+    batch_size: int | None = None,
+    pool: FEMMPool | None = None,
+    store: ArrayStore | None = None,
+    chains: Sequence[Any] | None = None,
+    subset: Sequence[int] | None = None,
+) -> SweepResult:
+    """Solves all the points, handing out small batches to idle workers.
+
+    All the batches are put on the shared job queue of the pool so a worker
+    that finishes early keeps pulling work instead of waiting for the slowest
+    worker.
+
+    With a store the workers write every result into it as soon as its batch
+    is solved instead of sending it back, and only the points missing from the
+    store are solved.
+
+    :param func: Picklable function that takes a list of points and returns a
+        list with one result per point.
+    :param points: The operating points to solve.
+    :param document: The document to open when creating a new pool.
+    :param processes: The amount of workers when creating a new pool.
+    :param batch_size: The amount of points per batch.
+    :param pool: An existing pool to run the sweep in.
+    :param store: The store to write the results to, made for the same points.
+    :param chains: The warm start chain of every point, see
+        :func:`chained_batches`. The batch size only applies to the points
+        without a chain.
+    :param subset: The indices of the points to solve if they are missing from
+        the store, every point if ``None``. Only used with a store.
+    :returns: The results of the sweep.
+    """
+    # pylint: disable=too-many-arguments
+    logger = multiprocessing.get_logger()
+    points = list(points)
+    if chains is not None and len(chains) != len(points):
+        raise ValueError(f"{len(chains)} chains given for {len(points)} points")
+    wanted = list(range(len(points))) if subset is None else sorted(set(subset))
+    if store is None and subset is not None:
+        raise ValueError("Solving a subset of the points needs a store")
+    if store is not None:
+        if store.count != len(points):
+            raise ValueError(f"Store has {store.count} points, sweep has {len(points)}")
+        if store.done[wanted].all():
+            logger.info("All %s points already solved", len(wanted))
+            return SweepResult(points, [store.record(i) for i in range(len(points))], 0)
+
+    if pool is None:
+        with FEMMPool(document, processes) as new_pool:
+            return run_sweep(
+                func,
+                points,
+                batch_size=batch_size,
+                pool=new_pool,
+                store=store,
+                chains=chains,
+                subset=subset,
+            )
+
+    indices = wanted
+    if store is not None:
+        done = store.done
+        indices = [i for i in wanted if not done[i]]
+        if len(indices) < len(wanted):
+            logger.info(
+                "%s of %s points already solved",
+                len(wanted) - len(indices),
+                len(wanted),
+            )
+
+    if batch_size is None:
+        batch_size = default_batch_size(len(indices), len(pool.workers))
+
+    if chains is None:
+        scheduled = batches(indices, batch_size)
+    else:
+        scheduled = chained_batches(indices, chains, batch_size, len(pool.workers))
+
+    start = time.perf_counter()
+    timed = _TimedBatch(func, store)
+    futures = [
+        pool.submit(timed, [points[i] for i in batch], batch) for batch in scheduled
+    ]
+
+    results: list[Any] = []
+    workers: dict[str, WorkerStats] = {}
+    for future in futures:
+        name, elapsed, count, batch_results = future.result()
+        stats = workers.setdefault(name, WorkerStats())
+        stats.batches += 1
+        stats.points += count
+        stats.busy += elapsed
+        results.extend(batch_results or [])
+
+    if store is not None:
+        results = [store.record(i) for i in range(len(points))]
+    return SweepResult(points, results, time.perf_counter() - start, workers)
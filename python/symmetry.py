@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Reduction of sweeps to the fundamental interval of the machine symmetry.
+
+A 4 pole, 24 slot machine repeats its cogging torque every slot pitch and the
+flux linkage of each phase repeats every electrical period with half-wave
+antisymmetry, each phase shifted by 120° electrical. Only the fundamental
+interval is solved and the full sweep is rebuilt from it.
+"""
+import math
+import multiprocessing
+from typing import Sequence
+
+import numpy as np
+
+from lib import POLES, SLOTS
+
+
+def cogging_period(slots: int = SLOTS, poles: int = POLES) -> float:
+    """Gets the mechanical angle the cogging torque repeats over.
+
+    :param slots: The amount of stator slots.
+    :param poles: The amount of rotor poles.
+    :returns: The period in mechanical degrees.
+    """
+    return 360 / math.lcm(slots, poles)
+
+
+def torque_period(slots: int = SLOTS, poles: int = POLES) -> float:
+    """Gets the mechanical angle the torque under synchronous load repeats over.
+
+    The torque repeats over both the cogging period and the sixth electrical
+    harmonic of the three phase winding.
+
+    :param slots: The amount of stator slots.
+    :param poles: The amount of rotor poles.
+    :returns: The period in mechanical degrees.
+    """
+    sixth_harmonic = 360 / (3 * poles)
+    return _lcm_angle(cogging_period(slots, poles), sixth_harmonic)
+
+
+def flux_interval(poles: int = POLES) -> float:
+    """Gets the mechanical angle needed to rebuild the flux of all phases.
+
+    Using the half-wave antisymmetry and the 120° phase shifts only 60°
+    electrical is needed.
+
+    :param poles: The amount of rotor poles.
+    :returns: The interval in mechanical degrees.
+    """
+    return 360 / (3 * poles)
+
+
+def reconstruct_periodic(
+    samples: np.ndarray, period: float, count: int = 360, step: float = 1
+) -> np.ndarray:
+    """Rebuilds a periodic waveform from one period.
+
+    :param samples: The values from 0 up to the period, sampled every step.
+    :param period: The period of the waveform.
+    :param count: The amount of values to rebuild.
+    :param step: The angle between each sample.
+    :returns: The rebuilt values at ``np.arange(count) * step``.
+    """
+    samples = np.asarray(samples)
+    per_period = _steps(period, step)
+    if samples.shape[0] < per_period:
+        raise ValueError(f"Need {per_period} samples, got {samples.shape[0]}")
+    return samples[np.arange(count) % per_period]
+
+
+def reconstruct_three_phase(
+    samples: np.ndarray,
+    poles: int = POLES,
+    count: int = 360,
+    step: float = 1,
+    sequence: int = 1,
+) -> np.ndarray:
+    """Rebuilds the flux linkage of three phases from the fundamental interval.
+
+    Phase B leads phase A by 120° electrical when ``sequence`` is 1, matching
+    the currents used by the tasks, and lags it when ``sequence`` is -1.
+
+    :param samples: The flux of phase A, B and C with a shape of ``(n, 3)``
+        sampled every step from 0 up to :func:`flux_interval`.
+    :param poles: The amount of rotor poles.
+    :param count: The amount of values to rebuild.
+    :param step: The angle between each sample in mechanical degrees.
+    :param sequence: The phase sequence of the windings.
+    :returns: The rebuilt flux with a shape of ``(count, 3)``.
+    """
+    samples = np.asarray(samples)
+    pole_pairs = poles // 2
+    interval = _steps(flux_interval(poles), step)
+    if samples.shape[0] < interval:
+        raise ValueError(f"Need {interval} samples, got {samples.shape[0]}")
+
+    # Everything is in samples of electrical angle
+    electrical = round(360 / pole_pairs / step)
+    half = electrical // 2
+    shifts = np.array([0, sequence, -sequence]) * (electrical // 3)
+
+    output = np.zeros((count, 3), dtype=samples.dtype)
+    angles = np.arange(count)
+    for phase in range(3):
+        # The angle of phase A that has the same flux
+        target = (angles + shifts[phase]) % electrical
+        for source in range(3):
+            for sign, offset in ((1, 0), (-1, half)):
+                base = (target - offset - shifts[source]) % electrical
+                mask = base < interval
+                output[mask, phase] = sign * samples[base[mask], source]
+    return output
+
+
+def validate(
+    reconstructed: np.ndarray,
+    indices: Sequence[int],
+    solved: np.ndarray,
+    tolerance: float = 0.02,
+) -> float:
+    """Spot-checks rebuilt values against real solves.
+
+    :param reconstructed: The rebuilt values.
+    :param indices: The indices that were solved.
+    :param solved: The solved values at the indices.
+    :param tolerance: The largest allowed error relative to the peak value.
+    :returns: The largest relative error found.
+    """
+    logger = multiprocessing.get_logger()
+    if len(indices) == 0:
+        return 0.0
+
+    reconstructed = np.asarray(reconstructed)
+    scale = np.abs(reconstructed).max() or 1
+    difference = reconstructed[list(indices)] - np.asarray(solved)
+    error = float(np.abs(difference).max() / scale)
+    logger.info("Symmetry Validation Error: %.3g%%", error * 100)
+    if error > tolerance:
+        raise ValueError(
+            f"Reconstructed sweep differs from the solved points by {error:.3g}"
+        )
+    return error
+
+
+def validation_indices(start: int, count: int = 360, amount: int = 3) -> list[int]:
+    """Gets evenly spread indices outside of the solved interval.
+
+    :param start: The first index that was not solved.
+    :param count: The total amount of values.
+    :param amount: The amount of indices to check.
+    :returns: The indices.
+    """
+    if amount <= 0 or start >= count:
+        return []
+    spacing = (count - start) / amount
+    return sorted({start + int(spacing * (i + 0.5)) for i in range(amount)})
+
+
+def _steps(angle: float, step: float) -> int:
+    """Gets the amount of steps in an angle, which must be a whole number."""
+    steps = angle / step
+    if not math.isclose(steps, round(steps)):
+        raise ValueError(f"{angle}° is not a multiple of the {step}° step")
+    return round(steps)
+
+
+def _lcm_angle(first: float, second: float) -> float:
+    """Gets the least common multiple of two angles in 1/1000 degrees."""
+    return math.lcm(round(first * 1000), round(second * 1000)) / 1000
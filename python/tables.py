@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tables of results saved as typed binary files.
+
+A table is a structured NumPy array with one named field per column, saved as
+``<name>.npy`` so it is loaded memory-mapped instead of parsed. The CSV file of
+a table is only written on request, with ``write_csv`` or by setting the
+``WRITE_CSV`` environment variable to 1.
+
+Tables that only exist as CSV files, e.g. the ones written by the MATLAB
+scripts, are parsed once into a ``<name>.csv.npy`` sidecar, which is used until
+the CSV file changes.
+"""
+import csv
+import multiprocessing
+import os
+from typing import Mapping
+
+import numpy as np
+from numpy.lib import recfunctions
+from numpy.typing import ArrayLike
+
+# Also write every table as a CSV file
+WRITE_CSV = os.environ.get("WRITE_CSV", "0") == "1"
+
+
+def _stem(path: str) -> str:
+    """Gets the location of a table without its extension."""
+    stem, extension = os.path.splitext(path)
+    return stem if extension in (".csv", ".npy") else path
+
+
+def _newer(first: str, second: str) -> bool:
+    """Checks if the first file exists and the second is missing or older."""
+    if not os.path.exists(first):
+        return False
+    if not os.path.exists(second):
+        return True
+    return os.path.getmtime(first) > os.path.getmtime(second)
+
+
+def as_table(columns: Mapping[str, ArrayLike]) -> np.ndarray:
+    """Creates a table from its columns.
+
+    :param columns: The values of every column by its header, all of the same
+        length.
+    :returns: The structured array.
+    """
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    lengths = {array.shape[0] for array in arrays.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"The columns have different lengths: {sorted(lengths)}")
+    table = np.empty(
+        lengths.pop(), dtype=[(name, array.dtype) for name, array in arrays.items()]
+    )
+    for name, array in arrays.items():
+        table[name] = array
+    return table
+
+
+def save_table(
+    path: str, columns: Mapping[str, ArrayLike], write_csv: bool | None = None
+) -> np.ndarray:
+    """Saves the columns of a table.
+
+    :param path: The location of the table, with or without the extension.
+    :param columns: The values of every column by its header.
+    :param write_csv: If the CSV file is written as well, ``WRITE_CSV`` by
+        default.
+    :returns: The table.
+    """
+    stem = _stem(path)
+    table = as_table(columns)
+    os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+    if WRITE_CSV if write_csv is None else write_csv:
+        write_table_csv(f"{stem}.csv", table)
+    # Saved last so it is never older than its own CSV file
+    np.save(f"{stem}.npy", table)
+    return table
+
+
+def write_table_csv(path: str, table: np.ndarray):
+    """Writes a table as a CSV file with a header row.
+
+    :param path: The location of the CSV file.
+    :param table: The table.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        csv.writer(file).writerow(table.dtype.names)
+        np.savetxt(file, table_columns(table), fmt="%.17g", delimiter=",")
+
+
+def read_table_csv(path: str) -> np.ndarray:
+    """Parses a CSV file with a header row of column names.
+
+    :param path: The location of the CSV file.
+    :returns: The table with a float column for every header.
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        header = next(csv.reader(file))
+        values = np.loadtxt(file, delimiter=",", ndmin=2)
+    names = [name.strip() or f"column {index}" for index, name in enumerate(header)]
+    return as_table(dict(zip(names, values.T)))
+
+
+def load_table(path: str) -> np.ndarray:
+    """Loads a table memory-mapped.
+
+    The binary table is used unless the CSV file is newer, in which case the
+    CSV file is parsed into its sidecar once.
+
+    :param path: The location of the table, with or without the extension.
+    :returns: The read-only table.
+    """
+    logger = multiprocessing.get_logger()
+    stem = _stem(path)
+    binary = f"{stem}.npy"
+    text = f"{stem}.csv"
+    if os.path.exists(binary) and not _newer(text, binary):
+        return np.load(binary, mmap_mode="r")
+    if not os.path.exists(text):
+        raise FileNotFoundError(f"No table at {binary} or {text}")
+
+    sidecar = f"{text}.npy"
+    if _newer(text, sidecar):
+        logger.info("Parsing %s", text)
+        np.save(sidecar, read_table_csv(text))
+    return np.load(sidecar, mmap_mode="r")
+
+
+def table_columns(table: np.ndarray) -> np.ndarray:
+    """Gets the columns of a table as a 2D float array.
+
+    :param table: The table.
+    :returns: The values with one column per field.
+    """
+    return recfunctions.structured_to_unstructured(table, dtype=float)
+
+
+def load_columns(path: str) -> np.ndarray:
+    """Loads a table as a 2D float array, see :func:`load_table`.
+
+    :param path: The location of the table, with or without the extension.
+    :returns: The values with one column per field.
+    """
+    return table_columns(load_table(path))
@@ -1,29 +1,21 @@
 #!/usr/bin/env python3
 """Script for task 10."""
-import csv
 import logging
 import multiprocessing
-import os
-from dataclasses import dataclass
-from multiprocessing import Pool
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import femm_handler, I_PEAK, SLOT_ANGLE
+from fem import FemDocument, plot_geometry
+from fidelity import solve_spec
+from lib import SLOT_ANGLE
+from metrics import peak_above_mean, ripple_amplitude
+from report import FIGURES, render_report
+from spec import Sweep, SweepSpec
+from spectrum import save_spectra, spectrum
+from tables import save_table
 
 
-@dataclass
-class TaskData:
-    """The output data format for the collected data."""
-
-    opening_factor: float
-    dev_torque: np.ndarray
-    cogging_torque: np.ndarray
-
-
-def change_slot_opening(opening_factor: float):
+def change_slot_opening(document: FemDocument, opening_factor: float):
     """Change the machine slot opening factor.
 
     The slot opening factor is the variation between slot width and slot opening
@@ -35,6 +27,7 @@ def change_slot_opening(opening_factor: float):
 
     The slot opening factor must be between 0 (exclusive) and 1 (inclusive).
 
+    :param document: The document to edit.
     :param opening_factor: The slot opening factor to change to.
     """
     if not 0 < opening_factor <= 1:
@@ -59,96 +52,61 @@ def change_slot_opening(opening_factor: float):
         thread_logger.debug("Left Slot Angle: %s°", np.degrees(left_slot_angle))
 
         thread_logger.info("Moving the left side of the slot")
-        femm.mi_selectnode(25 * np.cos(left_slot_angle), 25 * np.sin(left_slot_angle))
-        femm.mi_selectnode(
-            26.4 * np.cos(left_slot_angle), 26.4 * np.sin(left_slot_angle)
-        )
-        femm.mi_moverotate(0, 0, rotate_angle)
-        femm.mi_clearselected()
+        nodes = [
+            document.closest_node(
+                radius * np.cos(left_slot_angle), radius * np.sin(left_slot_angle)
+            )
+            for radius in (25, 26.4)
+        ]
+        document.rotate_nodes(nodes, rotate_angle)
 
         thread_logger.info("Moving the right side of the slot")
-        femm.mi_selectnode(25 * np.cos(right_slot_angle), 25 * np.sin(right_slot_angle))
-        femm.mi_selectnode(
-            26.4 * np.cos(right_slot_angle), 26.4 * np.sin(right_slot_angle)
-        )
-        femm.mi_moverotate(0, 0, -rotate_angle)
-        femm.mi_clearselected()
+        nodes = [
+            document.closest_node(
+                radius * np.cos(right_slot_angle), radius * np.sin(right_slot_angle)
+            )
+            for radius in (25, 26.4)
+        ]
+        document.rotate_nodes(nodes, -rotate_angle)
 
 
-@femm_handler("../dist/cw1_sliding.fem")
-def task_10(opening_factor: float) -> TaskData:
-    """Function to get data for Task 10.
+def prepare_slot_opening(document: FemDocument, opening_factor: float):
+    """Prepares the model of a slot opening factor for Task 10.
 
+    :param document: The document to edit.
     :param opening_factor: The slot factor of the machine.
-    :returns: The data collected for the simulations.
     """
     thread_logger = multiprocessing.get_logger()
     thread_logger.info("Slot Opening Factor: %s", opening_factor)
-    change_slot_opening(opening_factor)
-    femm.smartmesh(1)
+    change_slot_opening(document, opening_factor)
 
     # Saving Images
-    os.makedirs("../dist/task_10_models/", exist_ok=True)
     file_name = f"../dist/task_10_models/task_10_{round(opening_factor, 2)}"
     thread_logger.debug("File Name: %s", file_name)
     thread_logger.info("Saving Images")
-    femm.mi_savebitmap(f"{file_name}.bmp")
-    thread_logger.info("Converting Image into PNG")
-    img = plt.imread(f"{file_name}.bmp")
-    plt.imsave(f"{file_name}.png", img)
-
-    thread_logger.info("Getting Torque Ripple and Overall Torque")
-    dev_torque = np.zeros(360, float)
-    for angle in range(360):
-        femm.mi_modifycircprop("A", 1, I_PEAK * np.sin(np.radians(angle + 77)))
-        femm.mi_modifycircprop("B", 1, I_PEAK * np.sin(np.radians(angle + 77 + 120)))
-        femm.mi_modifycircprop("C", 1, I_PEAK * np.sin(np.radians(angle + 77 - 120)))
-        femm.mi_modifyboundprop("Sliding Boundary", 10, angle / 2 + 23.1)
-
-        # Debug
-        thread_logger.info("Load Angle %s°", angle + 77)
-        thread_logger.debug("A: %s A", I_PEAK * np.sin(np.radians(angle + 77)))
-        thread_logger.debug("B: %s A", I_PEAK * np.sin(np.radians(angle + 77 + 120)))
-        thread_logger.debug("C: %s A", I_PEAK * np.sin(np.radians(angle + 77 - 120)))
+    plot_geometry(document, f"{file_name}.png")
 
-        # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
-        dev_torque[angle] = femm.mo_gapintegral("Sliding Boundary", 0)
 
-        thread_logger.debug("Torque: %s", dev_torque[angle])
+def task_10(slot_factor: np.ndarray) -> SweepSpec:
+    """Creates the sweeps of Task 10.
 
-        # Setting up for next cycle
-        femm.mo_close()
+    The torque ripple and cogging torque are solved on the model of every slot
+    opening factor.
 
-    thread_logger.info("Getting Cogging Torque")
-    cogging_torque = np.zeros(360, float)
-
-    femm.mi_modifycircprop("A", 1, 0)
-    femm.mi_modifycircprop("B", 1, 0)
-    femm.mi_modifycircprop("C", 1, 0)
-
-    for angle in range(360):
-        femm.mi_modifyboundprop("Sliding Boundary", 10, angle)
-
-        # Debug
-        thread_logger.info("Rotor Angle %s°", angle + 77)
-
-        # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
-        cogging_torque[angle] = femm.mo_gapintegral("Sliding Boundary", 0)
-
-        thread_logger.debug("Torque: %s", cogging_torque[angle])
-
-        # Setting up for next cycle
-        femm.mo_close()
-
-    # Saving Model
-    thread_logger.info("Saving Model")
-    femm.mi_saveas(f"{file_name}.fem")
-
-    return TaskData(opening_factor, dev_torque, cogging_torque)
+    :param slot_factor: The slot factors of the machine.
+    :returns: The sweep specification.
+    """
+    return SweepSpec(
+        "../dist/cw1_sliding.fem",
+        [
+            Sweep("torque", load_angle=(77, 1), rotor_angle=(23.1, 0.5)),
+            Sweep("cogging", currents=(0,), load_angle=(0, 0), rotor_angle=(0, 1)),
+        ],
+        variants=[round(factor, 2) for factor in slot_factor],
+        prepare=prepare_slot_opening,
+        variant_dir="../dist/task_10_models",
+        variant_name="task_10_{variant}",
+    )
 
 
 def main():
@@ -158,60 +116,45 @@ def main():
     end_factor = 1.1
     factor_step = 0.1
     slot_factor: np.ndarray = np.arange(start_factor, end_factor, factor_step)  # type: ignore
-    threads = slot_factor.size
 
     logger.debug("Opening Slot Factor: %s", slot_factor)
 
     logger.info("Gathering Data")
-    with Pool(threads) as p:
-        data_collected = p.map(task_10, slot_factor)
+    result = solve_spec(task_10(slot_factor), store="../dist/task_10.store")
+    result.sweep.log_utilisation(logger)
 
-    os.makedirs("../dist", exist_ok=True)
     logger.info("Analyzing Data")
-    mean_torque = np.zeros_like(slot_factor)
-    dev_torque = np.zeros((slot_factor.size, 360))
-    cogging_torque = np.zeros((slot_factor.size, 360))
-
-    with open("../dist/task_10.csv", "w", encoding="utf-8") as file:
-        csv_writer = csv.writer(file)
-
-        csv_writer.writerow(
-            (
-                "Slot Opening Factor",
-                "Overall Torque",
-                "Developed Torque Amplitude",
-                "Cogging Torque Amplitude",
-            )
-        )
-
-        for i, data in enumerate(data_collected):
-            dev_torque[i] = data.dev_torque
-            cogging_torque[i] = data.cogging_torque
-            mean_torque[i] = abs(data.dev_torque).mean()
-
-            csv_writer.writerow(
-                (
-                    data.opening_factor,
-                    mean_torque[i],
-                    abs(data.dev_torque).max() - data.dev_torque.mean(),
-                    abs(data.cogging_torque).max() - data.cogging_torque.mean(),
-                )
-            )
+    dev_torque = result.get("torque", "torque")[:, 0]
+    cogging_torque = result.get("cogging", "torque")[:, 0]
+    mean_torque = abs(dev_torque).mean(axis=1)
+
+    save_table(
+        "../dist/task_10",
+        {
+            "Slot Opening Factor": slot_factor,
+            "Overall Torque": mean_torque,
+            "Developed Torque Amplitude": ripple_amplitude(dev_torque),
+            "Cogging Torque Amplitude": ripple_amplitude(cogging_torque),
+            "Torque Ripple Amplitude": peak_above_mean(dev_torque),
+            "Cogging Ripple Amplitude": peak_above_mean(cogging_torque),
+        },
+    )
 
     angles = np.arange(0, 360)
-    out_data = np.fromiter(
-        zip(angles, *dev_torque, *cogging_torque), np.dtype((float, 21)), 360
+    save_table(
+        "../dist/task_10_raw",
+        {
+            "Load Angle": angles,
+            **{
+                f"Ripple {round(factor, 2)}": torque
+                for factor, torque in zip(slot_factor, dev_torque)
+            },
+            **{
+                f"Cogging {round(factor, 2)}": torque
+                for factor, torque in zip(slot_factor, cogging_torque)
+            },
+        },
     )
-    with open("../dist/task_10_raw.csv", "w", encoding="utf-8") as file:
-        csv_writer = csv.writer(file)
-        csv_writer.writerow(
-            (
-                "Load Angle",
-                *tuple(f"Ripple {round(factor, 2)}" for factor in slot_factor),
-                *tuple(f"Cogging {round(factor, 2)}" for factor in slot_factor),
-            )
-        )
-        csv_writer.writerows(out_data)
 
     logger.info("Saving Data")
     np.savez(
@@ -222,128 +165,24 @@ def main():
         mean_torque=mean_torque,
     )
 
-    plot_data(slot_factor, mean_torque, dev_torque, cogging_torque)
-
-
-def plot_data(
-    slot_factor: np.ndarray,
-    mean_torque: np.ndarray,
-    dev_torque: np.ndarray,
-    cogging_torque: np.ndarray,
-):
-    """Plots all the data.
+    # The rotor turns 180° over the torque sweep and 360° over the cogging sweep
+    logger.info("Finding Harmonics")
+    ripple_spectrum = spectrum(dev_torque, span=180)
+    cogging_spectrum = spectrum(cogging_torque)
+    save_spectra(
+        "../dist/task_10_spectrum.npz",
+        torque=ripple_spectrum,
+        cogging=cogging_spectrum,
+    )
+    logger.info(
+        "Dominant Ripple Orders: %s", ripple_spectrum.dominant(electrical=True)[0]
+    )
+    logger.info(
+        "Dominant Cogging Orders: %s", cogging_spectrum.dominant(electrical=True)[0]
+    )
 
-    :param slot_factor: The list of slot factors.
-    :param mean_torque: The list of mean torque.
-    :param dev_torque: The list of developed torque.
-    :param cogging_torque: The list of cogging torque.
-    """
-    logger = multiprocessing.get_logger()
-    # Plotting Data
     logger.info("Plotting Data")
-    max_index = mean_torque.argmax()
-
-    # Overall Torque
-    logger.info("Plotting Overall Torque")
-    plt.figure()
-    plt.plot(slot_factor, mean_torque)
-    plt.title("Overall Torque at Different Slot Opening Factor")
-    plt.xlim(slot_factor.min(), slot_factor.max())
-    plt.xticks(slot_factor)
-    plt.xlabel("Slot Opening Factor")
-    plt.ylabel("Overall Torque, Nm")
-    plt.savefig("../dist/task_10_overall_torque.png")
-
-    plot_ripple(slot_factor, dev_torque, max_index)
-    plot_cogging(slot_factor, cogging_torque, max_index)
-
-
-def plot_ripple(
-    slot_factor: np.ndarray, dev_torque: np.ndarray, max_index: np.signedinteger
-):
-    """Plots the torque ripple data.
-
-    :param slot_factor: The list of slot factors.
-    :param dev_torque: The list of developed torque.
-    :param max_index: The index where the max developed torque is.
-    """
-    logger = multiprocessing.get_logger()
-    angle = np.arange(360)
-    opening_factors = (slot_factor[0], slot_factor[max_index], slot_factor[-1])
-    legends = tuple(map(lambda x: f"Opening Factor: {x}", opening_factors))
-
-    # Torque Ripple
-    logger.info("Plotting Torque Ripple")
-    plt.figure()
-    plt.plot(angle, dev_torque[0], angle, dev_torque[max_index], angle, dev_torque[-1])
-    plt.title("Torque Ripple at Various Slot Opening Factor")
-    plt.xlabel("Load Angle, °")
-    plt.ylabel("Developed Torque, Nm")
-    plt.xlim(angle.min(), angle.max())
-    plt.legend(legends)
-    plt.savefig("../dist/task_10_torque_ripple.png")
-
-    # Ripple Amplitude
-    logger.info("Plotting Torque Ripple Amplitude")
-    plt.figure()
-    ripple_max = dev_torque.max(axis=1)
-    ripple_mean = dev_torque.mean(axis=1)
-    ripple_amplitude = ripple_max - ripple_mean
-    plt.plot(slot_factor, ripple_amplitude)
-    plt.title("Torque Ripple Amplitude at Different Slot Opening Factor")
-    plt.xlim(slot_factor.min(), slot_factor.max())
-    plt.xticks(slot_factor)
-    plt.xlabel("Slot Opening Factor")
-    plt.ylabel("Torque Ripple Amplitude, Nm")
-    plt.savefig("../dist/task_10_ripple_amplitude.png")
-
-
-def plot_cogging(
-    slot_factor: np.ndarray, cogging_torque: np.ndarray, max_index: np.signedinteger
-):
-    """Plots the cogging torque data.
-
-    :param slot_factor: The list of slot factors.
-    :param cogging_torque: The list of cogging torque.
-    :param max_index: The index where the max developed torque is.
-    """
-    logger = multiprocessing.get_logger()
-    angle = np.arange(360)
-    opening_factors = (slot_factor[0], slot_factor[max_index], slot_factor[-1])
-    legends = tuple(map(lambda x: f"Opening Factor: {x}", opening_factors))
-    # Cogging Torque
-    logger.info("Plotting Cogging Torque")
-    plt.figure()
-    plt.plot(
-        angle,
-        cogging_torque[0],
-        angle,
-        cogging_torque[max_index],
-        angle,
-        cogging_torque[-1],
-    )
-    plt.title("Cogging Torque at Various Slot Opening Factor")
-    plt.xlabel("Load Angle, °")
-    plt.ylabel("Cogging Torque, Nm")
-    plt.xlim(angle.min(), angle.max())
-    plt.legend(legends)
-    plt.savefig("../dist/task_10_cogging_torque.png")
-
-    # Cogging Torque Amplitude
-    logger.info("Plotting Cogging Torque Amplitude")
-    plt.figure()
-    cogging_max = cogging_torque.max(axis=1)
-    cogging_mean = cogging_torque.mean(axis=1)
-    cogging_amplitude = cogging_max - cogging_mean
-    plt.plot(slot_factor, cogging_amplitude)
-    plt.title("Cogging Torque Amplitude at Different Slot Opening Factor")
-    plt.xlim(slot_factor.min(), slot_factor.max())
-    plt.xticks(slot_factor)
-    plt.xlabel("Slot Opening Factor")
-    plt.ylabel("Cogging Torque Amplitude, Nm")
-    plt.savefig("../dist/task_10_cogging_amplitude.png")
-
-    plt.show()
+    render_report(FIGURES["task_10"])
 
 
 if __name__ == "__main__":
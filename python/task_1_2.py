@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 """Test script."""
-import csv
+
+import logging
+import multiprocessing
 import os
 from dataclasses import dataclass
-from multiprocessing import Process, Queue
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import femm_handler
+from lib import (
+    FEMM_BACKEND,
+    FEMMPool,
+    OperatingPoint,
+    femm,
+    femm_handler,
+    solve,
+    solved_hash,
+)
+from mesh_study import relative_error
+from metrics import machine_metrics
+from plotting import plt
+from setup import CW1_REDUCED
+from store import ResultStore
+from sweep import run_sweep
+from tables import save_table
+
+# Rotor angle the sector is checked against the full machine at
+CHECK_ANGLE = 5
+# Largest difference of the sector relative to the largest full machine value
+CHECK_TOLERANCES = {"torque": 0.1, "flux": 0.02}
 
 
 @dataclass
@@ -23,101 +42,128 @@ class TaskData:
     cflux: float
 
 
-@femm_handler("../dist/cw1.fem")
-def task_1_2(initial_angle: int, count: int, out: Queue):
+@femm_handler("../dist/cw1_reduced.fem")
+def task_1_2(angles: list[int]) -> list[TaskData]:
     """Function to get data for Task 1 and 2.
 
-    :param initial_angle: Initial angle of the measurement.
-    :param count: The amount of times to rotate the rotor.
-    :param out: The queue to output the collected data to.
-    """
-    femm.mi_selectgroup(1)
-    femm.mi_moverotate(0, 0, initial_angle)
+    The smallest repeating sector of the machine is solved, the rotor is turned
+    by the sliding boundary and the flux is scaled up to the full machine.
 
-    for k in range(count):
+    :param angles: The rotor angles to measure.
+    :returns: The collected data of every angle.
+    """
+    output = []
+    for angle in angles:
         # Debug
-        print(f"Angle: {initial_angle + k}")
+        print(f"Angle: {angle}")
         # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
+        values = solve(OperatingPoint(rotor_angle=angle), ("torque", "flux"))
 
         # Gathering Data
-        femm.mo_groupselectblock(1)
-        tq = femm.mo_blockintegral(22)
-        circprops_a = femm.mo_getcircuitproperties("A")
-        circprops_b = femm.mo_getcircuitproperties("B")
-        circprops_c = femm.mo_getcircuitproperties("C")
-        out.put(
+        output.append(
             TaskData(
-                initial_angle + k,
-                tq,
-                circprops_a[2],
-                circprops_b[2],
-                circprops_c[2],
+                angle,
+                values["torque"],
+                *(CW1_REDUCED.scale * flux for flux in values["flux"]),
             )
         )
 
-        # Setting up for next cycle
-        femm.mo_close()
-        femm.mi_selectgroup(1)
-        femm.mi_moverotate(0, 0, 1)
+    return output
+
+
+@femm_handler("../dist/cw1.fem")
+def solve_full(angle: float) -> TaskData:
+    """Solves the full machine of cw.dxf at a rotor angle.
+
+    The rotor is turned with ``mi_moverotate`` and the torque is the block
+    integral of the rotor, as the full model has no sliding band.
+
+    :param angle: The rotor angle.
+    :returns: The collected data of the angle.
+    """
+    femm.mi_selectgroup(1)
+    femm.mi_moverotate(0, 0, angle)
+    femm.mi_clearselected()
+    femm.mi_analyze(1)
+    femm.mi_loadsolution()
+    femm.mo_groupselectblock(1)
+    torque = femm.mo_blockintegral(22)
+    flux = [femm.mo_getcircuitproperties(c)[2] for c in "ABC"]
+    femm.mo_close()
+    return TaskData(angle, torque, *flux)
+
+
+def check_sector(angle: float = CHECK_ANGLE):
+    """Checks the solve of the sector against the full machine at an angle.
+
+    :param angle: The rotor angle.
+    :raises ValueError: If the torque or flux linkage differ by more than
+        ``CHECK_TOLERANCES``.
+    """
+    logger = multiprocessing.get_logger()
+    with FEMMPool("../dist/cw1.fem", 2) as pool:
+        full_future = pool.submit(solve_full, angle)
+        sector_future = pool.submit(task_1_2, [angle])
+        full, sector = full_future.result(), sector_future.result()[0]
+
+    errors = {
+        "torque": relative_error(
+            np.array([sector.coggingtorque]), np.array([full.coggingtorque])
+        ),
+        "flux": relative_error(
+            np.array([sector.aflux, sector.bflux, sector.cflux]),
+            np.array([full.aflux, full.bflux, full.cflux]),
+        ),
+    }
+    logger.info("Sector against full machine at %s°: %s, %s", angle, sector, full)
+    for name, error in errors.items():
+        if error > CHECK_TOLERANCES[name]:
+            raise ValueError(
+                f"The {name} of the sector differs from the full machine by "
+                f"{error:.2%} at {angle}°"
+            )
 
 
 if __name__ == "__main__":
-    queue: Queue = Queue()
-    processes: list[Process] = []
+    logger = multiprocessing.log_to_stderr(logging.INFO)
     THREADS = 12
-    COUNT = round(360 / THREADS)
-
-    for i in range(THREADS):
-        p = Process(target=task_1_2, args=(i * COUNT, COUNT, queue))
-        p.start()
-        processes.append(p)
-
-    for process in processes:
-        process.join()
-
-    RPM = 1500
-    OMEGA = RPM * 360 / 60
-    DT = 1 / OMEGA
-
-    tt = np.zeros(360)
-    aflux = np.zeros(360)
-    bflux = np.zeros(360)
-    cflux = np.zeros(360)
-    coggingtorque = np.zeros(360)
-
-    while queue.qsize() > 0:
-        item: TaskData = queue.get()
-        angle = int(item.angle)
-        tt[angle] = angle
-        aflux[angle] = item.aflux
-        bflux[angle] = item.bflux
-        cflux[angle] = item.cflux
-        coggingtorque[angle] = item.coggingtorque
+
+    # The full model needs the block selection of the post processor to stay
+    # between calls, which only pyfemm does
+    if FEMM_BACKEND == "wine":
+        check_sector()
+
+    store = ResultStore(
+        "../dist/task_1_2_full.store",
+        range(360),
+        {name: () for name in ("angle", "coggingtorque", "aflux", "bflux", "cflux")},
+        [solved_hash(task_1_2.femm_document)],
+    )
+    sweep = run_sweep(
+        task_1_2,
+        range(360),
+        document="../dist/cw1_reduced.fem",
+        processes=THREADS,
+        store=store,
+    )
+
+    tt = store["angle"]
+    coggingtorque = store["coggingtorque"]
+    flux = np.transpose([store["aflux"], store["bflux"], store["cflux"]])
 
     # Getting Task 2 data
-    va = np.diff(aflux) / DT
-    vb = np.diff(bflux) / DT
-    vc = np.diff(cflux) / DT
-    td = tt[1:] / OMEGA - DT / 2
-    vll = va - vc
+    metrics = machine_metrics(flux)
+    va, vb, vc = metrics.emf.T
+    td = metrics.emf_time
+    vll = metrics.line_emf[:, 0]
 
     # Writing Data
     os.makedirs("../dist", exist_ok=True)
     # Task 1
-    with open("../dist/task_1.csv", "w", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Angle", "Cogging Torque"])
-        csv_array = np.transpose(np.array([tt, coggingtorque]))
-        writer.writerows(csv_array)
+    save_table("../dist/task_1", {"Angle": tt, "Cogging Torque": coggingtorque})
 
     # Task 2
-    with open("../dist/task_2.csv", "w", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Time", "Va", "Vb", "Vc", "Vll"])
-        csv_array = np.transpose(np.array([td, va, vb, vc, vll]))
-        writer.writerows(csv_array)
+    save_table("../dist/task_2", {"Time": td, "Va": va, "Vb": vb, "Vc": vc, "Vll": vll})
 
     # Task 1
     plt.figure(1)
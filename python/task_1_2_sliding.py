@@ -1,17 +1,34 @@
 #!/usr/bin/env python3
 """Test script."""
-import csv
+
 import logging
+import math
 import multiprocessing
 import os
 from dataclasses import dataclass
-from multiprocessing import Process, Queue
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import DT, OMEGA, RPM, femm_handler
+from geometry import MachineDimensions
+from lib import ITERATIONS, SOLVE_CACHE, OperatingPoint, femm_handler, solved_hash
+from lua_sweep import solve_batch
+from metrics import machine_metrics
+from plotting import plt
+from spectrum import save_spectra, spectrum
+from store import ResultStore
+from sweep import run_sweep
+from symmetry import (
+    cogging_period,
+    flux_interval,
+    reconstruct_periodic,
+    reconstruct_three_phase,
+    validate,
+    validation_indices,
+)
+from tables import save_table
+
+# Start every angle from the solution of the one before
+WARM_START = True
 
 
 @dataclass
@@ -23,80 +40,96 @@ class TaskData:
     aflux: float
     bflux: float
     cflux: float
+    iterations: float
 
 
-@femm_handler("../dist/cw1_sliding.fem")
-def task_1_2(initial_angle: int, count: int, out: Queue):
+@femm_handler("../dist/cw1_sliding.fem", cache=SOLVE_CACHE)
+def task_1_2(angles: list[int]) -> list[TaskData]:
     """Function to get data for Task 1 and 2.
 
-    :param initial_angle: Initial angle of the measurement.
-    :param count: The amount of times to rotate the rotor.
-    :param out: The queue to output the collected data to.
+    :param angles: The rotor angles to measure.
+    :returns: The collected data of every angle.
     """
     thread_logger = multiprocessing.get_logger()
-    femm.mi_modifycircprop("A", 1, 0)
-    femm.mi_modifycircprop("B", 1, 0)
-    femm.mi_modifycircprop("C", 1, 0)
-    femm.smartmesh(1)
-
-    for k in range(count):
-        current_angle = initial_angle + k
-        # Debug
-        thread_logger.info("Angle: %s", current_angle)
-
-        femm.mi_modifyboundprop("Sliding Boundary", 10, current_angle)
-        # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
-
-        # Gathering Data
-        tq = femm.mo_gapintegral("Sliding Boundary", 0)
-        circprops_a = femm.mo_getcircuitproperties("A")
-        circprops_b = femm.mo_getcircuitproperties("B")
-        circprops_c = femm.mo_getcircuitproperties("C")
-        out.put(
-            TaskData(
-                current_angle,
-                tq,
-                circprops_a[2],
-                circprops_b[2],
-                circprops_c[2],
-            )
-        )
 
-        # Setting up for next cycle
-        femm.mo_close()
+    # Debug
+    thread_logger.info("Angles: %s", angles)
+
+    # Anlyzing
+    solved = solve_batch(
+        [OperatingPoint(rotor_angle=angle) for angle in angles],
+        ("torque", "flux", *ITERATIONS),
+        WARM_START,
+    )
+
+    # Gathering Data
+    return [
+        TaskData(
+            angle,
+            values["torque"],
+            *values["flux"],
+            values.get("iterations", math.nan),
+        )
+        for angle, values in zip(angles, solved)
+    ]
 
 
 if __name__ == "__main__":
     logger = multiprocessing.log_to_stderr(logging.INFO)
-    queue: Queue = Queue()
-    processes: list[Process] = []
     THREADS = 10
-    COUNT = round(360 / THREADS)
-
-    for i in range(THREADS):
-        p = Process(target=task_1_2, args=(i * COUNT, COUNT, queue))
-        p.start()
-        processes.append(p)
-
-    for process in processes:
-        process.join()
-
-    tt = np.zeros(360)
-    aflux = np.zeros(360)
-    bflux = np.zeros(360)
-    cflux = np.zeros(360)
-    coggingtorque = np.zeros(360)
-
-    while queue.qsize() > 0:
-        item: TaskData = queue.get()
-        angle = int(item.angle)
-        tt[angle] = angle
-        aflux[angle] = item.aflux
-        bflux[angle] = item.bflux
-        cflux[angle] = item.cflux
-        coggingtorque[angle] = item.coggingtorque
+    SYMMETRY = True  # Only solve the fundamental interval of the machine
+    VALIDATE = 3  # Amount of rebuilt angles to check against real solves
+
+    tt = np.arange(360, dtype=float)
+    if SYMMETRY:
+        interval = round(max(cogging_period(), flux_interval()))
+        checked = validation_indices(interval, amount=VALIDATE)
+        angles = [*range(interval), *checked]
+    else:
+        interval = 360
+        angles = list(range(360))
+    # Only the consecutive angles start from the solution of the one before
+    chains = [0 if WARM_START else None] * interval
+    chains += [None] * (len(angles) - interval)
+
+    store = ResultStore(
+        "../dist/task_1_2.store",
+        angles,
+        {
+            name: ()
+            for name in (
+                "angle",
+                "coggingtorque",
+                "aflux",
+                "bflux",
+                "cflux",
+                "iterations",
+            )
+        },
+        [solved_hash(task_1_2.femm_document)],
+    )
+    sweep = run_sweep(task_1_2, angles, processes=THREADS, store=store, chains=chains)
+    sweep.log_utilisation(logger)
+    if not np.isnan(store["iterations"]).all():
+        logger.info(
+            "Mean Newton Iterations: %.3g (warm start: %s)",
+            np.nanmean(store["iterations"]),
+            WARM_START,
+        )
+
+    solved_torque = store["coggingtorque"]
+    solved_flux = np.transpose([store["aflux"], store["bflux"], store["cflux"]])
+    if SYMMETRY:
+        coggingtorque = reconstruct_periodic(solved_torque[:interval], cogging_period())
+        flux = reconstruct_three_phase(solved_flux[:interval])
+
+        validate(coggingtorque, checked, solved_torque[interval:])
+        validate(flux, checked, solved_flux[interval:])
+    else:
+        coggingtorque = np.array(solved_torque)
+        flux = np.array(solved_flux)
+    aflux, bflux, cflux = flux.T
+    metrics = machine_metrics(flux, scale=MachineDimensions().scale)
 
     plt.figure(1)
     plt.plot(tt, coggingtorque)
@@ -107,10 +140,8 @@ if __name__ == "__main__":
     plt.savefig("../dist/task_1.png")
 
     plt.figure(2)
-    va = 4 * np.diff(aflux) / DT
-    vb = 4 * np.diff(bflux) / DT
-    vc = 4 * np.diff(cflux) / DT
-    td = tt[1:] / OMEGA - DT / 2
+    va, vb, vc = metrics.emf.T
+    td = metrics.emf_time
     plt.plot(td, va, label="Winding A")
     plt.plot(td, vb, label="Winding B")
     plt.plot(td, vc, label="Winding C")
@@ -122,7 +153,7 @@ if __name__ == "__main__":
     plt.savefig("../dist/task_2_1.png")
 
     plt.figure(3)
-    vll = va - vc
+    vll = metrics.line_emf[:, 0]
     plt.plot(td, vll)
     plt.xlabel("Time, s")
     plt.ylabel("Line-to-Line Back EMF, V")
@@ -141,31 +172,28 @@ if __name__ == "__main__":
     logger.info("Vll: %s", vll)
 
     os.makedirs("../dist", exist_ok=True)
-    with open("../dist/task_1.csv", "w", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Angle", "Cogging Torque"])
-        csv_array = np.transpose(np.array([tt, coggingtorque]))
-        writer.writerows(csv_array)
-
-    with open("../dist/task_2.csv", "w", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Time", "Va", "Vb", "Vc", "Vll"])
-        csv_array = np.transpose(np.array([td, va, vb, vc, vll]))
-        writer.writerows(csv_array)
-
-    # Finding frequency
-    fft = np.array(abs(np.fft.fft(coggingtorque)))
-    freq = np.fft.helper.fftfreq(coggingtorque.size, DT)
-    index = np.argmax(fft)
-    f = freq[index]
-    angle_period = OMEGA * f**-1
+    save_table("../dist/task_1", {"Angle": tt, "Cogging Torque": coggingtorque})
+
+    save_table("../dist/task_2", {"Time": td, "Va": va, "Vb": vb, "Vc": vc, "Vll": vll})
+
+    # Finding the harmonics, the EMF of every degree is one short of a period
+    cogging = spectrum(coggingtorque)
+    angle_period = cogging.period()
+    emf = spectrum(metrics.emf.T, span=metrics.emf.shape[0], window="hann")
+    save_spectra("../dist/task_1_2_spectrum.npz", cogging=cogging, emf=emf)
+    orders, harmonics = emf.table()
+    save_table(
+        "../dist/task_2_harmonics",
+        {"Electrical Order": orders, **dict(zip(("Va", "Vb", "Vc"), harmonics))},
+    )
+    logger.info("EMF THD: %s%%", emf.thd())
     with open("../dist/task_1.txt", "w", encoding="utf-8") as file:
         output = f"Cogging Troque Period: {angle_period}"
         file.write(output)
         logger.info(output)
 
     # Finding Km
-    k_m = max([va.max(), vb.max(), vc.max()]) / (RPM * 2 * np.pi / 60)
+    k_m = metrics.k_m
     with open("../dist/task_2.txt", "w", encoding="utf-8") as file:
         output = f"Km: {k_m}"
         file.write(output)
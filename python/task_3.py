@@ -1,98 +1,92 @@
 #!/usr/bin/env python3
 """Script for task 3."""
-import csv
 import logging
 import multiprocessing
 import os
-from multiprocessing import Process, Queue
-from typing import NamedTuple
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import femm_handler, EDT, OMEGA_E
+from fidelity import solve_spec
+from lib import ITERATIONS, POLES
+from plotting import plt
+from spec import Sweep, SweepSpec
+from spectrum import save_spectra, spectrum
+from symmetry import reconstruct_periodic, torque_period, validate, validation_indices
+from tables import save_table
 
 
-class TaskData(NamedTuple):
-    """The output data format for the collected data."""
-    phase_angle: int
-    torque_developed: float
+def task_3(angles: list[int], warm_start: bool = False) -> SweepSpec:
+    """Creates the sweep of Task 3.
 
+    The rotor turns half of the electrical angle of the current so the load
+    angle stays the same.
 
-@femm_handler("../dist/cw1_sliding.fem")
-def task_3(initial_angle: int, count: int, out: Queue):
-    """Function to get data for Task 3.
-
-    :param initial_angle: Initial phase angle of the current.
-    :param count: The amount of times to rotate the phase angle.
-    :param out: The queue to output the collected data to.
+    :param angles: The phase angles of the current to measure.
+    :param warm_start: Starts every angle from the solution of the one before.
+    :returns: The sweep specification.
     """
-    femm.smartmesh(1)
-    thread_logger = multiprocessing.get_logger()
-
-    for a in range(count):
-        # Modifying circuit
-        angle = initial_angle + a
-        femm.mi_modifycircprop("A", 1, 20 * np.sin(np.radians(angle + 77)))
-        femm.mi_modifycircprop("B", 1, 20 * np.sin(np.radians(angle + 77 + 120)))
-        femm.mi_modifycircprop("C", 1, 20 * np.sin(np.radians(angle + 77 - 120)))
-        femm.mi_modifyboundprop("Sliding Boundary", 10, angle / 2 + 23.1)
-
-        # Debug
-        thread_logger.info("Angle %s", angle)
-
-        # Anlyzing
-        femm.mi_analyze()
-        femm.mi_loadsolution()
-
-        # Getting Data
-        tq = femm.mo_gapintegral("Sliding Boundary", 0)
-        out.put(TaskData(angle, tq))
-
-        femm.mo_close()
+    return SweepSpec(
+        "../dist/cw1_sliding.fem",
+        [
+            Sweep(
+                "torque",
+                angles,
+                load_angle=(77, 1),
+                rotor_angle=(23.1, 0.5),
+                quantities=("torque", *ITERATIONS),
+                warm_start=warm_start,
+            )
+        ],
+    )
 
 
 if __name__ == "__main__":
     logger = multiprocessing.log_to_stderr(logging.INFO)
-    queue: Queue = Queue()
-    processes: list[Process] = []
     THREADS = 10
-    COUNT = round(360 / THREADS)
-
-    for i in range(THREADS):
-        p = Process(target=task_3, args=(i * COUNT, COUNT, queue))
-        p.start()
-        processes.append(p)
-
-    for process in processes:
-        process.join()
+    SYMMETRY = True  # Only solve the fundamental interval of the machine
+    VALIDATE = 3  # Amount of rebuilt angles to check against real solves
+    WARM_START = True  # Start every angle from the solution of the one before
 
     phase_angle: np.ndarray = np.arange(360)
-    dev_torque: np.ndarray = np.zeros(360)
-    while queue.qsize() > 0:
-        item: TaskData = queue.get()
-        dev_torque[item.phase_angle] = item.torque_developed
+    if SYMMETRY:
+        # The rotor turns half of the electrical angle of the current
+        period = torque_period() * POLES / 2
+        interval = round(period)
+        checked = validation_indices(interval, amount=VALIDATE)
+        angles = [*range(interval), *checked]
+    else:
+        angles = list(range(360))
+
+    result = solve_spec(
+        task_3(angles, WARM_START), processes=THREADS, store="../dist/task_3.store"
+    )
+    result.sweep.log_utilisation(logger)
+    result.log_iterations(logger)
+
+    solved = result.get("torque", "torque")[0, 0]
+    if SYMMETRY:
+        dev_torque = reconstruct_periodic(solved[:interval], period)
+        validate(dev_torque, checked, solved[interval:])
+    else:
+        dev_torque = solved
 
     logger.info("Torque Developed: %s", dev_torque)
 
     os.makedirs("../dist", exist_ok=True)
-    with open("../dist/task_3_ripple.csv", "w", encoding="utf-8") as csv_file:
-        writer = csv.writer(csv_file)
-        writer.writerow(["Load Angle", "Torque Developed"])
-        csv_array = np.transpose(np.array([phase_angle, dev_torque]))
-        writer.writerows(csv_array)
-
-    # Finding frequency
-    fft = np.array(abs(np.fft.fft(dev_torque)))
-    freq = np.fft.helper.fftfreq(dev_torque.size, EDT)
-    # Removing DC offset
-    fft[0] = 0
-    index = np.argmax(fft)
-    f = freq[index]
-    ANGLE_PERIOD = 0
-    if f > 0:
-        ANGLE_PERIOD = OMEGA_E * f**-1
+    save_table(
+        "../dist/task_3_ripple",
+        {
+            "Load Angle": phase_angle,
+            "Torque Developed": dev_torque,
+        },
+    )
+
+    # Finding the period, the rotor turns 180° over the sweep
+    ripple = spectrum(dev_torque, span=180)
+    ANGLE_PERIOD = ripple.period(electrical=True)
+    save_spectra("../dist/task_3_spectrum.npz", torque=ripple)
+    orders, amplitudes = ripple.dominant(electrical=True)
+    logger.info("Dominant Ripple Orders: %s, Amplitudes: %s", orders, amplitudes)
     with open("../dist/task_3_ripple.txt", "w", encoding="utf-8") as file:
         output = f"Torque Ripple Period: {ANGLE_PERIOD}"
         file.write(output)
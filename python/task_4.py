@@ -1,18 +1,17 @@
 #!/usr/bin/env python3
 """Script for task 4."""
-import csv
-import dataclasses
 import logging
 import multiprocessing
 import os
 from dataclasses import dataclass
-from multiprocessing import Pool, Queue
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import MIDDLE, SLOT, TEETH, femm_handler
+from lib import MIDDLE, SLOT, TEETH, femm, femm_handler
+from metrics import mag
+from plotting import plt
+from store import SharedResults
+from sweep import run_sweep
 
 
 @dataclass
@@ -25,11 +24,6 @@ class TaskData:
     magnet: float
 
 
-def mag(b_values: tuple[float, float]):
-    """Finds the magnitude of the B field."""
-    return np.sqrt(b_values[0] ** 2 + b_values[1] ** 2)
-
-
 @femm_handler("../dist/cw1_sliding.fem")
 def task_4(current: float) -> TaskData:
     """Function to get data for Task 4.
@@ -82,35 +76,40 @@ def task_4(current: float) -> TaskData:
     return output
 
 
+def task_4_batch(currents: list[float]) -> list[TaskData]:
+    """Runs Task 4 for a batch of currents.
+
+    :param currents: The currents to measure.
+    :returns: The flux at important points for every current.
+    """
+    return [task_4(current) for current in currents]
+
+
 if __name__ == "__main__":
     logger = multiprocessing.log_to_stderr(logging.INFO)
-    queue: Queue = Queue()
+    fields = ("current", "yoke", "teeth", "magnet")
 
     currents = np.arange(11) * 20
-    with Pool(11) as p:
-        flux: list[TaskData] = p.map(task_4, currents)
-
-    flux.sort(key=lambda v: v.current)
+    os.makedirs("../dist", exist_ok=True)
+    with SharedResults(currents, {name: () for name in fields}) as results:
+        sweep = run_sweep(
+            task_4_batch, currents, processes=11, batch_size=1, store=results
+        )
+        sweep.log_utilisation(logger)
+        results.to_table("../dist/task_4", {name: name for name in fields})
+        flux = {name: np.array(results[name]) for name in fields}
 
     # Debug
     logger.debug("Fluxes: %s", flux)
 
-    os.makedirs("../dist", exist_ok=True)
-    with open("../dist/task_4.csv", "w", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(
-            csv_file, fieldnames=["current", "yoke", "teeth", "magnet"]
-        )
-        writer.writeheader()
-        writer.writerows(map(dataclasses.asdict, flux))
-
     # Yoke
-    plt.plot(currents, list(map(lambda v: v.yoke, flux)), label="Yoke", marker="o")
+    plt.plot(currents, flux["yoke"], label="Yoke", marker="o")
 
     # Teeth
-    plt.plot(currents, list(map(lambda v: v.teeth, flux)), label="Teeth", marker="o")
+    plt.plot(currents, flux["teeth"], label="Teeth", marker="o")
 
     # Magnet
-    plt.plot(currents, list(map(lambda v: v.magnet, flux)), label="Magnet", marker="o")
+    plt.plot(currents, flux["magnet"], label="Magnet", marker="o")
 
     # Labels
     plt.xlabel("Peak Current, A")
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 """Script for showing task 4 measurment spots."""
-import femm  # type: ignore
 import numpy as np
 
-from lib import MIDDLE, SLOT, TEETH, femm_handler
+from lib import MIDDLE, SLOT, TEETH, femm, femm_handler
 
 
 @femm_handler("../dist/cw1_sliding.fem")
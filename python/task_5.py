@@ -1,86 +1,41 @@
 #!/usr/bin/env python3
 """Script for task 5."""
-import csv
-import dataclasses
 import logging
 import multiprocessing
-import os
-from dataclasses import dataclass
-from multiprocessing import Pool, Queue
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import femm_handler
+from fidelity import solve_spec
+from plotting import plt
+from spec import Sweep, SweepSpec
+from tables import save_table
 
 
-@dataclass
-class TaskData:
-    """The output data format for the collected data."""
-
-    current: float
-    torque: float
-
-
-@femm_handler("../dist/cw1_sliding.fem")
-def task_5(current: float) -> TaskData:
-    """Function to get data for Task 5.
-
-    :param current: The current to measure.
-    :returns: The mean torque developed.
-    """
-    thread_logger = multiprocessing.get_logger()
-    femm.smartmesh(1)
-
-    dev_torque = np.zeros(360, float)
-    for angle in range(360):
-        femm.mi_modifycircprop("A", 1, current * np.sin(np.radians(angle + 77)))
-        femm.mi_modifycircprop("B", 1, current * np.sin(np.radians(angle + 77 + 120)))
-        femm.mi_modifycircprop("C", 1, current * np.sin(np.radians(angle + 77 - 120)))
-        femm.mi_modifyboundprop("Sliding Boundary", 10, angle / 2 + 23.1)
-
-        # Debug
-        thread_logger.info("Current: %s A", current)
-        thread_logger.info("Load Angle %s°", angle + 77)
-        thread_logger.debug("A: %s A", current * np.sin(np.radians(0)))
-        thread_logger.debug("B: %s A", current * np.sin(np.radians(120)))
-        thread_logger.debug("C: %s A", current * np.sin(np.radians(-120)))
-
-        # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
-        dev_torque[angle] = femm.mo_gapintegral("Sliding Boundary", 0)
-
-        thread_logger.debug("Torque: %s", dev_torque[angle])
-
-        femm.mo_close()
-
-    np.savetxt(f"../dist/task_5_{current}.csv", dev_torque)
-
-    output = TaskData(current, np.mean(dev_torque))
-    return output
+# Torque over a full electrical period at every current
+CURRENTS = np.arange(11) * 20
+TASK_5 = SweepSpec(
+    "../dist/cw1_sliding.fem",
+    [Sweep("torque", currents=CURRENTS, load_angle=(77, 1), rotor_angle=(23.1, 0.5))],
+)
 
 
 if __name__ == "__main__":
     logger = multiprocessing.log_to_stderr(logging.INFO)
-    queue: Queue = Queue()
 
-    currents = np.arange(11) * 20
-    with Pool(11) as p:
-        torque: list[TaskData] = p.map(task_5, currents)
+    currents = CURRENTS
+    result = solve_spec(TASK_5, processes=11, store="../dist/task_5.store")
+    result.sweep.log_utilisation(logger)
 
-    torque.sort(key=lambda v: v.current)
+    dev_torque = result.get("torque", "torque")[0]
+    for current, current_torque in zip(currents, dev_torque):
+        save_table(f"../dist/task_5_{current}", {"torque": current_torque})
+    torque = dev_torque.mean(axis=1)
     logger.debug("Data: %s", torque)
 
-    os.makedirs("../dist", exist_ok=True)
-    with open("../dist/task_5.csv", "w", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=["current", "torque"])
-        writer.writeheader()
-        writer.writerows(map(dataclasses.asdict, torque))
+    save_table("../dist/task_5", {"current": currents, "torque": torque})
 
     # Torque
-    plt.plot(currents, list(map(lambda v: v.torque, torque)), marker="o")
+    plt.plot(currents, torque, marker="o")
 
     # Labels
     plt.xlabel("Peak Current, A")
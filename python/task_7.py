@@ -5,10 +5,9 @@ import multiprocessing
 import os
 from dataclasses import dataclass
 
-import femm  # type: ignore
 import numpy as np
 
-from lib import femm_handler, I_PEAK
+from lib import femm, femm_handler, I_PEAK
 
 
 @dataclass
@@ -1,87 +1,51 @@
 #!/usr/bin/env python3
 """Script for task 8."""
-import csv
 import logging
 import multiprocessing
-import os
-from multiprocessing import Process, Queue
-from typing import NamedTuple
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import femm_handler
-
-
-class TaskData(NamedTuple):
-    """The output data format for the collected data."""
-    phase_angle: int
-    torque_developed: float
-
-
-@femm_handler("../dist/cw1_sliding.fem")
-def task_8(initial_angle: int, count: int, out: Queue):
-    """Function to get data for Task 8.
-
-    :param initial_angle: Initial phase angle of the current.
-    :param count: The amount of times to rotate the phase angle.
-    :param out: The queue to output the collected data to.
-    """
-    femm.smartmesh(1)
-    thread_logger = multiprocessing.get_logger()
-    femm.mi_modifyboundprop("Sliding Boundary", 10, 23.1)
-
-    for a in range(count):
-        # Modifying circuit
-        angle = initial_angle + a
-        femm.mi_modifycircprop("A", 1, 20 * np.sin(np.radians(angle)))
-        femm.mi_modifycircprop("B", 1, 20 * np.sin(np.radians(angle + 120)))
-        femm.mi_modifycircprop("C", 1, 20 * np.sin(np.radians(angle - 120)))
-
-        # Debug
-        thread_logger.info("Angle %s", angle)
-
-        # Anlyzing
-        femm.mi_analyze()
-        femm.mi_loadsolution()
-
-        # Getting Data
-        tq = femm.mo_gapintegral("Sliding Boundary", 0)
-        out.put(TaskData(angle, tq))
-
-        femm.mo_close()
+from fidelity import solve_spec
+from lib import ITERATIONS
+from plotting import plt
+from spec import Sweep, SweepSpec
+from tables import save_table
+
+# Torque at every load angle with the rotor held still, every load angle starts
+# from the solution of the one before
+TASK_8 = SweepSpec(
+    "../dist/cw1_sliding.fem",
+    [
+        Sweep(
+            "torque",
+            load_angle=(0, 1),
+            rotor_angle=(23.1, 0),
+            quantities=("torque", *ITERATIONS),
+            warm_start=True,
+        )
+    ],
+)
 
 
 if __name__ == "__main__":
     logger = multiprocessing.log_to_stderr(logging.INFO)
-    queue: Queue = Queue()
-    processes: list[Process] = []
     THREADS = 10
-    COUNT = round(360 / THREADS)
-
-    for i in range(THREADS):
-        p = Process(target=task_8, args=(i * COUNT, COUNT, queue))
-        p.start()
-        processes.append(p)
 
-    for process in processes:
-        process.join()
+    result = solve_spec(TASK_8, processes=THREADS, store="../dist/task_8.store")
+    result.sweep.log_utilisation(logger)
+    result.log_iterations(logger)
 
     phase_angle: np.ndarray = np.arange(360)
-    dev_torque: np.ndarray = np.zeros(360)
-    while queue.qsize() > 0:
-        item: TaskData = queue.get()
-        dev_torque[item.phase_angle] = item.torque_developed
-
+    dev_torque = result.get("torque", "torque")[0, 0]
     logger.info("Torque Developed: %s", dev_torque)
 
-    os.makedirs("../dist", exist_ok=True)
-    with open("../dist/task_8.csv", "w", encoding="utf-8") as csv_file:
-        writer = csv.writer(csv_file)
-        writer.writerow(["Load Angle", "Torque Developed"])
-        csv_array = np.transpose(np.array([phase_angle, dev_torque]))
-        writer.writerows(csv_array)
+    save_table(
+        "../dist/task_8",
+        {
+            "Load Angle": phase_angle,
+            "Torque Developed": dev_torque,
+        },
+    )
 
     # Finding frequency
     with open("../dist/task_8.txt", "w", encoding="utf-8") as file:
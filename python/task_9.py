@@ -1,33 +1,34 @@
 #!/usr/bin/env python3
 """Script for Task 9"""
-import csv
 import logging
 import multiprocessing
-import os
-from dataclasses import dataclass
-from multiprocessing import Pool
 
-import femm  # type: ignore
-import matplotlib.pyplot as plt
 import numpy as np
 
-from lib import femm_handler, WINE_DIR, FEMM_DIR, I_PEAK, DT
-from task_4 import mag
+from fem import FemDocument, plot_geometry
+from fidelity import solve_spec
+from geometry import MachineDimensions
+from lib import Quantity
+from metrics import back_emf, mag
+from report import FIGURES, render_report
+from spec import Sweep, SweepSpec
+from tables import save_table
 
 
-@dataclass
-class TaskData:
-    """The output data format for the collected data."""
+def polar(radius: float, angle: float) -> tuple[float, float]:
+    """Gets the cartesian coordinates of a point.
 
-    pitch_factor: float
-    airgap_flux: np.ndarray
-    torque: np.ndarray
-    emf: np.ndarray
+    :param radius: The distance from the origin.
+    :param angle: The angle in degrees.
+    :returns: The x and y coordinates.
+    """
+    return radius * np.cos(np.radians(angle)), radius * np.sin(np.radians(angle))
 
 
-def draw_magnet(pitch_factor: float):
+def draw_magnet(document: FemDocument, pitch_factor: float):
     """Draws the magnet with a given pitch factor.
 
+    :param document: The document without the magnet to draw on.
     :param pitch_factor: The pitch factor of the magnet.
     """
     thread_logger = multiprocessing.get_logger()
@@ -42,91 +43,39 @@ def draw_magnet(pitch_factor: float):
         raise ValueError("Pitch Factor Must Be Between 0 and 1")
 
     thread_logger.info("Using Pitch Factor: %s", pitch_factor)
-    pitch_angle = pitch_factor * np.pi / 2 / 2
+    pitch_angle = pitch_factor * 90 / 2
     thread_logger.info(
-        "Pitch Angle: %s°, %s rad", np.degrees(pitch_angle * 2), pitch_angle * 2
+        "Pitch Angle: %s°, %s rad", pitch_angle * 2, np.radians(pitch_angle * 2)
     )
     # Nodes
     thread_logger.info("Adding Magnet Nodes")
-
-    # Begining of Magnet
-    def get_nodes(
-        pitch_angle: float,
-    ) -> tuple[tuple[float, float], tuple[float, float]]:
-        """Gets the internal and external node coordinates for the magenet.
-
-        :param pitch_angle: The angle span in radians of the magnet.
-        :returns: The internal and external coordinates. Each coordinates contain
-            a tuple of two values, the first value is the x coordinate and the
-            second is the y coordinate.
-        """
-        x_int = 20 * np.cos(np.pi / 4 + pitch_angle)
-        y_int = 20 * np.sin(np.pi / 4 + pitch_angle)
-        x_ext = 24 * np.cos(np.pi / 4 + pitch_angle)
-        y_ext = 24 * np.sin(np.pi / 4 + pitch_angle)
-        return ((x_int, y_int), (x_ext, y_ext))
-
-    def log_coords(coords: tuple[float, float], label: str = "Coordinates"):
-        """Logs the coordinates at a debug level.
-
-        :param coords: A tuple representing the coordinates.
-            The first value is the x coordinate.
-            The second value is the y coordinate.
-        :param label: The label of the coordinate.
-        """
-        thread_logger = multiprocessing.get_logger()
-        thread_logger.debug("%s x: %s", label, coords[0])
-        thread_logger.debug("%s y: %s", label, coords[1])
-
-    left_nodes = get_nodes(pitch_angle)
-    femm.mi_addnode(left_nodes[0][0], left_nodes[0][1])
-    femm.mi_addnode(left_nodes[1][0], left_nodes[1][1])
-
-    log_coords(left_nodes[0], "Left Node Internal")
-    log_coords(left_nodes[1], "Left Node External")
-
-    # End of Magnet
-    right_nodes = get_nodes(-pitch_angle)
-    femm.mi_addnode(right_nodes[0][0], right_nodes[0][1])
-    femm.mi_addnode(right_nodes[1][0], right_nodes[1][1])
-
-    log_coords(right_nodes[0], "Right Node Internal")
-    log_coords(right_nodes[1], "Right Node External")
+    left_angle = 45 + pitch_angle
+    right_angle = 45 - pitch_angle
+    for radius in (20, 24):
+        for angle in (left_angle, right_angle):
+            coords = polar(radius, angle)
+            document.add_node(*coords)
+            thread_logger.debug("Node at %s mm, %s°: %s", radius, angle, coords)
 
     # Segments and Arcs
     thread_logger.info("Adding Magnet Segments and Arcs")
-    femm.mi_addsegment(
-        left_nodes[0][0], left_nodes[0][1], left_nodes[1][0], left_nodes[1][1]
-    )
-    femm.mi_addsegment(
-        right_nodes[0][0], right_nodes[0][1], right_nodes[1][0], right_nodes[1][1]
-    )
-    femm.mi_addarc(
-        right_nodes[1][0],
-        right_nodes[1][1],
-        left_nodes[1][0],
-        left_nodes[1][1],
-        np.degrees(pitch_angle * 2),
-        5,
+    document.add_segment(*polar(20, left_angle), *polar(24, left_angle))
+    document.add_segment(*polar(20, right_angle), *polar(24, right_angle))
+    document.add_arc(
+        *polar(24, right_angle), *polar(24, left_angle), pitch_angle * 2, 5
     )
 
     # Material
     thread_logger.info("Adding Block Label")
-    label_coords = (22 * np.cos(np.pi / 4), 22 * np.sin(np.pi / 4))
-    femm.mi_addblocklabel(label_coords[0], label_coords[1])
-    femm.mi_selectlabel(label_coords[0], label_coords[1])
-    femm.mi_setblockprop("N42", 1, 0, "", 45)
-    femm.mi_clearselected()
-
-    log_coords(label_coords, "Block Label")
+    label = document.add_label(*polar(22, 45))
+    document.set_block(label, "N42", magdir=45)
 
     if change_boundary:
         thread_logger.info("Adding New Anti-Periodic Boundary")
-        femm.mi_addboundprop("Rotor Boundary 2", *[None for _ in range(8)], 5)
-        femm.mi_selectsegment(22, 0)
-        femm.mi_selectsegment(0, 22)
-        femm.mi_setsegmentprop("Rotor Boundary 2", None, None, None, None)
-        femm.mi_clearselected()
+        document.add_boundary("Rotor Boundary 2", 5)
+        for coords in ((22, 0), (0, 22)):
+            segment = document.closest_segment(*coords)
+            document.set_segment_boundary(segment, "Rotor Boundary 2")
 
 
 def remove_magnet(
@@ -141,113 +90,86 @@ def remove_magnet(
     thread_logger = multiprocessing.get_logger()
     thread_logger.debug("Inside of remove_magnet")
 
-    femm.openfemm(winepath=WINE_DIR, femmpath=FEMM_DIR)
     thread_logger.info("Editing %s", input_file)
-    femm.opendocument(input_file)
+    document = FemDocument.read(input_file)
 
     thread_logger.info("Removing Nodes, Segments and Arcs")
-    # Internal
-    femm.mi_selectnode(20 * np.cos(np.radians(30)), 20 * np.sin(np.radians(30)))
-    femm.mi_selectnode(20 * np.cos(np.radians(75)), 20 * np.sin(np.radians(75)))
-    # External
-    femm.mi_selectnode(24 * np.cos(np.radians(30)), 24 * np.sin(np.radians(30)))
-    femm.mi_selectnode(24 * np.cos(np.radians(75)), 24 * np.sin(np.radians(75)))
-    femm.mi_deleteselectednodes()
+    document.delete_nodes(
+        [
+            document.closest_node(*polar(radius, angle))
+            # Internal and External
+            for radius in (20, 24)
+            for angle in (30, 75)
+        ]
+    )
 
     # Block Label
     thread_logger.info("Removing Block Label")
-    femm.mi_selectlabel(22 * np.cos(np.radians(52.5)), 22 * np.sin(np.radians(52.5)))
-    femm.mi_deleteselectedlabels()
+    document.delete_labels([document.closest_label(*polar(22, 52.5))])
 
     # Block Label
     thread_logger.info("Adding Back Arc")
-    femm.mi_addarc(20, 0, 0, 20, 90, 1)
+    document.add_arc(20, 0, 0, 20, 90, 1)
 
     thread_logger.info("Saving FEM file to %s", output_file)
-    femm.mi_saveas(output_file)
-    femm.closefemm()
+    document.write(output_file)
 
 
-@femm_handler("../dist/task_9.fem")
-def task_9(pitch_factor: float) -> TaskData:
-    """Function to get data for Task 9.
+def prepare_pitch(document: FemDocument, pitch_factor: float):
+    """Prepares the model of a pitch factor for Task 9.
 
+    :param document: The document without the magnet.
     :param pitch_factor: The pitch factor of the machine.
-    :returns: The measured data of the pitch factor.
     """
     thread_logger = multiprocessing.get_logger()
     thread_logger.info("Pitch Factor: %s", pitch_factor)
-    draw_magnet(pitch_factor)
-    femm.smartmesh(1)
+    draw_magnet(document, pitch_factor)
 
     # Saving Images
-    os.makedirs("../dist/task_9_models/", exist_ok=True)
     file_name = f"../dist/task_9_models/task_9_{round(pitch_factor, 2)}"
     thread_logger.debug("File Name: %s", file_name)
     thread_logger.info("Saving Images")
-    femm.mi_savebitmap(f"{file_name}.bmp")
-    thread_logger.info("Converting Image into PNG")
-    img = plt.imread(f"{file_name}.bmp")
-    plt.imsave(f"{file_name}.png", img)
-
-    # Modifying properties
-    thread_logger.info("Getting Flux and Torque")
-    femm.mi_modifyboundprop("Sliding Boundary", 10, 0)
-
-    torque_range: np.ndarray = np.arange(180)
-    tq: np.ndarray = np.zeros_like(torque_range, dtype=np.ndarray)
-    flux: np.ndarray = np.zeros_like(torque_range, dtype=np.ndarray)
-
-    for i, angle in enumerate(torque_range):
-        # Modifying properties
-        femm.mi_modifycircprop("A", 1, I_PEAK * np.sin(np.radians(angle)))
-        femm.mi_modifycircprop("B", 1, I_PEAK * np.sin(np.radians(angle + 120)))
-        femm.mi_modifycircprop("C", 1, I_PEAK * np.sin(np.radians(angle - 120)))
-        thread_logger.info("Flux Angle: %s°", angle)
-
-        # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
-
-        # Gathering Data
-        # Torque
-        tq[i] = femm.mo_gapintegral("Sliding Boundary", 0)
-        # Flux
-        flux[i] = mag(femm.mo_getgapb("Sliding Boundary", angle))
-
-        # Setting up for next cycle
-        femm.mo_close()
+    plot_geometry(document, f"{file_name}.png")
 
-    # Modifying properties
-    thread_logger.info("Getting Circuit Flux for Back EMF")
-    femm.mi_modifycircprop("A", 1, 0)
-    femm.mi_modifycircprop("B", 1, 0)
-    femm.mi_modifycircprop("C", 1, 0)
 
-    emf_range: np.ndarray = np.arange(180)
-    emf: np.ndarray = np.zeros((emf_range.size, 3), dtype=np.ndarray)
+def torque_and_airgap(angle: float) -> tuple[Quantity, ...]:
+    """Gets the torque and the air gap flux density at the load angle."""
+    return ("torque", ("gapb", angle))
 
-    for i, angle in enumerate(emf_range):
-        femm.mi_modifyboundprop("Sliding Boundary", 10, angle)
-        thread_logger.info("Rotor Angle: %s°", angle)
 
-        # Anlyzing
-        femm.mi_analyze(1)
-        femm.mi_loadsolution()
+def task_9(pitch_factor: np.ndarray) -> SweepSpec:
+    """Creates the sweeps of Task 9.
 
-        # Gathering Data
-        emf[i, 0] = femm.mo_getcircuitproperties("A")[2]
-        emf[i, 1] = femm.mo_getcircuitproperties("B")[2]
-        emf[i, 2] = femm.mo_getcircuitproperties("C")[2]
+    The torque, air gap flux density and circuit flux are solved on the model
+    of every pitch factor.
 
-        # Setting up for next cycle
-        femm.mo_close()
-
-    # Saving Model
-    thread_logger.info("Saving Model")
-    femm.mi_saveas(f"{file_name}.fem")
-
-    return TaskData(pitch_factor, flux, tq, emf)
+    :param pitch_factor: The pitch factors of the machine.
+    :returns: The sweep specification.
+    """
+    return SweepSpec(
+        "../dist/task_9.fem",
+        [
+            Sweep(
+                "torque",
+                range(180),
+                load_angle=(0, 1),
+                rotor_angle=(0, 0),
+                quantities=torque_and_airgap,
+            ),
+            Sweep(
+                "emf",
+                range(180),
+                currents=(0,),
+                load_angle=(0, 0),
+                rotor_angle=(0, 1),
+                quantities=("flux",),
+            ),
+        ],
+        variants=[round(factor, 2) for factor in pitch_factor],
+        prepare=prepare_pitch,
+        variant_dir="../dist/task_9_models",
+        variant_name="task_9_{variant}",
+    )
 
 
 if __name__ == "__main__":
@@ -258,99 +180,43 @@ if __name__ == "__main__":
     PITCH_FACTOR: np.ndarray = np.arange(START_PITCH, END_PITCH, step=PITCH_STEP)
     PITCH_FACTOR = np.concatenate((PITCH_FACTOR, np.array([0.45, 0.01])))
     PITCH_FACTOR.sort()
-    THREADS = PITCH_FACTOR.size
 
     logger.debug("FREQ: %s", PITCH_FACTOR)
 
     logger.info("Removing Magnet From Model")
     remove_magnet()
     logger.info("Gathering Data with Different Pitch Factor")
-    with Pool(THREADS) as p:
-        output: list[TaskData] = p.map(task_9, PITCH_FACTOR)
+    result = solve_spec(task_9(PITCH_FACTOR), store="../dist/task_9.store")
+    result.sweep.log_utilisation(logger)
+    torque = result.get("torque", "torque")[:, 0]
+    airgap = mag(np.moveaxis(result.get("torque", "gapb")[:, 0], -1, 0))
+    circuit_flux = result.get("emf", "flux")[:, 0]
 
     logger.info("Processing Data")
-    os.makedirs("../dist", exist_ok=True)
-
-    processed_data = np.zeros((PITCH_FACTOR.size, 4))
-
-    with open("../dist/task_9.csv", "w", encoding="utf-8") as file:
-        csv_writer = csv.writer(file)
-        csv_writer.writerow(
-            [
-                "Pitch Factor",
-                "Airgap Flux",
-                "Torque",
-                "EMF",
-            ]
+    emf = back_emf(circuit_flux, MachineDimensions().scale)
+    processed_data = np.column_stack(
+        (
+            PITCH_FACTOR,
+            abs(airgap).mean(axis=1),
+            abs(torque).max(axis=1),
+            abs(emf).max(axis=(1, 2)),
         )
-        for index, data in enumerate(output):
-            back_emf = 4 * np.diff(data.emf, axis=0) / DT
-            processed_data[index] = [
-                data.pitch_factor,
-                abs(data.airgap_flux).mean(),
-                abs(data.torque).max(),
-                abs(back_emf).max(),
-            ]
-            data_values = processed_data[index]
-
-            logger.debug("Pitch Factor: %s", data_values[0])
-            logger.debug("Airgap Flux: %s", data_values[1])
-            logger.debug("Torque: %s", data_values[2])
-            logger.debug("EMF: %s", data_values[3])
-
-        csv_writer.writerows(processed_data)
-
-    logger.info("Plotting Data")
+    )
+    logger.debug("Pitch Factor, Airgap Flux, Torque, EMF: %s", processed_data)
 
-    pf = processed_data[:, 0]
-    airgap_flux = processed_data[:, 1]
-    tq_dev = processed_data[:, 2]
-    back_emf = processed_data[:, 3]
-    plt.figure()
-    plt.title("Rated Torque at Different Magnet Pitch Factor")
-    plt.plot(pf, tq_dev)
-    plt.xlim(pf.min(), pf.max())
-    plt.xticks(pf)
-    plt.xlabel("Pitch Factor")
-    plt.ylabel("Rated Torque, Nm")
-    plt.savefig("../dist/task_9_torque.png")
-
-    plt.figure()
-    plt.title("Back EMF at Different Magnet Pitch Factor")
-    plt.plot(pf, back_emf)
-    plt.xlim(pf.min(), pf.max())
-    plt.xticks(pf)
-    plt.xlabel("Pitch Factor")
-    plt.ylabel("Back EMF, V")
-    plt.savefig("../dist/task_9_back_emf.png")
-
-    plt.figure()
-    plt.title("Airgap Flux Density at Different Magnet Pitch Factor")
-    plt.plot(pf, airgap_flux)
-    plt.xlim(pf.min(), pf.max())
-    plt.xticks(pf)
-    plt.xlabel("Pitch Factor")
-    plt.ylabel("Airgap Flux Density, T")
-    plt.savefig("../dist/task_9_airgap_flux.png")
+    save_table(
+        "../dist/task_9",
+        dict(zip(("Pitch Factor", "Airgap Flux", "Torque", "EMF"), processed_data.T)),
+    )
 
     logger.info("Saving Data")
-    pf = np.zeros_like(PITCH_FACTOR)
-    torque = np.zeros((PITCH_FACTOR.size, output[0].torque.size))
-    airgap_flux = np.zeros((PITCH_FACTOR.size, output[0].airgap_flux.size))
-    back_emf = np.zeros((PITCH_FACTOR.size, output[0].emf.shape[0], 3))
-
-    for index, data in enumerate(output):
-        pf[index] = data.pitch_factor
-        torque[index] = data.torque
-        airgap_flux[index] = data.airgap_flux
-        back_emf[index] = data.emf
-
     np.savez(
         "../dist/task_9.npz",
-        pitch_factor=pf,
+        pitch_factor=PITCH_FACTOR,
         torque=torque,
-        airgap_flux=airgap_flux,
-        circuit_flux=back_emf,
+        airgap_flux=airgap,
+        circuit_flux=circuit_flux,
     )
 
-    plt.show()
+    logger.info("Plotting Data")
+    render_report(FIGURES["task_9"])
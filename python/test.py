@@ -1,4 +0,0 @@
-#!/usr/bin/env python3
-"""Test script of coursework"""
-if __name__ == "__main__":
-    pass
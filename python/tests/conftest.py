@@ -0,0 +1,45 @@
+"""Configuration of the tests, which run without FEMM on the stub backend.
+
+The scripts use paths relative to the ``python`` directory, like
+``../dist/cw1_sliding.fem``, so the tests run in a copy of the layout of the
+repository in a temporary directory.
+"""
+import os
+import shutil
+
+import pytest
+
+# Read by lib when it is first imported
+os.environ.setdefault("FEMM_BACKEND", "stub")
+
+REPOSITORY = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fixture_workspace(tmp_path_factory: pytest.TempPathFactory):
+    """Runs the tests in a temporary repository with the vendored materials.
+
+    The workers of the pools keep the directory they were started in, so it is
+    the same for the whole session.
+    """
+    workspace = tmp_path_factory.mktemp("repository")
+    shutil.copy(os.path.join(REPOSITORY, "materials.dat"), workspace)
+    os.makedirs(workspace / "python")
+    os.makedirs(workspace / "dist")
+    cwd = os.getcwd()
+    os.chdir(workspace / "python")
+    yield workspace
+    os.chdir(cwd)
+
+
+@pytest.fixture(name="sliding_document", scope="session")
+def fixture_sliding_document() -> str:
+    """The parametric machine saved as the sliding band model of the tasks."""
+    # pylint: disable=import-outside-toplevel
+    from geometry import MachineDimensions, build_variant
+
+    path = "../dist/cw1_sliding.fem"
+    build_variant(None, MachineDimensions()).write(path)
+    return path
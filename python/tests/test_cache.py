@@ -0,0 +1,82 @@
+"""Tests of :mod:`cache`."""
+import itertools
+import pickle
+from dataclasses import replace
+
+import pytest
+
+import cache
+from cache import SolveCache
+from spec import run_spec
+from task_3 import task_3
+from task_5 import TASK_5
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch: pytest.MonkeyPatch):
+    """Makes every use of an entry happen after the one before."""
+    clock = itertools.count()
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+
+
+@pytest.mark.usefixtures("clock")
+def test_lru_eviction(tmp_path):
+    """The least recently used entries are evicted above the size limit."""
+    size = len(pickle.dumps(1.0))
+    solve_cache = SolveCache(str(tmp_path / "cache.sqlite"), max_bytes=3 * size)
+    for point in range(3):
+        solve_cache.put_values("model", point, {"torque": 1.0})
+    assert solve_cache.get_values("model", 0, ["torque"]) == {"torque": 1.0}
+
+    solve_cache.put_values("model", 3, {"torque": 1.0})
+    assert not solve_cache.get_values("model", 1, ["torque"])
+    for point in (0, 2, 3):
+        assert solve_cache.get_values("model", point, ["torque"]) == {"torque": 1.0}
+    stats = solve_cache.stats()
+    assert (stats.entries, stats.size) == (3, 3 * size)
+    assert (stats.hits, stats.misses) == (4, 1)
+
+
+def test_quantities(tmp_path):
+    """Every quantity of a point is stored and found on its own."""
+    solve_cache = SolveCache(str(tmp_path / "cache.sqlite"))
+    solve_cache.put_values("model", (1.0, 2), {"torque": 1.5, ("gapb", 10): (1, 2)})
+    assert solve_cache.get_values("model", (1.0, 2), ["torque", "flux"]) == {
+        "torque": 1.5
+    }
+    assert solve_cache.get_values("model", (1.0, 2), [("gapb", 10.0)]) == {
+        ("gapb", 10.0): (1, 2)
+    }
+    assert not solve_cache.get_values("other", (1.0, 2), ["torque"])
+    stats = solve_cache.stats()
+    assert (stats.hits, stats.misses) == (1, 2)
+
+
+def test_key():
+    """Equal points and quantities have the same key."""
+    first = SolveCache.key("model", (1.0, 2), ("gapb", 10))
+    assert first == SolveCache.key("model", (1.0, 2), ("gapb", 10.0))
+    assert first != SolveCache.key("other", (1.0, 2), ("gapb", 10))
+    assert first != SolveCache.key("model", (1.0, 2), "torque")
+
+
+@pytest.mark.usefixtures("sliding_document")
+def test_shared_between_tasks(tmp_path):
+    """Task 5 reuses the torque task 3 solved with the iterations."""
+    path = str(tmp_path / "cache.sqlite")
+    steps = tuple(range(6))
+    task_3_spec = replace(task_3(list(steps)), cache=path)
+    assert "iterations" in task_3_spec.sweeps[0].quantities
+    first = run_spec(task_3_spec, processes=2)
+
+    task_5_spec = replace(
+        TASK_5,
+        sweeps=[replace(TASK_5.sweeps[0], steps=steps, currents=(0, 20))],
+        cache=path,
+    )
+    second = run_spec(task_5_spec, processes=2)
+    stats = SolveCache(path).stats()
+    assert (stats.hits, stats.misses) == (6, 12)
+    assert second.get("torque", "torque")[0, 1].tolist() == (
+        first.get("torque", "torque")[0, 0].tolist()
+    )
@@ -0,0 +1,33 @@
+"""Tests of :mod:`fem`."""
+import pytest
+
+from fem import FemDocument
+from geometry import MachineDimensions, build_variant
+
+
+@pytest.fixture(name="machine")
+def fixture_machine() -> FemDocument:
+    """The parametric machine, built with the vendored materials."""
+    return build_variant(None, MachineDimensions())
+
+
+def test_round_trip(machine: FemDocument, tmp_path):
+    """A written document is read back unchanged."""
+    path = tmp_path / "machine.fem"
+    machine.write(str(path))
+    document = FemDocument.read(str(path))
+    assert document == machine
+    assert document.format() == path.read_text(encoding="utf-8")
+
+
+def test_round_trip_edits(machine: FemDocument, tmp_path):
+    """The edits of a document are kept when it is written and read."""
+    machine.add_circuit("D", 3.5)
+    label = machine.add_label(1, 2)
+    machine.set_block(label, "Air", "D", magdir=45, turns=7, mesh_size=0.5)
+    path = tmp_path / "edited.fem"
+    machine.write(str(path))
+    document = FemDocument.read(str(path))
+    assert document.labels[label] == machine.labels[label]
+    assert document.labels[label].mesh_size == 0.5
+    assert document.properties["CircuitProps"][-1].get("TotalAmps_re") == "3.5"
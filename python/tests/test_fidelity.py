@@ -0,0 +1,38 @@
+"""Tests of :mod:`fidelity`."""
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from fidelity import Fidelity, run_multi_fidelity
+from spec import run_spec
+from task_8 import TASK_8
+
+
+@pytest.mark.usefixtures("sliding_document")
+def test_resume(tmp_path):
+    """A two level sweep with a store resumes both levels from it."""
+    store = str(tmp_path / "task_8.store")
+    spec = replace(
+        TASK_8, sweeps=[replace(TASK_8.sweeps[0], steps=range(24))], cache=None
+    )
+    fidelity = Fidelity(stride=6, window=1)
+    first = run_multi_fidelity(spec, fidelity, processes=2, store=store)
+    assert first.fine.any() and not first.fine.all()
+    assert first.sweep.workers
+    assert (tmp_path / "task_8.coarse.store").exists()
+
+    second = run_multi_fidelity(spec, fidelity, processes=2, store=store)
+    assert not second.sweep.workers
+    assert not any(sweep.workers for sweep in second.fine_sweeps)
+    np.testing.assert_array_equal(second.fine, first.fine)
+    for name, value in first.values.items():
+        np.testing.assert_array_equal(second.values[name], value)
+
+    # A full fidelity sweep only solves the solves that were corrected
+    full = run_spec(spec, processes=2, store=store, prepare=False)
+    solved = sum(stats.points for stats in full.sweep.workers.values())
+    assert solved == np.count_nonzero(~first.fine)
+    np.testing.assert_array_equal(
+        full.values["torque"][first.fine], first.values["torque"][first.fine]
+    )
@@ -0,0 +1,19 @@
+"""Tests of :mod:`geometry`."""
+import pytest
+
+from geometry import smallest_sector
+
+
+@pytest.mark.parametrize(
+    "poles, slots, sector",
+    [
+        (4, 24, (1, True)),
+        (10, 12, (5, True)),
+        (8, 9, (8, False)),
+        (8, 36, (2, False)),
+        (2, 6, (1, True)),
+    ],
+)
+def test_smallest_sector(poles: int, slots: int, sector: tuple[int, bool]):
+    """The poles and periodicity of the smallest sector of a machine."""
+    assert smallest_sector(poles, slots) == sector
@@ -0,0 +1,64 @@
+"""Tests of :mod:`lib`."""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from lib import FEMMPool, get_data
+
+
+def test_get_data_csv_options(tmp_path):
+    """The deprecated CSV options of get_data still parse the CSV file."""
+    path = tmp_path / "table.csv"
+    path.write_text("angle;torque\n0;1.5\n1;2.5\n", encoding="utf-8")
+    with pytest.warns(DeprecationWarning):
+        data = get_data(str(path), delimiter=";")
+    np.testing.assert_array_equal(data, [[0, 1.5], [1, 2.5]])
+    with pytest.warns(DeprecationWarning):
+        data = get_data(str(path), delimiter=";", usecols=1)
+    np.testing.assert_array_equal(data, [1.5, 2.5])
+
+    path.write_text("angle,torque\n0,1.5\n1,2.5\n", encoding="utf-8")
+    np.testing.assert_array_equal(get_data(str(path)), [[0, 1.5], [1, 2.5]])
+
+
+def _double(value: int) -> int:
+    """Doubles a value, failing for negative ones."""
+    if value < 0:
+        raise ValueError(f"Negative value {value}")
+    return 2 * value
+
+
+def _crash(code: int):
+    """Kills the worker in the middle of a job."""
+    time.sleep(0.2)
+    os._exit(code)  # pylint: disable=protected-access
+
+
+def test_pool_errors(sliding_document: str):
+    """The errors of a job are raised by its future and the worker carries on."""
+    with FEMMPool(sliding_document, 1) as pool:
+        failed = pool.submit(_double, -1)
+        assert pool.map(_double, range(4)) == [0, 2, 4, 6]
+        with pytest.raises(ValueError, match="Negative value -1"):
+            failed.result()
+
+
+def test_pool_worker_death(sliding_document: str):
+    """Jobs of a dead worker fail, the other workers keep running jobs."""
+    with FEMMPool(sliding_document, 2) as pool:
+        crashed = pool.submit(_crash, 3)
+        assert pool.map(_double, range(20)) == list(range(0, 40, 2))
+        with pytest.raises(RuntimeError, match="exited with 3"):
+            crashed.result(timeout=30)
+
+    with FEMMPool(sliding_document, 1) as pool:
+        crashed = pool.submit(_crash, 4)
+        queued = pool.submit(_double, 1)
+        with pytest.raises(RuntimeError, match="exited with 4"):
+            crashed.result(timeout=30)
+        with pytest.raises(RuntimeError, match="No FEMM workers are left"):
+            queued.result(timeout=30)
+        with pytest.raises(RuntimeError, match="No FEMM workers are left"):
+            pool.submit(_double, 2)
@@ -0,0 +1,35 @@
+"""Tests of :mod:`lua_sweep`."""
+import pytest
+
+from lua_sweep import parse_results
+
+
+def test_parse_results(tmp_path):
+    """The rows are matched to their points by index, in any order."""
+    path = tmp_path / "results.txt"
+    path.write_text(
+        "1 2.5 0.1 0.2 0.3\n" "0 -1.25 1 2 3 4 5 6 7 8 9 0.5 -0.5\n" "\n" "2 1e-3 7\n",
+        encoding="utf-8",
+    )
+    quantities = [
+        ("torque", "circuits", ("gapb", 10)),
+        ("torque", "flux"),
+        ("torque", "elements"),
+    ]
+    assert parse_results(str(path), quantities) == [
+        {
+            "torque": -1.25,
+            "circuits": ((1, 2, 3), (4, 5, 6), (7, 8, 9)),
+            ("gapb", 10): (0.5, -0.5),
+        },
+        {"torque": 2.5, "flux": (0.1, 0.2, 0.3)},
+        {"torque": 1e-3, "elements": 7},
+    ]
+
+
+def test_parse_results_missing(tmp_path):
+    """A sweep that stopped part way through is an error."""
+    path = tmp_path / "results.txt"
+    path.write_text("0 2.5\n", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        parse_results(str(path), [("torque",), ("torque",)])
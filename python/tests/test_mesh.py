@@ -0,0 +1,80 @@
+"""Tests of :mod:`mesh`."""
+from dataclasses import replace
+
+import pytest
+
+from fem import FemDocument
+from geometry import MachineDimensions, build_variant
+from mesh import (
+    MeshSetting,
+    apply_mesh,
+    inherit,
+    meshed_document,
+    record_setting,
+    recorded_setting,
+)
+
+SETTING = MeshSetting(
+    "test", size=2, regions=(("Air", None), ("N42", 0.5)), airgap=0.25, smartmesh=0
+)
+
+
+@pytest.fixture(name="machine")
+def fixture_machine(tmp_path) -> str:
+    """The parametric machine saved to a temporary directory."""
+    path = str(tmp_path / "machine.fem")
+    build_variant(None, MachineDimensions()).write(path)
+    return path
+
+
+def _sizes(document: FemDocument) -> dict[str, set[float]]:
+    """Gets the mesh sizes of the labels of every material."""
+    materials = [prop.name for prop in document.properties["BlockProps"]]
+    sizes: dict[str, set[float]] = {}
+    for label in document.labels:
+        if label.block > 0:
+            sizes.setdefault(materials[label.block - 1], set()).add(label.mesh_size)
+    return sizes
+
+
+def test_apply_mesh(machine: str):
+    """The labels get the size of their material and the air gap its angle."""
+    document = FemDocument.read(machine)
+    before = [arc.max_segment for arc in document.arcs]
+    apply_mesh(document, SETTING)
+    sizes = _sizes(document)
+    assert sizes.pop("Air") == {-1}
+    assert sizes.pop("N42") == {0.5}
+    assert all(size == {2} for size in sizes.values())
+
+    sliding = document.property_index("BdryProps", "Sliding Boundary")
+    for arc, old in zip(document.arcs, before):
+        assert arc.max_segment == (0.25 if arc.boundary == sliding else old)
+
+
+def test_recorded_setting(machine: str, tmp_path):
+    """The workers open a copy of a studied document with its mesh applied."""
+    settings = str(tmp_path / "settings.json")
+    mesh_dir = str(tmp_path / "meshes")
+    assert meshed_document(machine, "stub", settings, mesh_dir) == (machine, 1)
+
+    record_setting(machine, SETTING, "stub", settings, error=0.1)
+    assert recorded_setting(machine, "stub", settings) == SETTING
+    assert recorded_setting(machine, "xfemm", settings) is None
+    meshed, smartmesh = meshed_document(machine, "stub", settings, mesh_dir)
+    assert smartmesh == 0
+    assert meshed.startswith(mesh_dir)
+    assert _sizes(FemDocument.read(meshed))["N42"] == {0.5}
+    assert meshed_document(machine, "stub", settings, mesh_dir)[0] == meshed
+
+    variant = str(tmp_path / "variant.fem")
+    build_variant(None, replace(MachineDimensions(), slot_opening=2.0)).write(variant)
+    assert recorded_setting(variant, "stub", settings) is None
+    inherit(machine, [variant], "stub", settings)
+    assert recorded_setting(variant, "stub", settings) == SETTING
+
+    # An edited document is not the studied model any more
+    document = FemDocument.read(machine)
+    document.add_label(0, 0)
+    document.write(machine)
+    assert recorded_setting(machine, "stub", settings) is None
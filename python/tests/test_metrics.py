@@ -0,0 +1,67 @@
+"""Tests of :mod:`metrics`."""
+import numpy as np
+
+from metrics import (
+    back_emf,
+    emf_time,
+    k_m,
+    line_voltages,
+    machine_metrics,
+    peak_above_mean,
+    phase_angles,
+    ripple_amplitude,
+    torque_ripple,
+)
+
+
+def test_ripple_amplitudes():
+    """The plotted amplitude uses the peak torque, the table the peak magnitude."""
+    torque = np.array([[1.0, 2.0, 3.0], [-4.0, 0.0, 1.0]])
+    np.testing.assert_allclose(peak_above_mean(torque), [1, 2])
+    np.testing.assert_allclose(ripple_amplitude(torque), [1, 5])
+
+
+def _balanced(angles: np.ndarray, pole_pairs: int = 2) -> np.ndarray:
+    """Gets the flux linkage of a balanced machine with a shape of (angles, 3)."""
+    electrical = np.radians(pole_pairs * angles)[:, np.newaxis]
+    return np.cos(electrical - np.radians([0, 120, -120]))
+
+
+def test_back_emf():
+    """The EMF is the change of the flux linkage over the time of a step."""
+    flux = np.array([[0.0, 0, 0], [1, 2, 3], [3, 3, 3]])
+    # At 1000 rpm a step of 3° takes 0.5 ms
+    emf = back_emf(flux, scale=2, step=3, rpm=1000)
+    np.testing.assert_allclose(emf, [[4000, 8000, 12000], [8000, 4000, 0]])
+    np.testing.assert_allclose(emf_time(3, step=3, rpm=1000), [0.25e-3, 0.75e-3])
+    np.testing.assert_allclose(line_voltages(emf[0]), [-8000, 4000, 4000])
+    np.testing.assert_allclose(k_m(emf, rpm=1000), 12000 / (1000 * np.pi / 30))
+
+
+def test_phase_angles():
+    """The phases of a balanced machine are 120° apart."""
+    angles = np.arange(360)
+    flux = np.stack([_balanced(angles), _balanced(angles + 10)])
+    np.testing.assert_allclose(
+        phase_angles(flux, angles), [[0, -120, 120]] * 2, atol=1e-9
+    )
+
+
+def test_torque_ripple():
+    """The peak-to-peak ripple relative to the mean torque."""
+    torque = np.array([[1.0, 2, 3], [-1, 0, 1]])
+    np.testing.assert_allclose(torque_ripple(torque), [100, np.inf])
+
+
+def test_machine_metrics():
+    """Every metric of a batch of variants has the batch shape."""
+    angles = np.arange(360)
+    flux = np.stack([_balanced(angles), 2 * _balanced(angles)])
+    torque = np.array([[1.0, 3.0], [2.0, 2.0]])
+    metrics = machine_metrics(flux, torque)
+    assert metrics.emf.shape == (2, 359, 3)
+    np.testing.assert_allclose(metrics.k_m[1], 2 * metrics.k_m[0])
+    np.testing.assert_allclose(metrics.mean_torque, [2, 2])
+    np.testing.assert_allclose(metrics.peak_torque, [3, 2])
+    np.testing.assert_allclose(metrics.ripple, [100, 0])
+    assert machine_metrics(flux).ripple is None
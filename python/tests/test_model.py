@@ -0,0 +1,73 @@
+"""Tests of :mod:`model`."""
+from fem import FemDocument
+from model import Boundary, Label, ModelSpec, build_model, compile_model, read_dxf
+
+
+def _entity(kind: str, **codes: float) -> str:
+    """Formats a DXF entity with numeric group codes."""
+    pairs = "".join(f"{code[1:]}\n{value}\n" for code, value in codes.items())
+    return f"0\n{kind}\n8\n0\n{pairs}"
+
+
+def _drawing(path) -> str:
+    """Draws a square with a circle in the middle."""
+    corners = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    entities = [
+        _entity("LINE", c10=x0, c20=y0, c11=x1, c21=y1)
+        for (x0, y0), (x1, y1) in zip(corners, corners[1:] + corners[:1])
+    ]
+    entities.append(_entity("CIRCLE", c10=5, c20=5, c40=2))
+    path.write_text(
+        "0\nSECTION\n2\nHEADER\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n"
+        + "".join(entities)
+        + "0\nENDSEC\n0\nEOF\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_read_dxf(tmp_path):
+    """The entities and their geometry codes are read from the drawing."""
+    entities = list(read_dxf(_drawing(tmp_path / "model.dxf")))
+    assert [kind for kind, _ in entities] == ["LINE"] * 4 + ["CIRCLE"]
+    assert entities[1][1] == {10: 10, 20: 0, 11: 10, 21: 10}
+    assert entities[4][1] == {10: 5, 20: 5, 40: 2}
+
+
+def test_compile_model(tmp_path):
+    """The drawing is imported and everything is assigned to it."""
+    spec = ModelSpec(
+        _drawing(tmp_path / "model.dxf"),
+        materials=("Air", "N42"),
+        circuits=("A",),
+        boundaries=(
+            Boundary("Outer", segments=((5, 0), (10, 5))),
+            Boundary("Ring", 4, arcs=((5, 7),), max_segment=2),
+        ),
+        groups=((11, 3),),
+        labels=(Label(1, 1, "Air"), Label(5, 5, "N42", "A", magdir=90, turns=10)),
+    )
+    document = compile_model(spec)
+    assert len(document.nodes) == 6
+    assert len(document.segments) == 4
+    assert sorted(arc.angle for arc in document.arcs) == [180, 180]
+
+    outer = document.property_index("BdryProps", "Outer")
+    boundaries = [document.segments[document.closest_segment(5, 0)].boundary]
+    boundaries.append(document.segments[document.closest_segment(10, 5)].boundary)
+    assert boundaries == [outer, outer]
+    assert document.segments[document.closest_segment(5, 10)].boundary == 0
+    ring = document.arcs[document.closest_arc(5, 7)]
+    assert ring.boundary == document.property_index("BdryProps", "Ring")
+    assert ring.max_segment == 2
+    assert document.nodes[document.closest_node(10, 0)].group == 3
+    assert document.nodes[document.closest_node(10, 10)].group == 0
+
+    magnet = document.labels[document.closest_label(5, 5)]
+    assert magnet.block == document.property_index("BlockProps", "N42")
+    assert magnet.circuit == document.property_index("CircuitProps", "A")
+    assert (magnet.magdir, magnet.turns) == (90, 10)
+
+    output = str(tmp_path / "dist" / "model.fem")
+    build_model(spec, output)
+    assert FemDocument.read(output) == document
@@ -0,0 +1,49 @@
+"""Tests of :mod:`report`."""
+import os
+
+import pytest
+
+from report import FigureSpec, lines, render_report
+from tables import save_table
+
+
+@pytest.fixture(name="figures")
+def fixture_figures(tmp_path) -> list[FigureSpec]:
+    """Two figures of one table each and a figure of a missing table."""
+    for name in ("torque", "flux"):
+        save_table(str(tmp_path / name), {"angle": [0, 1, 2], name: [1.0, 2.0, 1.5]})
+    return [
+        FigureSpec(
+            str(tmp_path / f"{name}_figure"),
+            (str(tmp_path / name),),
+            lines("angle", name),
+            title=name,
+        )
+        for name in ("torque", "flux", "missing")
+    ]
+
+
+def test_incremental(figures: list[FigureSpec], tmp_path):
+    """Only the figures whose inputs changed are rendered again."""
+    torque, flux, missing = figures
+    options = {
+        "formats": ("png",),
+        "processes": 1,
+        "manifest": str(tmp_path / "report.json"),
+    }
+    assert render_report(figures, **options) == [torque.output, flux.output]
+    assert os.path.exists(f"{torque.output}.png")
+    assert not os.path.exists(f"{missing.output}.png")
+    assert not render_report(figures, **options)
+
+    # A changed table, a changed figure and a deleted image
+    save_table(torque.tables[0], {"angle": [0, 1, 2], "torque": [1.0, 2.0, 1.6]})
+    assert render_report(figures, **options) == [torque.output]
+    os.remove(f"{torque.output}.png")
+    assert render_report(figures, **options) == [torque.output]
+    retitled = FigureSpec(flux.output, flux.tables, flux.draw, title="Flux")
+    assert render_report([torque, retitled], **options) == [flux.output]
+    assert render_report([torque, retitled], **options, force=True) == [
+        torque.output,
+        flux.output,
+    ]
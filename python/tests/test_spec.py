@@ -0,0 +1,80 @@
+"""Tests of :mod:`spec`."""
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from spec import Sweep, SweepSpec, run_spec
+from task_3 import task_3
+
+
+def _unchanged(_document, _variant):
+    """Prepares every variant as the document itself."""
+
+
+def test_indices():
+    """The indices of a sweep point at its solves in the flat list."""
+    spec = SweepSpec(
+        "model.fem",
+        [
+            Sweep("first", steps=range(3), currents=(0, 10), warm_start=True),
+            Sweep("second", steps=range(4), currents=(5,), load_angle=(30, 2)),
+        ],
+        variants=(0.1, 0.2, 0.3),
+        prepare=_unchanged,
+    )
+    tasks = spec.tasks()
+    assert len(tasks) == 3 * (2 * 3 + 4)
+    for sweep in spec.sweeps:
+        indices = spec.indices(sweep.name)
+        assert indices.shape == (3, len(sweep.currents), len(sweep.steps))
+        for variant, current, step in np.ndindex(indices.shape):
+            task = tasks[indices[variant, current, step]]
+            assert task.document == spec.variant_document(variant)
+            assert task.point == sweep.point(sweep.currents[current], sweep.steps[step])
+            assert task.warm_start == sweep.warm_start
+    first = spec.indices("first")
+    every = np.concatenate([first.ravel(), spec.indices("second").ravel()])
+    assert sorted(every) == list(range(len(tasks)))
+
+    chains = spec.chains()
+    runs = [{chains[i] for i in steps} for steps in first.reshape(-1, 3)]
+    assert all(len(run) == 1 and None not in run for run in runs)
+    assert len(set.union(*runs)) == len(runs)
+    assert all(chains[i] is None for i in spec.indices("second").ravel())
+
+
+@pytest.mark.usefixtures("sliding_document")
+def test_warm_start_iterations():
+    """A warm started sweep starts cold at most once on every worker."""
+    angles = list(range(40))
+    cold = run_spec(replace(task_3(angles), cache=None), processes=2)
+    warm = run_spec(replace(task_3(angles, True), cache=None), processes=2)
+    cold_iterations = cold.get("torque", "iterations")[0, 0]
+    warm_iterations = warm.get("torque", "iterations")[0, 0]
+
+    assert warm_iterations[0] == cold_iterations[0]
+    assert 1 <= np.count_nonzero(warm_iterations == cold_iterations) <= 2
+    assert warm_iterations.mean() < cold_iterations.mean() / 2
+    np.testing.assert_allclose(
+        warm.get("torque", "torque"), cold.get("torque", "torque")
+    )
+
+
+@pytest.mark.usefixtures("sliding_document")
+def test_store_indices(tmp_path):
+    """Solves of some indices are kept in the store for the whole sweep."""
+    store = str(tmp_path / "task_3.store")
+    spec = replace(task_3(list(range(10))), cache=None)
+    first = run_spec(spec, processes=2, store=store, indices=[2, 3, 4])
+    torque = first.values["torque"]
+    assert np.isnan(torque[[0, 1, 5]]).all()
+    assert not np.isnan(torque[[2, 3, 4]]).any()
+
+    second = run_spec(spec, processes=2, store=store)
+    solved = sum(stats.points for stats in second.sweep.workers.values())
+    assert solved == 7
+    np.testing.assert_array_equal(second.values["torque"][[2, 3, 4]], torque[[2, 3, 4]])
+
+    again = run_spec(spec, processes=2, store=store, indices=[0, 9])
+    assert not again.sweep.workers
@@ -0,0 +1,55 @@
+"""Tests of :mod:`spectrum`."""
+import numpy as np
+
+from spectrum import spectrum
+
+ANGLES = np.arange(360)
+
+
+def _wave(order: float, amplitude: float, phase: float = 0) -> np.ndarray:
+    """Gets a harmonic of a mechanical order over a revolution."""
+    return amplitude * np.cos(np.radians(order * ANGLES + phase))
+
+
+def test_harmonics():
+    """The amplitude and phase of every harmonic of a waveform."""
+    values = 1.5 + _wave(2, 3) + _wave(6, 0.3, -90) + _wave(10, 0.4)
+    result = spectrum(np.stack([values, 2 * values]), pole_pairs=2)
+    assert result.amplitudes.shape == (2, 181)
+    np.testing.assert_allclose(result.harmonic(0), [1.5, 3])
+    np.testing.assert_allclose(result.harmonic(2), [3, 6])
+    np.testing.assert_allclose(result.harmonic(3, electrical=True), [0.3, 0.6])
+    np.testing.assert_allclose(result.harmonic(4), 0, atol=1e-12)
+    np.testing.assert_allclose(result.phases[0, 6], -90)
+
+    orders, amplitudes = result.dominant(2)
+    np.testing.assert_array_equal(orders, [[2, 10], [2, 10]])
+    np.testing.assert_allclose(amplitudes[0], [3, 0.4])
+    np.testing.assert_allclose(result.period(), 180)
+    np.testing.assert_allclose(result.period(electrical=True), 360)
+    np.testing.assert_allclose(result.thd(), 100 * 0.5 / 3)
+
+    orders, table = result.table(5)
+    np.testing.assert_array_equal(orders, [1, 2, 3, 4, 5])
+    np.testing.assert_allclose(table[0], [3, 0, 0.3, 0, 0.4], atol=1e-12)
+
+
+def test_span():
+    """The orders of a waveform over part of a revolution."""
+    angles = np.arange(0, 180, 0.5)
+    result = spectrum(np.sin(np.radians(8 * angles)), span=180)
+    assert result.orders[1] == 2
+    np.testing.assert_allclose(result.harmonic(8), 1)
+    np.testing.assert_allclose(result.harmonic(7), 0, atol=1e-12)
+    np.testing.assert_allclose(result.phases[4], -90)
+
+
+def test_window():
+    """A window keeps the amplitude and reduces the leakage of other waveforms."""
+    np.testing.assert_allclose(
+        spectrum(_wave(4, 2), window="hann").harmonic(4), 2, rtol=1e-3
+    )
+    partial = _wave(4.5, 2)
+    windowed = spectrum(partial, window="hann")
+    plain = spectrum(partial)
+    assert windowed.harmonic(20) < plain.harmonic(20) / 10
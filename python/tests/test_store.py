@@ -0,0 +1,61 @@
+"""Tests of :mod:`store`."""
+import os
+
+import numpy as np
+import pytest
+
+from lib import FEMMPool
+from store import ResultStore, SharedResults
+from sweep import run_sweep
+
+FIELDS = {"torque": (), "flux": (3,)}
+
+
+def test_resume(tmp_path):
+    """A store for the same sweep keeps its finished points."""
+    path = str(tmp_path / "sweep.store")
+    store = ResultStore(path, range(5), FIELDS, ["document"])
+    assert store.missing() == [0, 1, 2, 3, 4]
+    store.write(1, {"torque": 2.5, "flux": [1, 2, 3]})
+    store.write(3, {"torque": -1, "flux": [4, 5, 6]})
+
+    resumed = ResultStore(path, range(5), FIELDS, ["document"])
+    assert resumed.missing() == [0, 2, 4]
+    assert resumed["torque"][1] == 2.5
+    np.testing.assert_array_equal(resumed["flux"][3], [4, 5, 6])
+
+    resumed.write(0, {"torque": 0, "flux": [0, 0, 0]})
+    assert ResultStore(path, range(5), FIELDS, ["document"]).missing() == [2, 4]
+
+
+def test_replaced(tmp_path):
+    """A store of other points, fields or documents is replaced."""
+    path = str(tmp_path / "sweep.store")
+    ResultStore(path, range(5), FIELDS, ["document"]).write(
+        0, {"torque": 1, "flux": [1, 2, 3]}
+    )
+    assert ResultStore(path, range(5), FIELDS, ["edited"]).missing() == [0, 1, 2, 3, 4]
+    ResultStore(path, range(5), FIELDS, ["edited"]).write(
+        0, {"torque": 1, "flux": [1, 2, 3]}
+    )
+    assert ResultStore(path, range(6), FIELDS, ["edited"]).missing() == list(range(6))
+    assert ResultStore(path, range(6), {"torque": ()}, ["edited"]).complete is False
+
+
+def _mappings(batch: list[int]) -> list[dict[str, float]]:
+    """Counts the shared memory segments mapped into the worker."""
+    with open("/proc/self/maps", encoding="utf-8") as file:
+        segments = {line.split()[-1] for line in file if "/psm_" in line}
+    return [{"segments": len(segments)} for _ in batch]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="Needs procfs")
+def test_shared_results_attach_once(sliding_document: str):
+    """Workers keep one mapping per segment over many batches and sweeps."""
+    with FEMMPool(sliding_document, 2) as pool:
+        for _ in range(3):
+            with SharedResults(range(40), {"segments": ()}) as results:
+                run_sweep(_mappings, range(40), pool=pool, batch_size=1, store=results)
+                assert results.complete
+                # The done flags and the field of this sweep
+                assert np.max(results["segments"]) == 2
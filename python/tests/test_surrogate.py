@@ -0,0 +1,97 @@
+"""Tests of :mod:`surrogate`."""
+import numpy as np
+import pytest
+
+from lib import POLES
+from surrogate import FourierSurrogate, fit_surrogate, fourier_terms
+
+# Terms of the known series as (power, rotor order, load order, sine)
+SERIES = {
+    (0, 0, 0, 0): 2.0,
+    (0, 3, 0, 0): 0.5,
+    (1, 1, 1, 1): 0.8,
+    (1, 2, -1, 0): -0.3,
+    (2, 1, -2, 1): 0.2,
+}
+SCALE = 20.0
+
+
+def _series(rotor: np.ndarray, load: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """Evaluates the known series directly."""
+    electrical = np.radians(rotor * POLES / 2)
+    values = np.zeros(np.broadcast(rotor, load, current).shape)
+    for (power, order, load_order, sine), coefficient in SERIES.items():
+        angle = order * electrical + load_order * np.radians(load)
+        wave = np.sin(angle) if sine else np.cos(angle)
+        values = values + coefficient * (current / SCALE) ** power * wave
+    return values
+
+
+def _points(count: int, seed: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gets random operating points."""
+    generator = np.random.default_rng(seed)
+    return (
+        generator.uniform(0, 360, count),
+        generator.uniform(0, 360, count),
+        generator.uniform(0, SCALE, count),
+    )
+
+
+def test_predict():
+    """A surrogate with the coefficients of a series predicts the series."""
+    terms = fourier_terms(rotor_order=3, degree=2)
+    rows = {tuple(term): row for row, term in enumerate(terms.tolist())}
+    torque = np.zeros(len(terms))
+    for term, coefficient in SERIES.items():
+        torque[rows[term]] = coefficient
+    surrogate = FourierSurrogate(
+        terms, SCALE, {"torque": torque, "flux": np.outer(torque, [1, -2, 0.5])}
+    )
+
+    rotor, load, current = _points(50, seed=1)
+    expected = _series(rotor, load, current)
+    np.testing.assert_allclose(surrogate.predict(rotor, load, current), expected)
+    np.testing.assert_allclose(
+        surrogate.predict(rotor, load, current, "flux"),
+        np.outer(expected, [1, -2, 0.5]),
+    )
+
+    # The points broadcast together
+    grid = surrogate.predict(rotor[:, np.newaxis], load[np.newaxis, :5], SCALE)
+    assert grid.shape == (50, 5)
+    np.testing.assert_allclose(grid[:, 3], _series(rotor, load[3], SCALE))
+
+
+def test_fit(tmp_path):
+    """A fit to samples of a series recovers it, also after saving it."""
+    rotor, load, current = _points(400, seed=2)
+    values = _series(rotor, load, current)
+    surrogate = fit_surrogate(
+        rotor,
+        load,
+        current,
+        {"torque": values, "flux": np.stack([values, -values], axis=-1)},
+        rotor_order=4,
+    )
+    assert surrogate.errors["torque"]["max"] < 1e-6
+    assert surrogate.errors["flux"]["relative"] < 1e-6
+
+    path = str(tmp_path / "surrogate.npz")
+    surrogate.save(path)
+    loaded = FourierSurrogate.load(path)
+    assert loaded.errors == surrogate.errors
+    rotor, load, current = _points(100, seed=3)
+    expected = _series(rotor, load, current)
+    np.testing.assert_allclose(
+        loaded.predict(rotor, load, current), expected, atol=1e-6
+    )
+    np.testing.assert_allclose(
+        loaded.predict(rotor, load, current, "flux")[:, 1], -expected, atol=1e-6
+    )
+
+
+def test_fit_too_few_samples():
+    """Fewer samples than terms cannot be fitted."""
+    rotor, load, current = _points(10, seed=4)
+    with pytest.raises(ValueError, match="cannot fit"):
+        fit_surrogate(rotor, load, current, {"torque": _series(rotor, load, current)})
@@ -0,0 +1,81 @@
+"""Tests of :mod:`sweep`."""
+import time
+
+import numpy as np
+import pytest
+
+from store import ResultStore
+from sweep import chained_batches, run_sweep
+
+FIELDS = {"torque": ()}
+
+
+def _torque(batch: list[int]) -> list[dict[str, float]]:
+    """Solves points quickly, the first point slowly."""
+    time.sleep(1 if 0 in batch else 0.01)
+    return [{"torque": 0.5 * point} for point in batch]
+
+
+def _failing(batch: list[int]) -> list[dict[str, float]]:
+    """Solves the points below 6 and fails for the others."""
+    if max(batch) >= 6:
+        raise RuntimeError(f"Cannot solve {batch}")
+    return _torque(batch)
+
+
+def test_dynamic_scheduling(sliding_document: str):
+    """Idle workers keep taking batches while one solves a slow batch."""
+    sweep = run_sweep(
+        _torque, range(30), document=sliding_document, processes=2, batch_size=1
+    )
+    assert sweep.results == [{"torque": 0.5 * point} for point in range(30)]
+    points = sorted(stats.points for stats in sweep.workers.values())
+    assert sum(points) == 30
+    assert points[-1] >= 25
+
+
+def test_resume(sliding_document: str, tmp_path):
+    """A failed sweep keeps its solved points and only solves the rest again."""
+    path = str(tmp_path / "sweep.store")
+    store = ResultStore(path, range(10), FIELDS)
+    with pytest.raises(RuntimeError, match="Cannot solve"):
+        run_sweep(
+            _failing,
+            range(10),
+            document=sliding_document,
+            processes=2,
+            batch_size=2,
+            store=store,
+        )
+    assert store.missing() == [6, 7, 8, 9]
+
+    store = ResultStore(path, range(10), FIELDS)
+    sweep = run_sweep(
+        _torque, range(10), document=sliding_document, processes=2, store=store
+    )
+    assert sum(stats.points for stats in sweep.workers.values()) == 4
+    np.testing.assert_array_equal(store["torque"], 0.5 * np.arange(10))
+    assert sweep.results[9] == {"torque": 4.5}
+
+    again = run_sweep(_torque, range(10), processes=2, store=store)
+    assert not again.workers
+
+
+def test_chained_batches():
+    """The chains are split into contiguous batches for every worker."""
+    chains = [0] * 6 + [None] * 3 + [9] * 4
+    assert chained_batches(range(13), chains, 2, 4) == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 7],
+        [8],
+        [9, 10],
+        [11, 12],
+    ]
+    assert chained_batches(range(13), chains, 2, 1) == [
+        [0, 1, 2, 3, 4, 5],
+        [6, 7],
+        [8],
+        [9, 10, 11, 12],
+    ]
+    assert chained_batches([2, 3, 4, 10], chains, 2, 1) == [[2, 3, 4], [10]]
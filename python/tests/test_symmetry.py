@@ -0,0 +1,41 @@
+"""Tests of :mod:`symmetry`."""
+import numpy as np
+import pytest
+
+from symmetry import flux_interval, reconstruct_periodic, reconstruct_three_phase
+
+
+def _flux(angles: np.ndarray, poles: int, sequence: int) -> np.ndarray:
+    """Flux linkage of three phases with half-wave symmetry and harmonics."""
+    shifts = np.array([0, sequence, -sequence]) * 120
+    electrical = np.radians(angles[:, np.newaxis] * poles / 2 + shifts[np.newaxis, :])
+    harmonics = [
+        np.cos(electrical),
+        np.cos(3 * electrical + 0.2),
+        np.sin(5 * electrical - 0.4),
+    ]
+    return np.tensordot([1, 0.3, 0.1], harmonics, axes=1)
+
+
+@pytest.mark.parametrize(
+    "poles, step, sequence", [(4, 1, 1), (4, 1, -1), (8, 0.5, 1), (2, 2, 1)]
+)
+def test_reconstruct_three_phase(poles: int, step: float, sequence: int):
+    """The flux of a whole turn is rebuilt from the fundamental interval."""
+    count = round(360 / step)
+    full = _flux(np.arange(count) * step, poles, sequence)
+    interval = round(flux_interval(poles) / step)
+    rebuilt = reconstruct_three_phase(full[:interval], poles, count, step, sequence)
+    np.testing.assert_allclose(rebuilt, full, atol=1e-12)
+
+
+def test_reconstruct_three_phase_short():
+    """Too few samples are rejected."""
+    with pytest.raises(ValueError):
+        reconstruct_three_phase(np.zeros((2, 3)))
+
+
+def test_reconstruct_periodic():
+    """A periodic waveform is rebuilt from one period."""
+    full = np.sin(np.radians(np.arange(360) * 24))
+    np.testing.assert_allclose(reconstruct_periodic(full[:15], 15), full, atol=1e-12)
@@ -0,0 +1,41 @@
+"""Tests of :mod:`tables`."""
+import os
+
+import numpy as np
+
+from tables import load_table, save_table
+
+
+def _write_csv(path, rows: str, mtime: float):
+    """Writes a CSV table with a fixed modification time."""
+    path.write_text("angle,torque\n" + rows, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_load_table_sidecar(tmp_path):
+    """A CSV table is parsed into its sidecar until the CSV file changes."""
+    path = tmp_path / "table.csv"
+    sidecar = tmp_path / "table.csv.npy"
+    _write_csv(path, "0,1.5\n1,2.5\n", 1_000_000)
+    np.testing.assert_array_equal(load_table(str(path))["torque"], [1.5, 2.5])
+    assert sidecar.exists()
+
+    # An unchanged CSV file is not parsed again
+    parsed = os.path.getmtime(sidecar)
+    load_table(str(path))
+    assert os.path.getmtime(sidecar) == parsed
+
+    _write_csv(path, "0,3.5\n1,4.5\n2,5.5\n", parsed + 10)
+    np.testing.assert_array_equal(load_table(str(path))["torque"], [3.5, 4.5, 5.5])
+
+
+def test_load_table_binary(tmp_path):
+    """The binary table is used unless its CSV file is newer."""
+    stem = tmp_path / "table"
+    save_table(str(stem), {"angle": [0, 1], "torque": [1.0, 2.0]}, write_csv=True)
+    assert load_table(str(stem)).dtype.names == ("angle", "torque")
+    np.testing.assert_array_equal(load_table(f"{stem}.csv")["torque"], [1.0, 2.0])
+
+    later = os.path.getmtime(f"{stem}.npy") + 10
+    _write_csv(tmp_path / "table.csv", "0,7\n", later)
+    np.testing.assert_array_equal(load_table(str(stem))["torque"], [7.0])
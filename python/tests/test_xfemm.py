@@ -0,0 +1,110 @@
+"""Tests of :mod:`xfemm` with a femmcli that records the scripts it runs."""
+import json
+import os
+import sys
+
+import pytest
+
+import xfemm
+
+# Logs every script and answers the n-th query of a script with n values of n
+FEMMCLI = """#!{python}
+import json, os, sys
+
+script = sys.argv[1].removeprefix("--lua-script=")
+with open(script, encoding="utf-8") as file:
+    lines = file.read().splitlines()
+with open(os.environ["FEMMCLI_LOG"], "a", encoding="utf-8") as file:
+    file.write(json.dumps(lines) + "\\n")
+if any(line.startswith("fail(") for line in lines):
+    sys.exit(1)
+queries = 0
+for line in lines:
+    if line == "mi_analyze()":
+        print("Newton Iteration(2)")
+        print("Newton Iteration(5)")
+    if line.startswith('print("@@"'):
+        queries += 1
+        print("@@", *[queries] * queries)
+"""
+
+
+@pytest.fixture(name="scripts")
+def fixture_scripts(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    """Runs a session with the recording femmcli, giving the scripts it ran."""
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    femmcli = directory / "femmcli"
+    femmcli.write_text(FEMMCLI.format(python=sys.executable), encoding="utf-8")
+    femmcli.chmod(0o755)
+    log = tmp_path / "scripts.jsonl"
+    log.touch()
+    monkeypatch.setattr(xfemm, "XFEMM_DIR", str(directory))
+    monkeypatch.setenv("FEMMCLI_LOG", str(log))
+
+    def scripts() -> list[list[str]]:
+        with open(log, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    xfemm.openfemm()
+    yield scripts
+    xfemm.closefemm()
+
+
+def test_replay(scripts, sliding_document: str, tmp_path):
+    """Edits are replayed with the analysis, which answers the prefetched queries."""
+    xfemm.opendocument(sliding_document)
+    working = xfemm._STATE["document"]  # pylint: disable=protected-access
+    xfemm.mi_modifycircprop("A", 1, 2.5)
+    xfemm.mi_zoomnatural()
+    assert not scripts()
+
+    xfemm.prefetch([("mo_blockintegral", (22,)), ("mo_getcircuitproperties", ("A",))])
+    xfemm.mi_analyze()
+    assert scripts() == [
+        [
+            f'open("{working}")',
+            'mi_modifycircprop("A", 1.0, 2.5)',
+            f'mi_saveas("{working}")',
+            "mi_analyze()",
+            "mi_loadsolution()",
+            'print("@@", mo_blockintegral(22.0))',
+            'print("@@", mo_getcircuitproperties("A"))',
+        ]
+    ]
+    assert xfemm.last_iterations() == 5
+    assert xfemm.mo_blockintegral(22) == 1
+    assert xfemm.mo_getcircuitproperties("A") == [2, 2]
+    assert len(scripts()) == 1
+
+    # Queries that were not prefetched, or after closing the solution, run alone
+    assert xfemm.mo_getpointvalues(1, 2) == 1
+    xfemm.mo_close()
+    assert xfemm.mo_blockintegral(22) == 1
+    assert scripts()[1:] == [
+        [
+            f'open("{working}")',
+            "mi_loadsolution()",
+            f'print("@@", {call})',
+        ]
+        for call in ("mo_getpointvalues(1.0, 2.0)", "mo_blockintegral(22.0)")
+    ]
+
+    saved = str(tmp_path / "saved.fem")
+    xfemm.mi_setcurrent("A", 3)
+    xfemm.mi_saveas(saved)
+    assert scripts()[-1] == [
+        f'open("{working}")',
+        'mi_setcurrent("A", 3.0)',
+        f'mi_saveas("{working}")',
+    ]
+    assert os.path.exists(saved)
+    assert xfemm._STATE["document"] == saved  # pylint: disable=protected-access
+
+
+def test_failure(scripts, sliding_document: str):
+    """A femmcli run that fails raises an error."""
+    xfemm.opendocument(sliding_document)
+    with pytest.raises(RuntimeError, match="femmcli exited with 1"):
+        xfemm.callfemm("fail()")
+    assert len(scripts()) == 1
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Opt-in tracing of the time spent in every FEMM call.
+
+Set the ``FEMM_TRACE`` environment variable to a directory to record a span for
+every call of the FEMM backend made through :data:`lib.femm`, every job of a
+:class:`lib.FEMMPool`, the time jobs wait in its queue and the steps of
+:func:`lib.solve`. Every process writes its spans to
+``<FEMM_TRACE>/<run>/<pid>.jsonl`` when it exits, the run is named when the
+main process first imports this module and is passed on to the workers.
+
+The spans use the monotonic clock shared by all the processes, so the spans of
+every worker line up when this script merges them into a Chrome trace, which
+can be opened in ``chrome://tracing`` or https://ui.perfetto.dev, and into a
+summary of the latency percentiles of every kind of call.
+
+When ``FEMM_TRACE`` is not set nothing is wrapped and :func:`span` does nothing.
+"""
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from multiprocessing.util import Finalize
+from types import ModuleType
+from typing import Any, Callable, Iterator, TypeVar
+
+import numpy as np
+
+# Directory the traces are written to, tracing is off when empty
+TRACE_DIR = os.environ.get("FEMM_TRACE", "")
+ENABLED = bool(TRACE_DIR)
+# Name of the run the workers inherit from the main process
+RUN = (
+    os.environ.setdefault(
+        "FEMM_TRACE_RUN", time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    )
+    if ENABLED
+    else ""
+)
+# Spans kept in memory before they are written out
+FLUSH_EVENTS = 10000
+# Percentiles of the summary
+PERCENTILES = (50, 90, 99)
+
+TracedT = TypeVar("TracedT", bound=Callable[..., Any])
+
+# Spans of this process that are not written yet
+_EVENTS: list[dict[str, Any]] = []
+_STATE: dict[str, Any] = {}
+
+
+def _forget():
+    """Drops the spans a forked process copied from its parent."""
+    _EVENTS.clear()
+    _STATE.clear()
+
+
+os.register_at_fork(after_in_child=_forget)
+
+
+def now() -> float:
+    """Gets the time of the clock shared by every process in microseconds."""
+    return time.perf_counter_ns() / 1000
+
+
+def record(name: str, category: str, start: float, end: float, **args: Any):
+    """Records a span of this process.
+
+    :param name: The name of the span.
+    :param category: The kind of span, e.g. ``femm`` or ``job``.
+    :param start: The start time from :func:`now`.
+    :param end: The end time from :func:`now`.
+    :param args: Values shown with the span.
+    """
+    if not ENABLED:
+        return
+    if "finalizer" not in _STATE:
+        # Finalizers also run when a worker process exits, unlike atexit
+        _STATE["finalizer"] = Finalize(None, flush, exitpriority=10)
+        _STATE["process"] = multiprocessing.current_process().name
+    _EVENTS.append(
+        {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": end - start,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": args,
+        }
+    )
+    if len(_EVENTS) >= FLUSH_EVENTS:
+        flush()
+
+
+@contextmanager
+def span(name: str, category: str = "python", **args: Any) -> Iterator[None]:
+    """Records the time spent inside of the block.
+
+    :param name: The name of the span.
+    :param category: The kind of span.
+    :param args: Values shown with the span.
+    """
+    if not ENABLED:
+        yield
+        return
+    start = now()
+    try:
+        yield
+    finally:
+        record(name, category, start, now(), **args)
+
+
+def traced(category: str = "python") -> Callable[[TracedT], TracedT]:
+    """Function decorator recording a span for every call.
+
+    :param category: The kind of span.
+    :returns: The decorator, which leaves the function as it is when tracing
+        is off.
+    """
+
+    def decorator(func: TracedT) -> TracedT:
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(func.__qualname__, category):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+class TracedModule:
+    """Module whose functions record a span for every call.
+
+    :param module: The module to wrap.
+    :param category: The kind of the spans.
+    """
+
+    def __init__(self, module: ModuleType, category: str):
+        self._module = module
+        self._category = category
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._module, name)
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def call(*args, **kwargs):
+            start = now()
+            try:
+                return value(*args, **kwargs)
+            finally:
+                record(name, self._category, start, now())
+
+        # Later calls find the wrapper without going through __getattr__
+        setattr(self, name, call)
+        return call
+
+
+def trace_module(module: ModuleType, category: str = "femm") -> Any:
+    """Wraps the functions of a module in spans if tracing is on.
+
+    :param module: The module.
+    :param category: The kind of the spans.
+    :returns: The wrapped module, or the module itself when tracing is off.
+    """
+    return TracedModule(module, category) if ENABLED else module
+
+
+def flush():
+    """Appends the recorded spans of this process to its trace file."""
+    if not _EVENTS:
+        return
+    directory = os.path.join(TRACE_DIR, RUN)
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{directory}/{os.getpid()}.jsonl", "a", encoding="utf-8") as file:
+        if not _STATE.get("named"):
+            name = {"name": _STATE["process"]}
+            meta = {"name": "process_name", "ph": "M", "pid": os.getpid()}
+            file.write(json.dumps({**meta, "args": name}) + "\n")
+            _STATE["named"] = True
+        for event in _EVENTS:
+            file.write(json.dumps(event) + "\n")
+    _EVENTS.clear()
+
+
+def latest_run(directory: str = TRACE_DIR) -> str:
+    """Gets the directory of the last traced run.
+
+    :param directory: The trace directory.
+    :returns: The directory of the run.
+    """
+    runs = [path for path in glob.glob(f"{directory}/*") if os.path.isdir(path)]
+    if not runs:
+        raise FileNotFoundError(f"No traced runs in {directory}")
+    return max(runs, key=os.path.getmtime)
+
+
+def load_events(run: str) -> list[dict[str, Any]]:
+    """Loads the spans of every process of a run.
+
+    :param run: The directory of the run.
+    :returns: The events, spans and process names, of every process.
+    """
+    events = []
+    for path in sorted(glob.glob(f"{run}/*.jsonl")):
+        with open(path, encoding="utf-8") as file:
+            events.extend(json.loads(line) for line in file)
+    return events
+
+
+def export_chrome(events: list[dict[str, Any]], path: str):
+    """Saves events as a Chrome trace.
+
+    :param events: The events.
+    :param path: The location of the ``.json`` trace.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def summarize(events: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """Finds the latency percentiles of every kind of span.
+
+    :param events: The events.
+    :returns: The count, total and percentiles in milliseconds of every span by
+        ``<category>.<name>``, the longest total first.
+    """
+    durations: dict[str, list[float]] = {}
+    for event in events:
+        if event["ph"] == "X":
+            key = f"{event['cat']}.{event['name']}"
+            durations.setdefault(key, []).append(event["dur"] / 1000)
+
+    summary = {}
+    for key, values in durations.items():
+        milliseconds = np.array(values)
+        summary[key] = {
+            "count": len(values),
+            "total": float(milliseconds.sum()),
+            **{
+                f"p{percentile}": float(np.percentile(milliseconds, percentile))
+                for percentile in PERCENTILES
+            },
+            "max": float(milliseconds.max()),
+        }
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["total"]))
+
+
+def log_summary(summary: dict[str, dict[str, float]], logger: logging.Logger):
+    """Logs the summary of a trace as a table.
+
+    :param summary: The summary from :func:`summarize`.
+    :param logger: The logger.
+    """
+    columns = ["count", "total", *(f"p{p}" for p in PERCENTILES), "max"]
+    width = max((len(key) for key in summary), default=4)
+    logger.info("%s %s", "span".ljust(width), " ".join(f"{c:>10}" for c in columns))
+    for key, values in summary.items():
+        cells = " ".join(f"{values[c]:>10.4g}" for c in columns)
+        logger.info("%s %s", key.ljust(width), cells)
+
+
+if __name__ == "__main__":
+    logger = multiprocessing.log_to_stderr(logging.INFO)
+
+    run = latest_run(TRACE_DIR or "../dist/trace")
+    events = load_events(run)
+    export_chrome(events, f"{run}.trace.json")
+    logger.info("Saved %s", f"{run}.trace.json")
+
+    summary = summarize(events)
+    with open(f"{run}.summary.json", "w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=2)
+    log_summary(summary, logger)
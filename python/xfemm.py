@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Native headless xfemm backend with the same interface as pyfemm.
+
+The ``femmcli`` program of xfemm runs a Lua script and exits, so there is no
+running FEMM instance to talk to. Instead the preprocessor commands are
+recorded and replayed onto a working copy of the document the next time
+``femmcli`` is run, which is when the model is analyzed or a post processor
+value is needed. Post processor queries announced with :func:`prefetch` are
+answered by the same ``femmcli`` run as the analysis, so a solve starts one
+process instead of one for every value.
+
+Only the commands used by the task scripts need to behave like pyfemm, every
+other ``mi_*`` command is passed through to Lua unchanged and the GUI commands
+are ignored.
+"""
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Callable
+
+XFEMM_DIR = os.environ.get("XFEMM_DIR", "../lua/xfemm_linux64/cfemm/bin/")
+MARKER = "@@"  # Marks the lines of the femmcli output with return values
+# Progress lines of the nonlinear solver, e.g. "Newton Iteration(3)"
+ITERATION_PATTERN = re.compile(r"Iteration\s*\(\s*(\d+)\s*\)")
+
+# Commands that only change the GUI
+_IGNORED_PREFIXES = ("mi_zoom", "mo_zoom", "mi_refreshview", "mo_refreshview")
+_IGNORED = {"mi_showgrid", "mi_hidegrid", "mo_showmesh", "mo_hidemesh", "main_resize"}
+
+_STATE: dict[str, Any] = {
+    "pending": [],
+    "document": None,
+    "iterations": None,
+    "prefetch": [],
+    "answers": {},
+}
+
+
+def _lua_value(value: Any) -> str:
+    """Converts a Python value into a Lua literal."""
+    if value is None:
+        return "nil"
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value))
+
+
+def _lua_call(name: str, *args) -> str:
+    """Creates a Lua function call."""
+    return f"{name}({', '.join(_lua_value(arg) for arg in args)})"
+
+
+def _run(lines: list[str]) -> list[list[float]]:
+    """Runs a Lua script with femmcli and gets the printed return values.
+
+    :param lines: The Lua statements to run.
+    :returns: The numbers of every line of output starting with the marker.
+    """
+    logger = multiprocessing.get_logger()
+    workdir = _STATE["workdir"]
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".lua", dir=workdir, delete=False, encoding="utf-8"
+    ) as file:
+        file.write("\n".join(lines) + "\n")
+        script = file.name
+
+    try:
+        process = subprocess.run(
+            [_STATE["femmcli"], f"--lua-script={script}"],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    finally:
+        os.remove(script)
+
+    if process.returncode != 0:
+        logger.error("femmcli output: %s", process.stdout + process.stderr)
+        raise RuntimeError(f"femmcli exited with {process.returncode}")
+
+    _STATE["stdout"] = process.stdout
+    output = []
+    for line in process.stdout.splitlines():
+        if line.startswith(MARKER):
+            output.append([float(value) for value in line.split()[1:]])
+    return output
+
+
+def _returned(values: list[float]) -> Any:
+    """Converts the printed values of a query into its return value."""
+    return values[0] if len(values) == 1 else values
+
+
+def _document_lines() -> list[str]:
+    """Gets the Lua statements that open the document with all the edits."""
+    return [_lua_call("open", _STATE["document"]), *_STATE["pending"]]
+
+
+def _flush(extra: list[str] | None = None) -> list[list[float]]:
+    """Applies the recorded edits to the working document.
+
+    :param extra: Statements to run after the document is saved.
+    :returns: The printed return values.
+    """
+    lines = [*_document_lines(), _lua_call("mi_saveas", _STATE["document"])]
+    output = _run(lines + (extra or []))
+    _STATE["pending"] = []
+    return output
+
+
+def openfemm(winepath: str | None = None, femmpath: str | None = None, **_):
+    """Starts a new session, the wine arguments are accepted but not used.
+
+    :param winepath: Not used.
+    :param femmpath: Not used, the location of femmcli is in ``XFEMM_DIR``.
+    """
+    # pylint: disable=unused-argument
+    femmcli = shutil.which("femmcli", path=XFEMM_DIR) or shutil.which("femmcli")
+    if femmcli is None:
+        raise FileNotFoundError(f"Cannot find femmcli in {XFEMM_DIR}")
+    _STATE.update(
+        femmcli=os.path.abspath(femmcli),
+        # pylint: disable=consider-using-with
+        tempdir=tempfile.TemporaryDirectory(),
+        pending=[],
+        document=None,
+        prefetch=[],
+        answers={},
+    )
+    _STATE["workdir"] = _STATE["tempdir"].name
+
+
+def closefemm():
+    """Ends the session and removes the working files."""
+    if "tempdir" in _STATE:
+        _STATE.pop("tempdir").cleanup()
+    _STATE.update(pending=[], document=None, prefetch=[], answers={})
+
+
+def opendocument(document: str):
+    """Opens a copy of a document.
+
+    :param document: The location of the document.
+    """
+    working = os.path.join(_STATE["workdir"], "document.fem")
+    shutil.copyfile(document, working)
+    _STATE.update(document=working, pending=[], answers={})
+
+
+def newdocument(doctype: int = 0):
+    """Creates a new document.
+
+    :param doctype: The type of document, only 0 (magnetics) is supported.
+    """
+    working = os.path.join(_STATE["workdir"], "document.fem")
+    _run([_lua_call("newdocument", doctype), _lua_call("mi_saveas", working)])
+    _STATE.update(document=working, pending=[], answers={})
+
+
+def mi_saveas(filename: str):
+    """Saves the document with all the edits to a file.
+
+    Like in FEMM the file becomes the document, so it is the one analyzed and
+    the solution is written next to it.
+
+    :param filename: The location to save to.
+    """
+    filename = os.path.abspath(filename)
+    _flush()
+    if filename != _STATE["document"]:
+        shutil.copyfile(_STATE["document"], filename)
+    _STATE.update(document=filename, answers={})
+
+
+def mi_close():
+    """Closes the document."""
+    _STATE.update(document=None, pending=[], answers={})
+
+
+def prefetch(queries: list[tuple[str, tuple]]):
+    """Queues post processor queries to answer with the next analysis.
+
+    :param queries: The name and arguments of every ``mo_*`` command.
+    """
+    _STATE["prefetch"] = list(queries)
+
+
+def mi_analyze(flag: int = 1):
+    """Analyzes the document, writing the solution next to it.
+
+    The queries of :func:`prefetch` are run on the solution in the same
+    ``femmcli`` run and answered from memory until ``mo_close``.
+
+    :param flag: Not used as there is no window to show.
+    """
+    # pylint: disable=unused-argument
+    calls = [_lua_call(name, *args) for name, args in _STATE["prefetch"]]
+    lines = ["mi_analyze()"]
+    if calls:
+        lines.append("mi_loadsolution()")
+        lines.extend(f'print("{MARKER}", {call})' for call in calls)
+    _STATE.update(prefetch=[], answers={})
+    output = _flush(lines)
+    if len(output) != len(calls):
+        raise RuntimeError(f"femmcli answered {len(output)} of {len(calls)} queries")
+    _STATE["answers"] = dict(zip(calls, output))
+    iterations = [int(match) for match in ITERATION_PATTERN.findall(_STATE["stdout"])]
+    _STATE["iterations"] = max(iterations, default=None)
+
+
+def last_iterations() -> int | None:
+    """Gets the Newton iterations of the last analysis.
+
+    :returns: The iterations printed by the solver, ``None`` if it printed none.
+    """
+    return _STATE["iterations"]
+
+
+def mi_loadsolution():
+    """Loads the solution, which is done lazily by the post processor calls."""
+
+
+def mo_close():
+    """Closes the solution, forgetting the prefetched answers."""
+    _STATE["answers"] = {}
+
+
+def mi_savebitmap(filename: str):
+    """Saving bitmaps needs the FEMM GUI, so it is skipped.
+
+    :param filename: The location of the bitmap.
+    """
+    multiprocessing.get_logger().warning("Cannot save %s without a GUI", filename)
+
+
+def callfemm(lua: str) -> list[float]:
+    """Runs Lua code on the document.
+
+    :param lua: The Lua code to run.
+    :returns: The numbers printed with the marker.
+    """
+    output = _flush([lua])
+    return output[0] if output else []
+
+
+def _recorder(name: str) -> Callable[..., None]:
+    """Creates a preprocessor command that is replayed later."""
+
+    def command(*args):
+        _STATE["pending"].append(_lua_call(name, *args))
+
+    command.__name__ = name
+    return command
+
+
+def _query(name: str) -> Callable[..., Any]:
+    """Creates a post processor command that returns its values."""
+
+    def command(*args):
+        call = _lua_call(name, *args)
+        if call in _STATE["answers"]:
+            return _returned(_STATE["answers"][call])
+        lines = [
+            _lua_call("open", _STATE["document"]),
+            "mi_loadsolution()",
+            f'print("{MARKER}", {call})',
+        ]
+        return _returned(_run(lines)[0])
+
+    command.__name__ = name
+    return command
+
+
+def _ignored(*_):
+    """Command that does nothing without a GUI."""
+
+
+def __getattr__(name: str) -> Callable[..., Any]:
+    if name in _IGNORED or name.startswith(_IGNORED_PREFIXES):
+        return _ignored
+    if name.startswith("mi_") or name in ("smartmesh",):
+        return _recorder(name)
+    if name.startswith("mo_"):
+        return _query(name)
+    raise AttributeError(f"xfemm backend has no command {name}")